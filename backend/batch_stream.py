@@ -0,0 +1,130 @@
+"""
+Batch endpoints over NDJSON (newline-delimited JSON), shared by main.py and
+the poker API.
+
+A batch request body is a JSON array of items or, sent as
+application/x-ndjson, one item per line. The response streams one NDJSON
+line per item in completion order, so clients match lines by `index`:
+
+    {"index": 3, "status": 200, "result": {...}}
+    {"index": 0, "status": 422, "error": [...]}
+
+Items that fail validation get their error line first; identical items are
+computed once and each gets its own line.
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+import metrics
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _parse_line(line: bytes, number: int) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Line {number}: invalid JSON ({e})")
+
+
+async def read_batch(request: Request, max_items: int) -> List[Any]:
+    """
+    Raw items of a batch request body.
+
+    The body is either a JSON array or, with an NDJSON content type, one JSON
+    document per line; NDJSON uploads are read as they stream in rather than
+    buffered whole.
+    """
+    content_type = request.headers.get("content-type", "")
+    items = []
+    if "ndjson" in content_type or "jsonl" in content_type:
+        buffer = b""
+        number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                number += 1
+                if line.strip():
+                    items.append(_parse_line(line, number))
+            if len(items) > max_items:
+                raise HTTPException(status_code=413, detail=f"At most {max_items} items per batch")
+        if buffer.strip():
+            items.append(_parse_line(buffer, number + 1))
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of items")
+
+    if len(items) > max_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_items} items per batch")
+    return items
+
+
+def validate_items(items: List[Any], model: Type[BaseModel]) -> Tuple[Dict[int, BaseModel], Dict[int, dict]]:
+    """Validate every item on its own: (index -> model, index -> error line) so one bad item fails alone"""
+    valid, errors = {}, {}
+    for index, item in enumerate(items):
+        try:
+            valid[index] = model.model_validate(item)
+        except ValidationError as e:
+            errors[index] = {"index": index, "status": 422, "error": e.errors(include_url=False)}
+    return valid, errors
+
+
+def record_batch(endpoint: str, items: int, distinct: int, invalid: int):
+    """Count a batch request's items, the duplicates folded into others and the invalid ones"""
+    metrics.increment("gto_batch_requests_total", 1, "Batch requests received", endpoint=endpoint)
+    metrics.increment("gto_batch_items_total", items, "Items received in batch requests", endpoint=endpoint)
+    metrics.increment("gto_batch_duplicate_items_total", items - invalid - distinct,
+                      "Batch items answered with another identical item's result", endpoint=endpoint)
+    metrics.increment("gto_batch_invalid_items_total", invalid, "Batch items rejected by validation",
+                      endpoint=endpoint)
+
+
+async def stream_results(groups: List[Tuple[List[int], Callable[[], Awaitable[BaseModel]]]],
+                         errors: Dict[int, dict], concurrency: int = 0) -> AsyncIterator[str]:
+    """
+    NDJSON lines, one per item, in completion order.
+
+    Each group is a list of item indices sharing one result (deduplicated
+    items) and the coroutine function computing it. Groups are started in
+    the given order, at most `concurrency` at a time if set. Failed groups
+    produce an error line for each of their items. Pending work is cancelled
+    if the client disconnects.
+    """
+    for index in sorted(errors):
+        yield json.dumps(errors[index]) + "\n"
+
+    slots = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+
+    async def run(indices: List[int], compute: Callable[[], Awaitable[BaseModel]]):
+        try:
+            if slots is None:
+                result = await compute()
+            else:
+                async with slots:
+                    result = await compute()
+            return indices, {"status": 200, "result": result.model_dump()}
+        except HTTPException as e:
+            return indices, {"status": e.status_code, "error": e.detail}
+        except Exception as e:
+            return indices, {"status": 500, "error": str(e)}
+
+    tasks = [asyncio.create_task(run(indices, compute)) for indices, compute in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            indices, payload = await next_done
+            for index in indices:
+                yield json.dumps({"index": index, **payload}) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,7 @@
+"""
+Benchmark tooling that runs without the real solver or model.
+
+    fake_solver.py     Stand-in TexasSolverConsole (point TEXAS_SOLVER_PATH at it)
+    tiny_model.py      Random-weight causal LM saved in the merged checkpoint format
+    load_generator.py  Drives /solve, /equity and /poker/decision and reports latency percentiles
+"""
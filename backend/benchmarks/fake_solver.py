@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Stand-in for TexasSolverConsole, for benchmarking /solve without the real binary.
+
+Accepts the command line SolverAPI builds, prints iteration/exploitability
+progress lines for a configurable wall time, then dumps a random (but
+deterministic per spot) strategy tree in TexasSolver's JSON layout:
+
+    chmod +x benchmarks/fake_solver.py
+    TEXAS_SOLVER_PATH=benchmarks/fake_solver.py FAKE_SOLVER_SECONDS=2 python main.py
+
+Tuning (environment variables):
+    FAKE_SOLVER_SECONDS=1.0   Wall time of a run that goes to max iterations
+    FAKE_SOLVER_BUSY=0        1 = burn CPU instead of sleeping (models solver CPU contention)
+    FAKE_SOLVER_DEPTH=3       Action levels in the dumped tree (controls output size)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cards import combo_str, parse_board  # noqa: E402
+from ranges import parse_range, remove_cards  # noqa: E402
+
+FAKE_SOLVER_SECONDS = float(os.environ.get("FAKE_SOLVER_SECONDS", 1.0))
+FAKE_SOLVER_BUSY = os.environ.get("FAKE_SOLVER_BUSY", "0") == "1"
+FAKE_SOLVER_DEPTH = int(os.environ.get("FAKE_SOLVER_DEPTH", 3))
+
+# Exploitability (% of pot) after i iterations: START * (i + 1) ** -DECAY
+START_EXPLOITABILITY = 25.0
+DECAY = 0.7
+REPORT_EVERY = 10
+
+# TexasSolver numbers the in-position player 0 and the out-of-position player 1
+IP, OOP = 0, 1
+
+
+def exploitability(iteration: int) -> float:
+    return START_EXPLOITABILITY * (iteration + 1) ** -DECAY
+
+
+def wait(seconds: float):
+    if not FAKE_SOLVER_BUSY:
+        time.sleep(seconds)
+        return
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build_tree(rng, combos, player, pot, facing, checked, depth, bet_sizes):
+    """Action node for `player` with random per-combo frequencies and children `depth - 1` levels deep"""
+    if facing:
+        actions = ["FOLD", "CALL", f"RAISE {round(facing * 3, 1)}"]
+    else:
+        actions = ["CHECK"] + [f"BET {round(pot * size, 1)}" for size in bet_sizes]
+    frequencies = np.round(rng.dirichlet(np.ones(len(actions)), size=len(combos[player])), 3)
+
+    childrens = {}
+    if depth > 1:
+        other = IP if player == OOP else OOP
+        for action in actions:
+            name, _, amount = action.partition(" ")
+            if name in ("FOLD", "CALL") or (name == "CHECK" and checked):
+                continue
+            bet = float(amount) if amount else 0.0
+            childrens[action] = build_tree(rng, combos, other, pot + bet, bet, name == "CHECK", depth - 1, bet_sizes)
+
+    node = {
+        "node_type": "action_node",
+        "player": player,
+        "actions": actions,
+        "strategy": {
+            "actions": actions,
+            "strategy": {combo_str(int(i)): row.tolist() for i, row in zip(combos[player], frequencies)},
+        },
+    }
+    if childrens:
+        node["childrens"] = childrens
+    return node
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake TexasSolverConsole for benchmarks")
+    parser.add_argument("--board", required=True)
+    parser.add_argument("--oop-range", required=True)
+    parser.add_argument("--ip-range", required=True)
+    parser.add_argument("--pot-size", type=float, default=10.0)
+    parser.add_argument("--effective-stack", type=float, default=95.0)
+    parser.add_argument("--position", default="oop")
+    parser.add_argument("--accuracy", type=float, default=0.3)
+    parser.add_argument("--max-iterations", type=int, default=200)
+    parser.add_argument("--thread-count", type=int, default=1)
+    parser.add_argument("--bet-sizes", default=None, help="JSON; the first list is used as pot fractions")
+    parser.add_argument("--use-isomorphism", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        board = parse_board(args.board)
+        combos = {
+            OOP: np.nonzero(remove_cards(parse_range(args.oop_range), board))[0],
+            IP: np.nonzero(remove_cards(parse_range(args.ip_range), board))[0],
+        }
+    except ValueError as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        return 1
+
+    bet_sizes = [0.5, 1.0]
+    if args.bet_sizes:
+        lists = [v for v in json.loads(args.bet_sizes).values() if isinstance(v, list) and v]
+        if lists:
+            bet_sizes = [float(size) for size in lists[0]]
+
+    # Converge like a real run would: stop at the target accuracy or the iteration cap
+    iterations = args.max_iterations
+    for i in range(args.max_iterations):
+        if exploitability(i) <= args.accuracy:
+            iterations = i + 1
+            break
+    step = FAKE_SOLVER_SECONDS / max(iterations, 1)
+
+    print(f"Solving board {args.board} with {args.thread_count} threads", flush=True)
+    for i in range(0, iterations, REPORT_EVERY):
+        wait(step * min(REPORT_EVERY, iterations - i))
+        done = min(i + REPORT_EVERY, iterations)
+        print(f"Iter: {done} exploitability: {exploitability(done - 1):.4f}", flush=True)
+
+    seed = zlib.crc32(" ".join(sys.argv[1:]).encode())
+    rng = np.random.default_rng(seed)
+    root_player = OOP if args.position == "oop" else IP
+    tree = build_tree(rng, combos, root_player, args.pot_size, 0.0, False, FAKE_SOLVER_DEPTH, bet_sizes)
+    print(json.dumps(tree, separators=(",", ":")), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Closed-loop load generator for the solver API (main.py) and the poker API.
+
+Builds a deterministic request schedule (seeded) from a mix of endpoints,
+sends it with `--concurrency` workers and writes p50/p95/p99 latency and
+throughput per endpoint as JSON, so runs on different commits can be
+diffed:
+
+    python -m benchmarks.load_generator --mix decision=8,equity=1,solve=1 \\
+        --poker-url http://localhost:8000 --solver-url http://localhost:8001 \\
+        --concurrency 8 --requests 500 --output bench.json --baseline bench_before.json
+
+`--repeat-ratio` sends that share of decisions and solves from a small hot
+set, to exercise the decision and solution caches. The same seed gives the
+same schedule, so restart both servers between runs to start from cold caches.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from cards import card_str
+from data_store import has_split, iter_batches
+
+DEFAULT_MIX = "decision=8,equity=1,solve=1"
+DEFAULT_REPORT = "bench_report.json"
+ENDPOINTS = {
+    "decision": ("poker", "/poker/decision"),
+    "equity": ("solver", "/equity"),
+    "solve": ("solver", "/solve"),
+}
+
+# (oop_range, ip_range) pairs for /solve
+SOLVE_RANGES = [
+    ("22+,A2s+,K9s+,QTs+,JTs,ATo+,KQo", "22+,A2s+,K2s+,Q8s+,J8s+,T8s+,98s,A8o+,KTo+,QJo"),
+    ("TT+,AQs+,AKo", "88+,ATs+,KQs,AQo+"),
+    ("QQ+,AKs,A5s", "JJ-22,AQs-A2s,KQs,QJs,JTs,T9s,98s,87s,AQo"),
+]
+EQUITY_RANGES = ["QQ+,AK", "TT+,AJs+,KQs,AQo+", "22+,A2s+,KTs+,ATo+"]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """"decision=8,solve=1" -> normalized endpoint weights"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Mix weights must add up to more than 0")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def load_prompts(split: str, limit: int) -> List[str]:
+    """PokerBench prompts for /poker/decision"""
+    if not has_split(split):
+        print(f"PokerBench {split} split not found (run explore_dataset.py); using the example prompt only")
+        from test_api import example_game_state
+        return [example_game_state.strip()]
+    prompts = []
+    for batch in iter_batches(split, columns=["instruction"], stop=limit):
+        prompts.extend(batch["instruction"])
+    return prompts
+
+
+def random_cards(rng: random.Random, count: int) -> List[str]:
+    return [card_str(card) for card in rng.sample(range(52), count)]
+
+
+def decision_payload(rng: random.Random, prompts: List[str]) -> dict:
+    return {"game_state": rng.choice(prompts)}
+
+
+def equity_payload(rng: random.Random) -> dict:
+    cards = random_cards(rng, 2 + rng.choice([0, 3, 4, 5]))
+    payload = {"hero": "".join(cards[:2]), "board": ",".join(cards[2:]), "iterations": 50000,
+               "seed": rng.randrange(2 ** 31)}
+    if rng.random() < 0.5:
+        payload["ranges"] = [rng.choice(EQUITY_RANGES) for _ in range(rng.randint(1, 2))]
+    else:
+        payload["opponents"] = rng.randint(1, 3)
+    return payload
+
+
+def solve_payload(rng: random.Random, max_iterations: int) -> dict:
+    oop_range, ip_range = rng.choice(SOLVE_RANGES)
+    return {"board": ",".join(random_cards(rng, 3)), "oop_range": oop_range, "ip_range": ip_range,
+            "max_iterations": max_iterations, "thread_count": 1}
+
+
+def build_schedule(mix: Dict[str, float], count: int, prompts: List[str], repeat_ratio: float,
+                   hot_set: int, solve_iterations: int, seed: int) -> List[Tuple[str, dict]]:
+    """Deterministic list of (endpoint, payload) requests"""
+    rng = random.Random(seed)
+    names = list(mix)
+    hot = {
+        "decision": [decision_payload(rng, prompts) for _ in range(hot_set)],
+        "solve": [solve_payload(rng, solve_iterations) for _ in range(hot_set)],
+    }
+    schedule = []
+    for name in rng.choices(names, weights=[mix[n] for n in names], k=count):
+        if name in hot and rng.random() < repeat_ratio:
+            payload = rng.choice(hot[name])
+        elif name == "decision":
+            payload = decision_payload(rng, prompts)
+        elif name == "equity":
+            payload = equity_payload(rng)
+        else:
+            payload = solve_payload(rng, solve_iterations)
+        schedule.append((name, payload))
+    return schedule
+
+
+def run_schedule(schedule: List[Tuple[str, dict]], urls: Dict[str, str], concurrency: int,
+                 timeout: float) -> Tuple[List[dict], float]:
+    """Send every request with `concurrency` workers; returns per-request records and wall time"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def send(item):
+        name, payload = item
+        service, path = ENDPOINTS[name]
+        record = {"endpoint": name}
+        start = time.perf_counter()
+        try:
+            response = session.post(urls[service] + path, json=payload, timeout=timeout)
+            record["status"] = str(response.status_code)
+            if response.ok and name == "decision":
+                record["source"] = response.json().get("source")
+        except requests.RequestException as e:
+            record["status"] = "error"
+            record["error"] = type(e).__name__
+        record["latency"] = time.perf_counter() - start
+        return record
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        records = list(executor.map(send, schedule))
+    return records, time.perf_counter() - start
+
+
+def summarize(records: List[dict], elapsed: float) -> dict:
+    """Latency percentiles (successful requests only), error and status counts"""
+    ok = np.array([r["latency"] for r in records if r["status"].startswith("2")]) * 1000
+    summary = {
+        "requests": len(records),
+        "errors": sum(not r["status"].startswith("2") for r in records),
+        "status": dict(sorted(Counter(r["status"] for r in records).items())),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed > 0 else 0.0,
+    }
+    if len(ok):
+        p50, p95, p99 = np.percentile(ok, [50, 95, 99])
+        summary.update(p50_ms=round(float(p50), 3), p95_ms=round(float(p95), 3), p99_ms=round(float(p99), 3),
+                       mean_ms=round(float(ok.mean()), 3), max_ms=round(float(ok.max()), 3))
+    sources = Counter(r["source"] for r in records if r.get("source"))
+    if sources:
+        summary["sources"] = dict(sorted(sources.items()))
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict):
+    """Print per-endpoint latency and throughput changes against an earlier report"""
+    print(f"\nChange vs baseline ({baseline.get('commit')} -> {report.get('commit')}):")
+    for name, stats in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if key in stats and before.get(key):
+                delta = (stats[key] - before[key]) / before[key] * 100
+                changes.append(f"{key} {before[key]:.1f} -> {stats[key]:.1f} ({delta:+.1f}%)")
+        print(f"  {name:<9} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the solver and poker APIs")
+    parser.add_argument("--poker-url", default="http://localhost:8000")
+    parser.add_argument("--solver-url", default="http://localhost:8001")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. decision=8,equity=1,solve=1")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent first and left out of the report")
+    parser.add_argument("--split", default="test", help="PokerBench split to draw prompts from")
+    parser.add_argument("--prompt-limit", type=int, default=2000)
+    parser.add_argument("--repeat-ratio", type=float, default=0.0,
+                        help="Share of decisions and solves drawn from a hot set (cache hits)")
+    parser.add_argument("--hot-set", type=int, default=20)
+    parser.add_argument("--solve-iterations", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_REPORT)
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    prompts = load_prompts(args.split, args.prompt_limit) if "decision" in mix else []
+    schedule = build_schedule(mix, args.warmup + args.requests, prompts, args.repeat_ratio, args.hot_set,
+                              args.solve_iterations, args.seed)
+    urls = {"poker": args.poker_url.rstrip("/"), "solver": args.solver_url.rstrip("/")}
+
+    if args.warmup:
+        print(f"Warming up with {args.warmup} requests...")
+        run_schedule(schedule[:args.warmup], urls, args.concurrency, args.timeout)
+    print(f"Sending {args.requests} requests at concurrency {args.concurrency}...")
+    records, elapsed = run_schedule(schedule[args.warmup:], urls, args.concurrency, args.timeout)
+
+    by_endpoint = defaultdict(list)
+    for record in records:
+        by_endpoint[record["endpoint"]].append(record)
+    report = {
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "duration_s": round(elapsed, 3),
+        "overall": summarize(records, elapsed),
+        "endpoints": {name: summarize(by_endpoint[name], elapsed) for name in sorted(by_endpoint)},
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for name, stats in [("overall", report["overall"])] + list(report["endpoints"].items()):
+        if "p50_ms" in stats:
+            print(f"{name:<9} {stats['requests']:>6} req  {stats['errors']:>4} err  "
+                  f"p50 {stats['p50_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms  p99 {stats['p99_ms']:9.1f} ms  "
+                  f"{stats['throughput_rps']:8.1f} req/s")
+        else:
+            print(f"{name:<9} {stats['requests']:>6} req  {stats['errors']:>4} err  (no successful requests)")
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
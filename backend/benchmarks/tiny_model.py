@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Build a tiny random-weight causal LM for benchmarking the poker API.
+
+The model is a small Llama (the same decoder layout as Phi-3) saved in the
+merged checkpoint format of model_export.py, with a byte-level BPE
+tokenizer trained on PokerBench prompts (or a copy of an existing
+tokenizer), so the API loads and serves it exactly like the real model:
+
+    python -m benchmarks.tiny_model --output ./poker-tiny-merged
+    POKER_MODEL_FORMAT=merged POKER_MODEL_PATH=./poker-tiny-merged python poker_api.py
+
+Decisions are meaningless; tokenization, batching, prefix caching and
+action scoring all run the real code paths at a fraction of the cost.
+"""
+
+import argparse
+import time
+from typing import Optional
+
+import torch
+
+from data_store import has_split, iter_batches
+from model_export import save_merged_model
+
+TINY_MODEL_NAME = "tiny-random-llama"
+
+
+def training_corpus(rows: int):
+    """PokerBench prompts and answers to fit the tokenizer on"""
+    if rows and has_split("train"):
+        for batch in iter_batches("train", columns=["instruction", "output"], stop=rows):
+            yield from batch["instruction"]
+            yield from batch["output"]
+    else:
+        print("PokerBench data not found (run explore_dataset.py); fitting the tokenizer on the example prompt")
+        from test_api import example_game_state
+        yield example_game_state
+
+
+def train_tokenizer(vocab_size: int, rows: int):
+    """Byte-level BPE tokenizer with an eos token, wrapped like a pretrained HF tokenizer"""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=["<unk>", "<|endoftext|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    tokenizer.train_from_iterator(training_corpus(rows), trainer)
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<|endoftext|>", unk_token="<unk>")
+
+
+def build_tiny_model(output_path: str, dtype: str = "bf16", hidden_size: int = 64, layers: int = 2,
+                     heads: int = 4, vocab_size: int = 2000, tokenizer_name: Optional[str] = None,
+                     corpus_rows: int = 5000, seed: int = 0):
+    """Save a random-weight Llama and its tokenizer as a merged checkpoint"""
+    from transformers import AutoTokenizer, LlamaConfig, LlamaForCausalLM
+
+    if tokenizer_name:
+        print(f"Copying tokenizer from {tokenizer_name}...")
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, trust_remote_code=True)
+    else:
+        print(f"Training a {vocab_size}-token BPE tokenizer...")
+        tokenizer = train_tokenizer(vocab_size, corpus_rows)
+
+    config = LlamaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 2,
+        num_hidden_layers=layers,
+        num_attention_heads=heads,
+        num_key_value_heads=heads,
+        max_position_embeddings=4096,
+        eos_token_id=tokenizer.eos_token_id,
+        bos_token_id=tokenizer.bos_token_id if tokenizer.bos_token_id is not None else tokenizer.eos_token_id,
+    )
+    torch.manual_seed(seed)
+    model = LlamaForCausalLM(config)
+    model.eval()
+    print(f"Random model: {sum(p.numel() for p in model.parameters()):,} parameters")
+
+    save_merged_model(model, tokenizer, output_path, dtype, TINY_MODEL_NAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a tiny random-weight poker model for benchmarks")
+    parser.add_argument("--output", default="./poker-tiny-merged")
+    parser.add_argument("--dtype", choices=["int8", "bf16"], default="bf16")
+    parser.add_argument("--hidden", type=int, default=64, help="Hidden size")
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--heads", type=int, default=4)
+    parser.add_argument("--vocab-size", type=int, default=2000, help="Size of the trained BPE vocabulary")
+    parser.add_argument("--tokenizer", default=None,
+                        help="Reuse an existing tokenizer (e.g. ./poker-phi3-final) instead of training one")
+    parser.add_argument("--corpus-rows", type=int, default=5000, help="PokerBench rows to fit the tokenizer on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.time()
+    build_tiny_model(args.output, args.dtype, args.hidden, args.layers, args.heads, args.vocab_size,
+                     args.tokenizer, args.corpus_rows, args.seed)
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import itertools
+import re
+from typing import List, Sequence, Tuple
+
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+
+# Every relabelling of the four suits, as tuples mapping suit index -> suit index
+SUIT_PERMUTATIONS: List[Tuple[int, ...]] = list(itertools.permutations(range(4)))
+
+# Whole tokens made only of cards, e.g. "Qs" or "AsKs" (but not the "Ac" in "Action")
+CARD_TOKEN_RE = re.compile(r"(?<![A-Za-z0-9])(?:[2-9TJQKA][cdhs])+(?![A-Za-z0-9])")
+CARD_RE = re.compile(r"[2-9TJQKA][cdhs]")
+
+
+def parse_card(card: str) -> int:
+    """Convert a card string like "Qs" to an integer 0-51 (rank * 4 + suit)"""
+    card = card.strip()
+    if len(card) != 2 or card[0].upper() not in RANKS or card[1].lower() not in SUITS:
+        raise ValueError(f"Invalid card: {card!r}")
+    return RANKS.index(card[0].upper()) * 4 + SUITS.index(card[1].lower())
+
+
+def parse_cards(text: str) -> List[int]:
+    """Parse cards written together or separated by commas/spaces, e.g. "AsKs" or "As, Ks" """
+    compact = re.sub(r"[\s,]", "", text)
+    if len(compact) % 2:
+        raise ValueError(f"Invalid cards: {text!r}")
+    return [parse_card(compact[i:i + 2]) for i in range(0, len(compact), 2)]
+
+
+def card_str(card: int) -> str:
+    """Convert an integer card back to its string form"""
+    return RANKS[card >> 2] + SUITS[card & 3]
+
+
+def parse_board(board: str) -> List[int]:
+    """Parse a comma separated board like "Qs,Jh,2h" """
+    return [parse_card(c) for c in board.split(",") if c.strip()]
+
+
+def permute_card(card: int, perm: Sequence[int]) -> int:
+    return (card & ~3) | perm[card & 3]
+
+
+def invert_permutation(perm: Sequence[int]) -> Tuple[int, ...]:
+    inverse = [0] * 4
+    for src, dst in enumerate(perm):
+        inverse[dst] = src
+    return tuple(inverse)
+
+
+def permute_text(text: str, perm: Sequence[int]) -> str:
+    """Relabel the suits of every card token appearing in free text or JSON"""
+    def _card(match):
+        return card_str(permute_card(parse_card(match.group(0)), perm))
+
+    def _token(match):
+        return CARD_RE.sub(_card, match.group(0))
+
+    return CARD_TOKEN_RE.sub(_token, text)
+
+
+# Fixed ordering of all 1326 two-card combos, (high card, low card) by card index
+COMBOS: List[Tuple[int, int]] = [(hi, lo) for hi in range(52) for lo in range(hi)]
+COMBO_INDEX = {combo: i for i, combo in enumerate(COMBOS)}
+
+
+def combo_index(card1: int, card2: int) -> int:
+    """Position of a two-card combo in the fixed 1326-combo ordering"""
+    if card1 == card2:
+        raise ValueError("A combo needs two different cards")
+    return COMBO_INDEX[(card1, card2) if card1 > card2 else (card2, card1)]
+
+
+def parse_combo(combo: str) -> int:
+    """Combo index of a string like "AsKs" """
+    combo = combo.strip()
+    if len(combo) != 4:
+        raise ValueError(f"Invalid combo: {combo!r}")
+    return combo_index(parse_card(combo[:2]), parse_card(combo[2:]))
+
+
+def combo_str(index: int) -> str:
+    hi, lo = COMBOS[index]
+    return card_str(hi) + card_str(lo)
@@ -0,0 +1,138 @@
+"""
+Local PokerBench data store.
+
+Each split is written as a directory of uncompressed Arrow IPC stream shards
+(the format HuggingFace datasets uses for its own cache files) plus a
+manifest:
+
+    poker_data/train/manifest.json
+    poker_data/train/shard-00000.arrow
+    ...
+
+Shards are memory-mapped when read, so loading a split costs neither time
+nor RSS proportional to its size, and only the requested columns are touched.
+Training, evaluation and the API all read the data through this module.
+"""
+
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pyarrow as pa
+
+DATA_DIR = os.environ.get("POKER_DATA_DIR", "./poker_data")
+SHARD_ROWS = 50_000
+MANIFEST = "manifest.json"
+
+
+def split_dir(split: str, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, split)
+
+
+def has_split(split: str, data_dir: str = DATA_DIR) -> bool:
+    return os.path.exists(os.path.join(split_dir(split, data_dir), MANIFEST))
+
+
+def read_manifest(split: str, data_dir: str = DATA_DIR) -> dict:
+    path = os.path.join(split_dir(split, data_dir), MANIFEST)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No '{split}' split in {data_dir}. Run explore_dataset.py first.")
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_split(dataset, split: str, data_dir: str = DATA_DIR, shard_rows: int = SHARD_ROWS,
+                 batch_size: int = 10_000) -> dict:
+    """
+    Stream a HuggingFace Dataset (or any iterable of column dicts) into Arrow shards
+
+    Rows are written batch by batch, so memory use does not depend on the
+    size of the split.
+    """
+    out_dir = split_dir(split, data_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    batches = dataset.iter(batch_size=batch_size) if hasattr(dataset, "iter") else dataset
+
+    shards: List[dict] = []
+    writer, schema, shard_count = None, None, 0
+
+    def close_shard():
+        nonlocal writer
+        if writer is not None:
+            writer.close()
+            shards[-1]["rows"] = shard_count
+            writer = None
+
+    for batch in batches:
+        record_batch = pa.RecordBatch.from_pydict(batch, schema=schema)
+        schema = record_batch.schema
+        offset = 0
+        while offset < record_batch.num_rows:
+            if writer is None:
+                name = f"shard-{len(shards):05d}.arrow"
+                writer = pa.ipc.new_stream(os.path.join(out_dir, name), schema)
+                shards.append({"file": name, "rows": 0})
+                shard_count = 0
+            take = min(shard_rows - shard_count, record_batch.num_rows - offset)
+            writer.write_batch(record_batch.slice(offset, take))
+            shard_count += take
+            offset += take
+            if shard_count >= shard_rows:
+                close_shard()
+    close_shard()
+
+    manifest = {
+        "split": split,
+        "rows": sum(s["rows"] for s in shards),
+        "columns": schema.names if schema is not None else [],
+        "shards": shards,
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def open_shard(path: str, columns: Optional[Sequence[str]] = None) -> pa.Table:
+    """Memory-map one shard, projecting to the given columns"""
+    table = pa.ipc.open_stream(pa.memory_map(path, "r")).read_all()
+    return table.select(list(columns)) if columns else table
+
+
+def shard_paths(split: str, data_dir: str = DATA_DIR) -> List[str]:
+    manifest = read_manifest(split, data_dir)
+    return [os.path.join(split_dir(split, data_dir), s["file"]) for s in manifest["shards"]]
+
+
+def load_table(split: str, columns: Optional[Sequence[str]] = None, data_dir: str = DATA_DIR) -> pa.Table:
+    """Whole split as one zero-copy Arrow table"""
+    return pa.concat_tables([open_shard(p, columns) for p in shard_paths(split, data_dir)])
+
+
+def load_split(split: str, columns: Optional[Sequence[str]] = None, data_dir: str = DATA_DIR):
+    """Whole split as a memory-mapped HuggingFace Dataset"""
+    from datasets import Dataset
+    from datasets.table import MemoryMappedTable, concat_tables
+
+    tables = []
+    for path in shard_paths(split, data_dir):
+        table = MemoryMappedTable.from_file(path)
+        tables.append(table.select(list(columns)) if columns else table)
+    return Dataset(concat_tables(tables))
+
+
+def iter_batches(split: str, columns: Optional[Sequence[str]] = None, batch_size: int = 1024,
+                 start: int = 0, stop: Optional[int] = None, data_dir: str = DATA_DIR) -> Iterator[Dict[str, list]]:
+    """Stream rows [start, stop) of a split as column dicts, one shard mapped at a time"""
+    position = 0
+    for path in shard_paths(split, data_dir):
+        table = open_shard(path, columns)
+        shard_start, shard_end = position, position + table.num_rows
+        position = shard_end
+        if shard_end <= start:
+            continue
+        if stop is not None and shard_start >= stop:
+            break
+        lo = max(start - shard_start, 0)
+        hi = table.num_rows if stop is None else min(stop - shard_start, table.num_rows)
+        for offset in range(lo, hi, batch_size):
+            yield table.slice(offset, min(batch_size, hi - offset)).to_pydict()
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from caching import DiskCache, LRUCache
+from data_store import iter_batches
+from game_state import encode_text
+
+# Cache configuration (override with environment variables, empty dir disables the disk tier)
+DECISION_CACHE_SIZE = int(os.environ.get("POKER_DECISION_CACHE_SIZE", 10000))
+DECISION_CACHE_TTL = float(os.environ.get("POKER_DECISION_CACHE_TTL", 3600))
+DECISION_CACHE_DIR = os.environ.get("POKER_DECISION_CACHE_DIR", "")
+DECISION_CACHE_MAX_BYTES = int(os.environ.get("POKER_DECISION_CACHE_MAX_BYTES", 256 << 20))
+
+REQUEST_HEADER = "### Poker Decision Request:"
+ACTION_HEADER = "### Optimal Action:"
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_game_state(game_state: str) -> str:
+    """Canonical text of a game state: prompt headers removed, whitespace collapsed"""
+    text = game_state.strip()
+    if text.startswith(REQUEST_HEADER):
+        text = text[len(REQUEST_HEADER):]
+    if text.rstrip().endswith(ACTION_HEADER):
+        text = text.rstrip()[:-len(ACTION_HEADER)]
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def decision_key(game_state: str, legal_actions: Optional[Iterable[str]] = None, model_id: str = "") -> str:
+    """Hash of everything that determines a decision"""
+    # PokerBench prompts key on their parsed state, so rewordings of one spot share an entry
+    encoded = encode_text(game_state)
+    payload = {
+        "state": encoded.tobytes().hex() if encoded is not None else normalize_game_state(game_state),
+        "legal_actions": sorted(a.strip().lower() for a in legal_actions) if legal_actions else None,
+        "model": model_id,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class DecisionCache:
+    """
+    Decisions by normalized game state: a TTL'd in-memory LRU with an
+    optional on-disk tier that survives restarts.
+    """
+
+    def __init__(self, max_entries: int = DECISION_CACHE_SIZE, ttl: float = DECISION_CACHE_TTL,
+                 directory: Optional[str] = DECISION_CACHE_DIR, max_bytes: int = DECISION_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries, ttl=ttl)
+        self.disk = DiskCache(directory, max_bytes) if directory else None
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[dict]]]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None and self.ttl:
+                # Promote with the TTL left since the decision was made, not a fresh one
+                remaining = self.ttl - (time.time() - entry["created"])
+                if remaining <= 0:
+                    entry = None
+                else:
+                    self.memory.put(key, entry, ttl=remaining)
+            elif entry is not None:
+                self.memory.put(key, entry)
+        if entry is None:
+            return None
+        return entry["action"], entry["probabilities"]
+
+    def put(self, key: str, action: str, probabilities: Optional[dict]):
+        entry = {"action": action, "probabilities": probabilities, "created": time.time()}
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+def load_test_instructions(limit: Optional[int] = None) -> List[str]:
+    """Game states from the local PokerBench test split"""
+    instructions = []
+    for batch in iter_batches("test", columns=["instruction"], stop=limit):
+        instructions.extend(batch["instruction"])
+    return instructions
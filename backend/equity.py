@@ -0,0 +1,179 @@
+"""
+All-in equity of a hero hand against one or more opponent ranges.
+
+Small spots (few unknown cards, e.g. on the turn or river) are enumerated
+exactly: every opponent holding is weighted by its range weight and every
+runout is dealt. Larger spots use batched Monte Carlo: opponents are drawn
+from their ranges, runouts come from an argpartition of random keys over the
+live deck, and all hands of a batch are ranked with one evaluate_batch call.
+Sampling stops early once the standard error reaches the target.
+"""
+
+import itertools
+import math
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from hand_evaluator import evaluate_batch
+from ranges import COMBO_CARDS, COMBO_MASKS, NUM_COMBOS, remove_cards
+
+EQUITY_BATCH = 10_000
+MIN_SAMPLES = 2 * EQUITY_BATCH
+
+# Enumerate exactly when (runouts x opponent holdings) stays below this
+EXACT_LIMIT = int(os.environ.get("EQUITY_EXACT_LIMIT", 1_500_000))
+
+
+def _showdown(hero_ranks: np.ndarray, opponent_ranks: np.ndarray):
+    """Hero's pot share, outright wins and ties; opponent_ranks has opponents on axis 1"""
+    best = opponent_ranks.max(axis=1)
+    win = hero_ranks > best
+    tie = hero_ranks == best
+    splits = (opponent_ranks == np.expand_dims(hero_ranks, 1)).sum(axis=1) + 1
+    return np.where(win, 1.0, np.where(tie, 1.0 / splits, 0.0)), win, tie
+
+
+def count_holdings(ranges: Sequence[np.ndarray]) -> int:
+    """Upper bound on the joint opponent holdings (ignoring conflicts between opponents)"""
+    return math.prod(int(np.count_nonzero(w)) for w in ranges)
+
+
+def exact_equity(hero: List[int], board: List[int], ranges: Sequence[np.ndarray]) -> dict:
+    """Enumerate every opponent holding and runout"""
+    dead = set(hero) | set(board)
+    missing = 5 - len(board)
+    deck = [c for c in range(52) if c not in dead]
+    dealt = list(itertools.combinations(deck, missing))
+    runouts = np.array(dealt, dtype=np.int64).reshape(len(dealt), missing)
+    runout_masks = (np.int64(1) << runouts).sum(axis=1)
+    boards = np.hstack([np.tile(np.array(board, dtype=np.int64), (len(runouts), 1)), runouts])
+    hero_ranks = evaluate_batch(np.hstack([np.tile(np.array(hero, dtype=np.int64), (len(boards), 1)), boards]))
+
+    # Joint opponent holdings without shared cards, with their combined weight
+    holdings = np.zeros((1, 0), dtype=np.int64)
+    weights = np.ones(1)
+    masks = np.zeros(1, dtype=np.int64)
+    for w in ranges:
+        live = np.flatnonzero(w)
+        rows, cols = np.nonzero((masks[:, None] & COMBO_MASKS[live][None, :]) == 0)
+        holdings = np.hstack([holdings[rows], live[cols, None]])
+        weights = weights[rows] * w[live[cols]]
+        masks = masks[rows] | COMBO_MASKS[live[cols]]
+
+    # Rank of every combo that appears on every runout it doesn't conflict with
+    used, positions = np.unique(holdings, return_inverse=True)
+    positions = positions.reshape(holdings.shape)
+    valid = (COMBO_MASKS[used][:, None] & runout_masks[None, :]) == 0
+    combo_rows, runout_cols = np.nonzero(valid)
+    table = np.zeros(valid.shape, dtype=np.int16)
+    table[combo_rows, runout_cols] = evaluate_batch(np.hstack([COMBO_CARDS[used[combo_rows]], boards[runout_cols]]))
+
+    total = share_sum = win_sum = tie_sum = 0.0
+    chunk = max(1, EXACT_LIMIT // max(len(runouts), 1))
+    for start in range(0, len(holdings), chunk):
+        end = start + chunk
+        ok = (masks[start:end, None] & runout_masks[None, :]) == 0
+        opponent_ranks = table[positions[start:end]]  # (holdings, opponents, runouts)
+        share, win, tie = _showdown(hero_ranks[None, :], opponent_ranks)
+        w = weights[start:end, None] * ok
+        total += w.sum()
+        share_sum += (w * share).sum()
+        win_sum += (w * win).sum()
+        tie_sum += (w * (tie & ~win)).sum()
+
+    if total == 0:
+        raise ValueError("No opponent holding is possible with these cards")
+    return {
+        "equity": float(share_sum / total),
+        "win": float(win_sum / total),
+        "tie": float(tie_sum / total),
+        "stderr": 0.0,
+        "samples": int(len(holdings) * len(runouts)),
+        "method": "exact",
+    }
+
+
+def monte_carlo_equity(hero: List[int], board: List[int], ranges: Sequence[np.ndarray], iterations: int,
+                       target_stderr: float = 0.0, seed: Optional[int] = None) -> dict:
+    """Batched Monte Carlo with early stopping on the standard error"""
+    rng = np.random.default_rng(seed)
+    missing = 5 - len(board)
+    dead = np.array(hero + board, dtype=np.int64)
+    probabilities = [w / w.sum() for w in ranges]
+
+    attempted = samples = 0
+    share_sum = share_sq = win_sum = tie_sum = 0.0
+    stderr = float("inf")
+    while attempted < iterations:
+        size = min(EQUITY_BATCH, iterations - attempted)
+        attempted += size
+
+        combos = np.stack([rng.choice(NUM_COMBOS, size=size, p=p) for p in probabilities], axis=1)
+        opponent_cards = COMBO_CARDS[combos].reshape(size, -1)
+        if len(ranges) > 1:
+            # Opponents drawn independently may collide; dropping those samples conditions on a legal deal
+            ordered = np.sort(opponent_cards, axis=1)
+            keep = (np.diff(ordered, axis=1) != 0).all(axis=1)
+            opponent_cards = opponent_cards[keep]
+        if len(opponent_cards) == 0:
+            continue
+
+        keys = rng.random((len(opponent_cards), 52))
+        keys[:, dead] = 2.0
+        np.put_along_axis(keys, opponent_cards, 2.0, axis=1)
+        runouts = np.argpartition(keys, missing - 1, axis=1)[:, :missing] if missing else keys[:, :0].astype(np.int64)
+        boards = np.hstack([np.tile(np.array(board, dtype=np.int64), (len(runouts), 1)), runouts])
+
+        hero_ranks = evaluate_batch(np.hstack([np.tile(np.array(hero, dtype=np.int64), (len(boards), 1)), boards]))
+        opponent_ranks = np.stack([
+            evaluate_batch(np.hstack([opponent_cards[:, 2 * j:2 * j + 2], boards])) for j in range(len(ranges))
+        ], axis=1)
+        share, win, tie = _showdown(hero_ranks, opponent_ranks)
+
+        samples += len(share)
+        share_sum += share.sum()
+        share_sq += (share * share).sum()
+        win_sum += win.sum()
+        tie_sum += (tie & ~win).sum()
+
+        mean = share_sum / samples
+        variance = max(share_sq / samples - mean * mean, 0.0)
+        stderr = math.sqrt(variance / max(samples - 1, 1))
+        if target_stderr and samples >= MIN_SAMPLES and stderr <= target_stderr:
+            break
+
+    if samples == 0:
+        raise ValueError("Could not deal any legal hand for these ranges")
+    return {
+        "equity": float(share_sum / samples),
+        "win": float(win_sum / samples),
+        "tie": float(tie_sum / samples),
+        "stderr": stderr,
+        "samples": samples,
+        "method": "monte_carlo",
+    }
+
+
+def calculate_equity(hero: List[int], board: List[int], ranges: Sequence[np.ndarray], iterations: int = 200_000,
+                     target_stderr: float = 0.001, seed: Optional[int] = None) -> dict:
+    """Hero equity against each opponent range, exactly when the spot is small enough"""
+    if len(hero) != 2:
+        raise ValueError("Hero needs exactly two cards")
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("Board must have 0, 3, 4 or 5 cards")
+    if len(set(hero) | set(board)) != len(hero) + len(board):
+        raise ValueError("Hero and board cards must be distinct")
+    if not ranges:
+        raise ValueError("At least one opponent is required")
+
+    ranges = [remove_cards(w, hero + board) for w in ranges]
+    for i, w in enumerate(ranges):
+        if not w.any():
+            raise ValueError(f"Opponent {i + 1} has no possible hands with these cards")
+
+    runouts = math.comb(50 - len(board), 5 - len(board))
+    if runouts * count_holdings(ranges) <= EXACT_LIMIT:
+        return exact_equity(hero, board, ranges)
+    return monte_carlo_equity(hero, board, ranges, iterations, target_stderr, seed)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Evaluate the poker model on the PokerBench test split.
+
+Runs every test prompt through either the in-process model (split across
+worker processes, each with its own share of the CPU threads) or a running
+`/poker/decision` server, and reports exact-match and action-category
+accuracy, bet-size error and throughput.
+
+Predictions are appended to a checkpoint file as they complete, so an
+interrupted run picks up where it stopped:
+
+    python evaluate_model.py --backend local --workers 4
+    python evaluate_model.py --backend http --url http://localhost:8000 --workers 16
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from data_store import iter_batches, read_manifest
+from poker_actions import parse_action
+
+DEFAULT_CHECKPOINT = "eval_checkpoint.jsonl"
+DEFAULT_REPORT = "eval_report.json"
+
+# Set in each local worker process by _init_local_worker
+_tokenizer = None
+
+
+def normalize_action(action: str) -> str:
+    return " ".join((action or "").lower().split())
+
+
+def load_checkpoint(path: str) -> Dict[int, dict]:
+    """Predictions already made by an earlier run, keyed by test index"""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line of an interrupted run
+                done[record["index"]] = record
+    return done
+
+
+def pending_batches(batch_size: int, done: Dict[int, dict], limit: Optional[int]) -> Iterator[List[Tuple[int, str, str]]]:
+    """(index, instruction, target) batches of the test split that still need a prediction"""
+    batch, index = [], 0
+    for rows in iter_batches("test", columns=["instruction", "output"], stop=limit):
+        for instruction, output in zip(rows["instruction"], rows["output"]):
+            if index not in done:
+                batch.append((index, instruction, output))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            index += 1
+    if batch:
+        yield batch
+
+
+def count_prompt_tokens(tokenizer, instructions: List[str]) -> int:
+    from poker_api import format_poker_prompt
+
+    if tokenizer is None:
+        return 0
+    prompts = [format_poker_prompt(inst) for inst in instructions]
+    return sum(len(ids) for ids in tokenizer(prompts)["input_ids"])
+
+
+def _init_local_worker(num_threads: int, ready=None):
+    """Load the model once per worker process"""
+    global _tokenizer
+    import torch
+    import poker_api
+
+    torch.set_num_threads(num_threads)
+    try:
+        poker_api.load_poker_model()
+    except Exception:
+        if ready is not None:
+            ready.abort()
+        raise
+    _tokenizer = poker_api.tokenizer
+    if ready is not None:
+        ready.wait()
+
+
+def _predict_local(batch: List[Tuple[int, str, str]]) -> List[dict]:
+    import poker_api
+
+    instructions = [inst for _, inst, _ in batch]
+    decisions = poker_api.run_decision_batch([poker_api.PokerRequest(game_state=inst) for inst in instructions])
+    tokens = count_prompt_tokens(_tokenizer, instructions)
+    return [
+        {"index": index, "target": target, "prediction": action, "tokens": tokens / len(batch)}
+        for (index, _, target), (action, _) in zip(batch, decisions)
+    ]
+
+
+def _drain_pool(pool, batches: Iterator[List[Tuple[int, str, str]]]) -> Iterator[List[dict]]:
+    try:
+        yield from pool.imap_unordered(_predict_local, batches)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def run_local(batches: Iterator[List[Tuple[int, str, str]]], workers: int) -> Iterator[List[dict]]:
+    """Predict with the in-process model, one model copy per worker process"""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    if workers == 1:
+        _init_local_worker(threads)
+        return map(_predict_local, batches)
+
+    import multiprocessing
+    from threading import BrokenBarrierError
+
+    # Workers load the model before the clock starts
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(workers + 1)
+    pool = context.Pool(workers, initializer=_init_local_worker, initargs=(threads, ready))
+    try:
+        ready.wait()
+    except BrokenBarrierError:
+        pool.terminate()
+        raise RuntimeError("A worker failed to load the model")
+    return _drain_pool(pool, batches)
+
+
+def run_http(batches: Iterator[List[Tuple[int, str, str]]], workers: int, url: str,
+             tokenizer_path: Optional[str]) -> Iterator[List[dict]]:
+    """Predict through a running /poker/decision server with `workers` concurrent requests"""
+    import requests
+
+    tokenizer = None
+    if tokenizer_path and os.path.exists(tokenizer_path):
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_path, trust_remote_code=True)
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def predict(item: Tuple[int, str, str]) -> dict:
+        index, instruction, target = item
+        response = session.post(f"{url}/poker/decision", json={"game_state": instruction}, timeout=300)
+        response.raise_for_status()
+        return {"index": index, "target": target, "prediction": response.json()["optimal_action"]}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            records = list(executor.map(predict, batch))
+            tokens = count_prompt_tokens(tokenizer, [inst for _, inst, _ in batch])
+            for record in records:
+                record["tokens"] = tokens / len(batch)
+            yield records
+
+
+def score(records: List[dict]) -> dict:
+    """Exact-match, category and bet-size metrics over all predictions"""
+    exact = category_hits = 0
+    size_errors, relative_errors = [], []
+    per_category = defaultdict(Counter)
+    confusion = defaultdict(Counter)
+
+    for record in records:
+        target_category, target_amount = parse_action(record["target"])
+        predicted_category, predicted_amount = parse_action(record["prediction"])
+        is_exact = normalize_action(record["prediction"]) == normalize_action(record["target"])
+        exact += is_exact
+        category_hits += predicted_category == target_category
+        per_category[target_category or "unknown"]["total"] += 1
+        per_category[target_category or "unknown"]["exact"] += is_exact
+        per_category[target_category or "unknown"]["category"] += predicted_category == target_category
+        confusion[target_category or "unknown"][predicted_category or "unparsed"] += 1
+        if predicted_category == target_category and target_amount is not None and predicted_amount is not None:
+            size_errors.append(abs(predicted_amount - target_amount))
+            if target_amount:
+                relative_errors.append(abs(predicted_amount - target_amount) / target_amount)
+
+    total = len(records)
+    return {
+        "examples": total,
+        "exact_match": exact / total if total else 0.0,
+        "category_accuracy": category_hits / total if total else 0.0,
+        "bet_size_mae": sum(size_errors) / len(size_errors) if size_errors else None,
+        "bet_size_relative_error": sum(relative_errors) / len(relative_errors) if relative_errors else None,
+        "sized_examples": len(size_errors),
+        "per_category": {
+            category: {
+                "examples": counts["total"],
+                "exact_match": counts["exact"] / counts["total"],
+                "category_accuracy": counts["category"] / counts["total"],
+            }
+            for category, counts in sorted(per_category.items())
+        },
+        "confusion": {target: dict(predicted) for target, predicted in sorted(confusion.items())},
+    }
+
+
+def evaluate(backend: str = "local", workers: int = 1, batch_size: int = 32, limit: Optional[int] = None,
+             checkpoint: str = DEFAULT_CHECKPOINT, url: str = "http://localhost:8000",
+             tokenizer_path: Optional[str] = None) -> dict:
+    """Run (or resume) an evaluation and return the report"""
+    done = load_checkpoint(checkpoint)
+    total = read_manifest("test")["rows"] if limit is None else min(limit, read_manifest("test")["rows"])
+    if done:
+        print(f"Resuming: {len(done)}/{total} predictions already in {checkpoint}")
+
+    batches = pending_batches(batch_size, done, limit)
+    if backend == "local":
+        results = run_local(batches, workers)
+    elif backend == "http":
+        results = run_http(batches, workers, url, tokenizer_path)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    start = time.time()
+    prompts = tokens = 0
+    with open(checkpoint, "a") as f:
+        for records in results:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+                done[record["index"]] = record
+            f.flush()
+            prompts += len(records)
+            tokens += sum(record.get("tokens", 0) for record in records)
+            elapsed = time.time() - start
+            print(f"  {len(done)}/{total} done, {prompts / elapsed:.1f} prompts/s")
+    elapsed = time.time() - start
+
+    report = score([done[i] for i in sorted(done) if limit is None or i < limit])
+    report["throughput"] = {
+        "backend": backend,
+        "workers": workers,
+        "prompts": prompts,
+        "seconds": elapsed,
+        "prompts_per_second": prompts / elapsed if elapsed else None,
+        "tokens_per_second": tokens / elapsed if elapsed and tokens else None,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the poker model on the PokerBench test split")
+    parser.add_argument("--backend", choices=["local", "http"], default="local",
+                        help="In-process model (poker_api settings) or a running API server")
+    parser.add_argument("--workers", type=int, default=1, help="Model processes (local) or concurrent requests (http)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Prompts per batch / checkpoint write")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N test examples")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Prediction log used to resume")
+    parser.add_argument("--output", default=DEFAULT_REPORT, help="Where to write the JSON report")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--tokenizer", default="./poker-phi3-final", help="Tokenizer for tokens/s in http mode")
+    args = parser.parse_args()
+
+    report = evaluate(args.backend, args.workers, args.batch_size, args.limit, args.checkpoint,
+                      args.url, args.tokenizer)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== PokerBench evaluation ===")
+    print(f"Examples:          {report['examples']}")
+    print(f"Exact match:       {report['exact_match']:.2%}")
+    print(f"Action category:   {report['category_accuracy']:.2%}")
+    if report["bet_size_mae"] is not None:
+        print(f"Bet size MAE:      {report['bet_size_mae']:.2f} chips "
+              f"({report['bet_size_relative_error']:.1%} relative, {report['sized_examples']} sized)")
+    throughput = report["throughput"]
+    if throughput["prompts_per_second"]:
+        print(f"Throughput:        {throughput['prompts_per_second']:.2f} prompts/s", end="")
+        if throughput["tokens_per_second"]:
+            print(f", {throughput['tokens_per_second']:.0f} prompt tokens/s", end="")
+        print()
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 from datasets import load_dataset
 import json
-import pickle
 from collections import Counter
 
+from data_store import DATA_DIR, export_split
+
 # Load the dataset
 print("Loading PokerBench dataset...")
 ds = load_dataset("RZ412/PokerBench", split="train")
@@ -20,32 +21,33 @@ for i in range(3):
     print(f"Instruction length: {len(ds[i]['instruction'])}")
     print(f"Output: {ds[i]['output']}")
 
-# Analyze output patterns
-outputs = [item['output'] for item in ds]
-output_types = Counter(outputs)
+# Analyze output patterns (streamed, only the output column is read)
+output_types = Counter()
+for batch in ds.select_columns(["output"]).iter(batch_size=10000):
+    output_types.update(batch["output"])
 print(f"\n=== Output Analysis ===")
 print(f"Unique outputs: {len(output_types)}")
 print("Most common outputs:")
 for output, count in output_types.most_common(10):
     print(f"  '{output}': {count}")
 
-# Save datasets locally
-print("\nSaving datasets locally...")
-with open('poker_train_dataset.pkl', 'wb') as f:
-    pickle.dump(ds, f)
-    
-with open('poker_test_dataset.pkl', 'wb') as f:
-    pickle.dump(test_ds, f)
+# Save the action vocabulary used for constrained decoding
+with open('poker_actions.json', 'w') as f:
+    json.dump(sorted(output_types), f, indent=2)
 
-# Also save as JSON for easier inspection
-train_data = [{"instruction": item["instruction"], "output": item["output"]} for item in ds]
-test_data = [{"instruction": item["instruction"], "output": item["output"]} for item in test_ds]
+# Save datasets locally as memory-mappable Arrow shards
+print("\nSaving datasets locally...")
+for split, dataset in (("train", ds), ("test", test_ds)):
+    manifest = export_split(dataset, split)
+    print(f"  {split}: {manifest['rows']} rows in {len(manifest['shards'])} shards")
 
+# Also save the first 1000 examples as JSON for easier inspection
 with open('poker_train_dataset.json', 'w') as f:
-    json.dump(train_data[:1000], f, indent=2)  # Save first 1000 for inspection
+    json.dump(ds.select(range(min(1000, len(ds)))).to_list(), f, indent=2)
 
 print("Dataset saved locally!")
 print("Files created:")
-print("- poker_train_dataset.pkl (full training set)")
-print("- poker_test_dataset.pkl (full test set)")  
-print("- poker_train_dataset.json (first 1000 examples for inspection)") 
\ No newline at end of file
+print(f"- {DATA_DIR}/train/ (full training set)")
+print(f"- {DATA_DIR}/test/ (full test set)")
+print("- poker_train_dataset.json (first 1000 examples for inspection)")
+print("- poker_actions.json (all distinct actions)")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Precomputed flop strategy library.
+
+`python flop_library.py --templates templates.json` solves every strategically
+distinct flop (1,755 up to suit relabelling) for each spot template and writes
+one library file per template. A template is a JSON object with the HandInfo
+fields other than the board, plus a "name":
+
+    [{"name": "srp_btn_bb", "oop_range": "...", "ip_range": "...", "pot_size": 5.5,
+      "effective_stack": 97.5}]
+
+Library file layout (little endian):
+
+    magic "GTOFLOP1" | u32 header length | JSON header
+    record count x (32-byte spot key, u64 offset, u32 length)  sorted by key
+    zlib-compressed solver output in canonical suits
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cards import card_str, invert_permutation, permute_text
+from solver_cache import canonical_board
+
+MAGIC = b"GTOFLOP1"
+INDEX_ENTRY = struct.Struct("<32sQI")
+FLOP_LIBRARY_DIR = os.environ.get("FLOP_LIBRARY_DIR", "./flop_library")
+
+
+def canonical_flops() -> List[str]:
+    """All 1,755 strategically distinct flops as board strings"""
+    flops = sorted({canonical_board(cards) for cards in itertools.combinations(range(52), 3)}, reverse=True)
+    return [",".join(card_str(c) for c in flop) for flop in flops]
+
+
+class FlopLibrary:
+    """Memory-mapped lookup over every library file in a directory"""
+
+    def __init__(self, directory: Optional[str] = FLOP_LIBRARY_DIR):
+        self.index: Dict[bytes, Tuple[mmap.mmap, int, int]] = {}
+        self.files = []
+        self.hits = 0
+        self.misses = 0
+        if directory and os.path.isdir(directory):
+            for path in sorted(Path(directory).glob("*.flops")):
+                self.load(str(path))
+
+    def load(self, path: str):
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a flop library file")
+        pos = len(MAGIC)
+        (header_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + header_len])
+        pos += header_len
+        for _ in range(header["records"]):
+            key, offset, length = INDEX_ENTRY.unpack_from(data, pos)
+            self.index[key] = (data, offset, length)
+            pos += INDEX_ENTRY.size
+        self.files.append({"path": path, **header})
+        print(f"Loaded flop library {path} ({header['records']} flops)")
+
+    def get(self, key: str, perm: Sequence[int]) -> Optional[str]:
+        """Solver output for a spot key, relabelled into the caller's suits"""
+        record = self.index.get(bytes.fromhex(key))
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data, offset, length = record
+        output = zlib.decompress(data[offset:offset + length]).decode()
+        return permute_text(output, invert_permutation(perm))
+
+    def __contains__(self, key: str) -> bool:
+        return bytes.fromhex(key) in self.index
+
+    def stats(self) -> dict:
+        return {
+            "files": [f["path"] for f in self.files],
+            "records": len(self.index),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def write_library(path: str, header: dict, records: Dict[str, str]):
+    """Write canonical solver outputs keyed by spot key into a library file"""
+    blobs = [(bytes.fromhex(key), zlib.compress(output.encode(), 9)) for key, output in sorted(records.items())]
+    header = json.dumps({**header, "records": len(blobs)}).encode()
+
+    offset = len(MAGIC) + 4 + len(header) + INDEX_ENTRY.size * len(blobs)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for key, blob in blobs:
+            f.write(INDEX_ENTRY.pack(key, offset, len(blob)))
+            offset += len(blob)
+        for _, blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+async def build_template(template: dict, output_dir: str, concurrency: int, limit: Optional[int] = None):
+    """Solve every canonical flop for one template and write its library file"""
+    # Imported here so the server can import this module without a cycle
+    from main import HandInfo, build_solver_request, solver_api
+    from solver_cache import spot_key
+
+    name = template.pop("name")
+    flops = canonical_flops()[:limit]
+    semaphore = asyncio.Semaphore(concurrency)
+    solver_api.pool.max_queue = max(solver_api.pool.max_queue, concurrency)
+    records = {}
+    failures = 0
+
+    async def solve_flop(board: str):
+        nonlocal failures
+        request = build_solver_request(HandInfo(board=board, **template))
+        key, perm = spot_key(request)
+        async with semaphore:
+            try:
+                result = await solver_api.solve(request)
+            except Exception as e:
+                failures += 1
+                print(f"  {board}: failed ({getattr(e, 'detail', e)})")
+                return
+        records[key] = permute_text(result["result"], perm)
+        done = len(records) + failures
+        if done % 50 == 0 or done == len(flops):
+            print(f"  [{name}] {done}/{len(flops)} flops solved")
+
+    print(f"Building library '{name}' over {len(flops)} flops...")
+    await asyncio.gather(*(solve_flop(board) for board in flops))
+
+    path = os.path.join(output_dir, f"{name}.flops")
+    write_library(path, {"name": name, "template": template}, records)
+    print(f"Wrote {len(records)} flops to {path} ({failures} failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a precomputed flop strategy library")
+    parser.add_argument("--templates", required=True, help="JSON file with a list of spot templates")
+    parser.add_argument("--output-dir", default=FLOP_LIBRARY_DIR, help="Directory for the library files")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 4,
+                        help="Solver runs in flight at once (also bounded by SOLVER_THREAD_BUDGET)")
+    parser.add_argument("--limit", type=int, default=None, help="Only solve the first N flops (for testing)")
+    args = parser.parse_args()
+
+    with open(args.templates) as f:
+        templates = json.load(f)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    async def build_all():
+        for template in templates:
+            await build_template(dict(template), args.output_dir, args.concurrency, args.limit)
+
+    asyncio.run(build_all())
+
+
+if __name__ == "__main__":
+    main()
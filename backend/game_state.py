@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Structured game states parsed from PokerBench prompts.
+
+`parse_game_state` turns a PokerBench instruction (or the prompt built for
+/poker/decision around one) into a GameState: blinds, starting stack,
+positions, hero position and cards, board, the action sequence by street,
+pot and the stacks left after every player's contributions.
+
+`encode` packs a GameState into a fixed-width int32 vector (amounts in
+hundredths of a chip, cards as cards.py integers, -1 padding):
+
+    0       hero position (index into POSITIONS; -1 marks a row that didn't parse)
+    1-2     hero cards, high card first
+    3-7     board: sorted flop, turn, river
+    8-11    pot, small blind, big blind, starting stack
+    12-17   stack of each position in POSITIONS
+    18      number of actions
+    19-     MAX_ACTIONS x (street, position, action, amount)
+
+Equal states encode to equal bytes however the prompt was worded, so the
+vector serves as a cache key and as model input. `python game_state.py`
+encodes whole splits of the local data store once into
+poker_data/<split>/game_states.npy, which `load_game_states` memory-maps.
+"""
+
+import argparse
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cards import card_str
+from data_store import DATA_DIR, iter_batches, read_manifest, split_dir
+
+POSITIONS = ["UTG", "HJ", "CO", "BTN", "SB", "BB"]
+STREETS = ["preflop", "flop", "turn", "river"]
+ACTIONS = ["fold", "check", "call", "bet", "raise", "allin"]
+
+MAX_ACTIONS = 32
+HEADER_WIDTH = 19
+STATE_WIDTH = HEADER_WIDTH + 4 * MAX_ACTIONS
+GAME_STATES_FILE = "game_states.npy"
+
+RANK_WORDS = {
+    "two": 0, "three": 1, "four": 2, "five": 3, "six": 4, "seven": 5, "eight": 6,
+    "nine": 7, "ten": 8, "jack": 9, "queen": 10, "king": 11, "ace": 12,
+}
+SUIT_WORDS = {"club": 0, "diamond": 1, "heart": 2, "spade": 3}
+
+CARD_RE = re.compile(r"\b(two|three|four|five|six|seven|eight|nine|ten|jack|queen|king|ace)\s+of\s+"
+                     r"(club|diamond|heart|spade)s?\b", re.IGNORECASE)
+BLINDS_RE = re.compile(r"small blind is ([\d.]+) chips? and the big blind is ([\d.]+) chips?", re.IGNORECASE)
+STACK_RE = re.compile(r"started with ([\d.]+) chips", re.IGNORECASE)
+POSITIONS_RE = re.compile(r"positions involved in this game are ([A-Z, ]+)")
+HERO_RE = re.compile(r"your position is (\w+), and your holding is \[([^\]]*)\]", re.IGNORECASE)
+POT_RE = re.compile(r"current pot size is ([\d.]+) chips", re.IGNORECASE)
+STREET_RE = re.compile(r"(Before the flop,|The flop comes|The turn comes|The river comes|Now it is your turn)",
+                       re.IGNORECASE)
+ACTION_RE = re.compile(r"\b(UTG|HJ|CO|BTN|SB|BB)\s+(fold|check|call|bet|raise|all[- ]?in)(?:\s+([\d.]+))?",
+                       re.IGNORECASE)
+
+# Which street a STREET_RE marker opens (None ends the history)
+STREET_MARKERS = {"before the flop,": 0, "the flop comes": 1, "the turn comes": 2, "the river comes": 3,
+                  "now it is your turn": None}
+
+
+class GameState:
+    """One decision point of a hand, as parsed from a PokerBench prompt"""
+
+    __slots__ = ("small_blind", "big_blind", "starting_stack", "positions", "hero_position", "hero_cards",
+                 "board", "actions", "pot", "stacks")
+
+    def __init__(self, small_blind: float, big_blind: float, starting_stack: float, positions: List[str],
+                 hero_position: str, hero_cards: List[int], board: List[int],
+                 actions: List[Tuple[int, str, str, Optional[float]]], pot: float,
+                 stacks: Optional[Dict[str, float]] = None):
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.starting_stack = starting_stack
+        self.positions = positions
+        self.hero_position = hero_position
+        self.hero_cards = hero_cards
+        self.board = board
+        self.actions = actions  # (street index, position, action, amount or None)
+        self.pot = pot
+        self.stacks = stacks if stacks is not None else remaining_stacks(self)
+
+    @property
+    def street(self) -> str:
+        return STREETS[{0: 0, 3: 1, 4: 2, 5: 3}[len(self.board)]]
+
+    def to_dict(self) -> dict:
+        return {
+            "small_blind": self.small_blind,
+            "big_blind": self.big_blind,
+            "starting_stack": self.starting_stack,
+            "positions": self.positions,
+            "hero_position": self.hero_position,
+            "hero_cards": [card_str(c) for c in self.hero_cards],
+            "board": [card_str(c) for c in self.board],
+            "street": self.street,
+            "actions": [
+                {"street": STREETS[s], "position": p, "action": a, "amount": amount}
+                for s, p, a, amount in self.actions
+            ],
+            "pot": self.pot,
+            "stacks": self.stacks,
+        }
+
+
+def remaining_stacks(state: GameState) -> Dict[str, float]:
+    """Stacks after the blinds and every action (bets and raises are totals for the street)"""
+    contributed = {p: 0.0 for p in state.positions}
+    street, committed = None, {}
+    for s, position, action, amount in state.actions:
+        if s != street:
+            street, committed = s, {p: 0.0 for p in state.positions}
+            if s == 0:
+                committed.update({p: b for p, b in (("SB", state.small_blind), ("BB", state.big_blind))
+                                  if p in committed})
+                for p in ("SB", "BB"):
+                    if p in contributed:
+                        contributed[p] += committed[p]
+        before = committed.get(position, 0.0)
+        if action == "call":
+            after = max(committed.values())
+        elif action in ("bet", "raise") and amount is not None:
+            after = amount
+        elif action == "allin":
+            after = before + state.starting_stack - contributed.get(position, 0.0)
+        else:
+            continue
+        committed[position] = after
+        contributed[position] = contributed.get(position, 0.0) + after - before
+    return {p: round(state.starting_stack - contributed.get(p, 0.0), 2) for p in state.positions}
+
+
+def parse_cards_text(text: str) -> List[int]:
+    """Cards named in words, e.g. "King of Diamond and Jack of Spade" """
+    return [RANK_WORDS[r.lower()] * 4 + SUIT_WORDS[s.lower()] for r, s in CARD_RE.findall(text)]
+
+
+def parse_game_state(text: str) -> GameState:
+    """Parse a PokerBench instruction; raises ValueError if it isn't one"""
+    hero = HERO_RE.search(text)
+    pot = POT_RE.search(text)
+    if not hero or not pot:
+        raise ValueError("Not a PokerBench game state")
+    hero_cards = parse_cards_text(hero.group(2))
+    if len(hero_cards) != 2:
+        raise ValueError("Expected two hole cards")
+
+    blinds = BLINDS_RE.search(text)
+    stack = STACK_RE.search(text)
+    positions = POSITIONS_RE.search(text)
+
+    # Each street's text runs from its marker to the next one
+    board, actions = [], []
+    parts = STREET_RE.split(text[hero.end():])
+    for marker, body in zip(parts[1::2], parts[2::2]):
+        street = STREET_MARKERS[marker.lower()]
+        if street is None:
+            break
+        if street > 0:
+            cards_text, _, body = body.partition(", then")
+            board += parse_cards_text(cards_text)
+        for position, action, amount in ACTION_RE.findall(body):
+            action = action.lower()
+            action = "allin" if action.startswith("all") else action
+            actions.append((street, position.upper(), action, float(amount) if amount else None))
+    if len(board) not in (0, 3, 4, 5) or len(set(board + hero_cards)) != len(board) + 2:
+        raise ValueError("Invalid board")
+
+    return GameState(
+        small_blind=float(blinds.group(1)) if blinds else 0.5,
+        big_blind=float(blinds.group(2)) if blinds else 1.0,
+        starting_stack=float(stack.group(1)) if stack else 100.0,
+        positions=[p.strip() for p in positions.group(1).split(",")] if positions else list(POSITIONS),
+        hero_position=hero.group(1).upper(),
+        hero_cards=hero_cards,
+        board=board,
+        actions=actions,
+        pot=float(pot.group(1)),
+    )
+
+
+def _chips(amount: Optional[float]) -> int:
+    return -1 if amount is None else int(round(amount * 100))
+
+
+def encode(state: GameState) -> np.ndarray:
+    """Fixed-width int32 vector of a game state (see the module docstring for the layout)"""
+    if len(state.actions) > MAX_ACTIONS:
+        raise ValueError(f"More than {MAX_ACTIONS} actions")
+    row = np.full(STATE_WIDTH, -1, dtype=np.int32)
+    row[0] = POSITIONS.index(state.hero_position)
+    row[1:3] = sorted(state.hero_cards, reverse=True)
+    board = sorted(state.board[:3], reverse=True) + state.board[3:]
+    row[3:3 + len(board)] = board
+    row[8:12] = [_chips(state.pot), _chips(state.small_blind), _chips(state.big_blind), _chips(state.starting_stack)]
+    for i, position in enumerate(POSITIONS):
+        if position in state.stacks:
+            row[12 + i] = _chips(state.stacks[position])
+    row[18] = len(state.actions)
+    for i, (street, position, action, amount) in enumerate(state.actions):
+        start = HEADER_WIDTH + 4 * i
+        row[start:start + 4] = [street, POSITIONS.index(position), ACTIONS.index(action), _chips(amount)]
+    return row
+
+
+def decode(row: np.ndarray) -> GameState:
+    """GameState back from an encoded vector"""
+    if row[0] < 0:
+        raise ValueError("Row does not hold a game state")
+    stacks = {p: row[12 + i] / 100 for i, p in enumerate(POSITIONS) if row[12 + i] >= 0}
+    actions = []
+    for i in range(int(row[18])):
+        street, position, action, amount = row[HEADER_WIDTH + 4 * i:HEADER_WIDTH + 4 * i + 4].tolist()
+        actions.append((street, POSITIONS[position], ACTIONS[action], None if amount < 0 else amount / 100))
+    return GameState(
+        small_blind=row[9] / 100,
+        big_blind=row[10] / 100,
+        starting_stack=row[11] / 100,
+        positions=list(stacks),
+        hero_position=POSITIONS[row[0]],
+        hero_cards=row[1:3].tolist(),
+        board=[int(c) for c in row[3:8] if c >= 0],
+        actions=actions,
+        pot=row[8] / 100,
+        stacks=stacks,
+    )
+
+
+def encode_text(text: str) -> Optional[np.ndarray]:
+    """Encoded game state of a prompt, or None if it doesn't parse"""
+    try:
+        return encode(parse_game_state(text))
+    except ValueError:
+        return None
+
+
+def encode_batch(texts: List[str]) -> np.ndarray:
+    """(N, STATE_WIDTH) encodings; rows that don't parse are all -1"""
+    rows = np.full((len(texts), STATE_WIDTH), -1, dtype=np.int32)
+    for i, text in enumerate(texts):
+        row = encode_text(text)
+        if row is not None:
+            rows[i] = row
+    return rows
+
+
+def build_game_states(split: str, data_dir: str = DATA_DIR, batch_size: int = 10_000) -> str:
+    """Encode every instruction of a split into <split dir>/game_states.npy"""
+    num_rows = read_manifest(split, data_dir)["rows"]
+    path = os.path.join(split_dir(split, data_dir), GAME_STATES_FILE)
+    tmp_path = path + ".tmp"
+    states = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.int32, shape=(num_rows, STATE_WIDTH))
+    position = 0
+    for batch in iter_batches(split, columns=["instruction"], batch_size=batch_size, data_dir=data_dir):
+        rows = encode_batch(batch["instruction"])
+        states[position:position + len(rows)] = rows
+        position += len(rows)
+    states.flush()
+    del states
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_game_states(split: str, data_dir: str = DATA_DIR) -> np.ndarray:
+    """Memory-mapped (rows, STATE_WIDTH) encodings of a split"""
+    return np.load(os.path.join(split_dir(split, data_dir), GAME_STATES_FILE), mmap_mode="r")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode PokerBench splits into game-state arrays")
+    parser.add_argument("--split", action="append", help="Split to encode (repeatable, default train and test)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    for split in args.split or ["train", "test"]:
+        start = time.time()
+        path = build_game_states(split, args.data_dir)
+        states = load_game_states(split, args.data_dir)
+        parsed = int((states[:, 0] >= 0).sum())
+        print(f"{split}: {parsed}/{len(states)} game states parsed in {time.time() - start:.1f}s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
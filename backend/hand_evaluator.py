@@ -0,0 +1,212 @@
+"""
+Table-driven poker hand evaluator for 5, 6 and 7 cards.
+
+Cards are the integers from cards.py (rank * 4 + suit). Every hand maps to
+one of the 7462 distinct five-card hand classes, numbered 1 (7-5-4-3-2
+offsuit) to 7462 (royal flush), so a higher rank is a better hand.
+
+Two precomputed tables answer every evaluation:
+
+  * Flushes: a suit holding five or more cards always decides the hand (no
+    quads or full house fits in the remaining cards), so the 13-bit rank mask
+    of that suit indexes an 8192-entry flush table.
+  * Everything else only depends on how many cards of each rank there are.
+    The rank-count vector is mapped to a dense index by a perfect hash over
+    multisets ("quinary" hash: at most four cards per rank), which indexes a
+    table of 6175 / 18395 / 49205 entries for 5 / 6 / 7 cards.
+
+`evaluate` ranks one hand, `evaluate_batch` ranks an (N, n) array of hands in
+a handful of vectorized NumPy operations.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+CATEGORIES = [
+    "high card", "pair", "two pair", "three of a kind", "straight",
+    "flush", "full house", "four of a kind", "straight flush",
+]
+
+NUM_RANKS = 13
+MAX_CARDS = 7
+HAND_CLASSES = 7462
+
+# Rank-count vectors are packed three bits per rank into one integer
+COUNT_BITS = 3
+PACKED_CARD = np.array([1 << (COUNT_BITS * (card >> 2)) for card in range(52)], dtype=np.int64)
+RANK_BIT = np.array([1 << (card >> 2) for card in range(52)], dtype=np.int64)
+# Suit counts are packed four bits per suit
+PACKED_SUIT = np.array([1 << (4 * (card & 3)) for card in range(52)], dtype=np.int64)
+
+
+def _straight_high(mask: int) -> int:
+    """Highest rank of a straight in a 13-bit rank mask, or -1"""
+    for high in range(12, 3, -1):
+        if (mask >> (high - 4)) & 0b11111 == 0b11111:
+            return high
+    if mask & 0b1000000001111 == 0b1000000001111:  # A-2-3-4-5
+        return 3
+    return -1
+
+
+def _flush_key(mask: int) -> Tuple[int, ...]:
+    high = _straight_high(mask)
+    if high >= 0:
+        return (STRAIGHT_FLUSH, high)
+    ranks = [r for r in range(12, -1, -1) if mask >> r & 1][:5]
+    return (FLUSH, *ranks)
+
+
+def _rank_key(counts: Sequence[int]) -> Tuple[int, ...]:
+    """Best five-card hand (ignoring suits) made from the given rank counts"""
+    present = [r for r in range(12, -1, -1) if counts[r]]
+    quads = [r for r in present if counts[r] == 4]
+    trips = [r for r in present if counts[r] == 3]
+    pairs = [r for r in present if counts[r] == 2]
+
+    if quads:
+        return (QUADS, quads[0], next(r for r in present if r != quads[0]))
+    if trips and (len(trips) > 1 or pairs):
+        return (FULL_HOUSE, trips[0], max(trips[1:] + pairs))
+    high = _straight_high(sum(1 << r for r in present))
+    if high >= 0:
+        return (STRAIGHT, high)
+    if trips:
+        return (TRIPS, trips[0], *[r for r in present if r != trips[0]][:2])
+    if len(pairs) > 1:
+        return (TWO_PAIR, pairs[0], pairs[1], next(r for r in present if r not in pairs[:2]))
+    if pairs:
+        return (PAIR, pairs[0], *[r for r in present if r != pairs[0]][:3])
+    return (HIGH_CARD, *present[:5])
+
+
+def _rank_multisets(num_cards: int, rank: int = 0) -> List[List[int]]:
+    """Every rank-count vector (counts[rank:]) with at most four cards per rank"""
+    if rank == NUM_RANKS:
+        return [[]] if num_cards == 0 else []
+    return [
+        [count] + rest
+        for count in range(min(4, num_cards), -1, -1)
+        for rest in _rank_multisets(num_cards - count, rank + 1)
+    ]
+
+
+def _hash_offsets() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Perfect-hash coefficients for rank multisets.
+
+    ways[i, k] counts the ways to place k cards on ranks i..12; offsets[i, k, c]
+    is the number of multisets that put fewer than c cards on rank i, which is
+    what a count of c at rank i adds to the hash.
+    """
+    ways = np.zeros((NUM_RANKS + 1, MAX_CARDS + 1), dtype=np.int64)
+    ways[NUM_RANKS, 0] = 1
+    for i in range(NUM_RANKS - 1, -1, -1):
+        for k in range(MAX_CARDS + 1):
+            ways[i, k] = sum(ways[i + 1, k - c] for c in range(min(4, k) + 1))
+    offsets = np.zeros((NUM_RANKS, MAX_CARDS + 1, 5), dtype=np.int64)
+    for i in range(NUM_RANKS):
+        for k in range(MAX_CARDS + 1):
+            for c in range(1, min(4, k) + 1):
+                offsets[i, k, c] = offsets[i, k, c - 1] + ways[i + 1, k - (c - 1)]
+    return ways, offsets
+
+
+def _hash_counts(counts: Sequence[int], offsets: np.ndarray) -> int:
+    remaining, index = sum(counts), 0
+    for rank, count in enumerate(counts):
+        index += int(offsets[rank, remaining, count])
+        remaining -= count
+    return index
+
+
+@lru_cache(maxsize=None)
+def tables() -> Dict[str, object]:
+    """Build (once) the hand-class ordering, flush table and per-size rank tables"""
+    keys = {_rank_key(counts) for counts in _rank_multisets(5)}
+    keys.update(_flush_key(mask) for mask in range(1 << NUM_RANKS) if bin(mask).count("1") == 5)
+    ordered = sorted(keys)
+    assert len(ordered) == HAND_CLASSES
+    class_of = {key: rank for rank, key in enumerate(ordered, start=1)}
+
+    flush = np.zeros(1 << NUM_RANKS, dtype=np.int16)
+    for mask in range(1 << NUM_RANKS):
+        if bin(mask).count("1") >= 5:
+            flush[mask] = class_of[_flush_key(mask)]
+
+    ways, offsets = _hash_offsets()
+    by_size = {}
+    for num_cards in (5, 6, 7):
+        table = np.zeros(int(ways[0, num_cards]), dtype=np.int16)
+        for counts in _rank_multisets(num_cards):
+            table[_hash_counts(counts, offsets)] = class_of[_rank_key(counts)]
+        by_size[num_cards] = table
+
+    # First hand class of every category, for hand_category
+    starts = np.array([
+        next(rank for rank, key in enumerate(ordered, start=1) if key[0] == category)
+        for category in range(len(CATEGORIES))
+    ])
+    return {"flush": flush, "rank": by_size, "offsets": offsets, "category_starts": starts}
+
+
+def evaluate(cards: Sequence[int]) -> int:
+    """Hand class (1-7462, higher is better) of the best five of 5-7 cards"""
+    if not 5 <= len(cards) <= MAX_CARDS or len(set(cards)) != len(cards):
+        raise ValueError("Need 5 to 7 distinct cards")
+    t = tables()
+    suit_masks = [0, 0, 0, 0]
+    counts = [0] * NUM_RANKS
+    for card in cards:
+        suit_masks[card & 3] |= 1 << (card >> 2)
+        counts[card >> 2] += 1
+    for mask in suit_masks:
+        if bin(mask).count("1") >= 5:
+            return int(t["flush"][mask])
+    return int(t["rank"][len(cards)][_hash_counts(counts, t["offsets"])])
+
+
+def evaluate_batch(hands: np.ndarray) -> np.ndarray:
+    """
+    Hand classes of an (N, n) integer array of hands, n in 5..7
+
+    Cards within a hand must be distinct; this is not checked.
+    """
+    hands = np.asarray(hands)
+    if hands.ndim != 2 or not 5 <= hands.shape[1] <= MAX_CARDS:
+        raise ValueError("Expected an (N, 5..7) array of cards")
+    t = tables()
+    num_cards = hands.shape[1]
+
+    # Rank counts packed 3 bits per rank, suit counts 4 bits per suit
+    packed = PACKED_CARD[hands].sum(axis=1)
+    packed_suits = PACKED_SUIT[hands].sum(axis=1)
+
+    # Non-flush: perfect hash of the rank counts
+    offsets = t["offsets"]
+    index = np.zeros(len(hands), dtype=np.int64)
+    remaining = np.full(len(hands), num_cards, dtype=np.int64)
+    for rank in range(NUM_RANKS):
+        count = (packed >> (COUNT_BITS * rank)) & 7
+        index += offsets[rank, remaining, count]
+        remaining -= count
+    result = t["rank"][num_cards][index]
+
+    # Flush: rank mask of the suit holding five or more cards
+    suit_counts = np.stack([(packed_suits >> (4 * suit)) & 15 for suit in range(4)], axis=1)
+    flush_suit = suit_counts.argmax(axis=1)
+    has_flush = suit_counts[np.arange(len(hands)), flush_suit] >= 5
+    if has_flush.any():
+        flush_hands = hands[has_flush]
+        in_suit = (flush_hands & 3) == flush_suit[has_flush, None]
+        masks = np.where(in_suit, RANK_BIT[flush_hands], 0).sum(axis=1)
+        result[has_flush] = t["flush"][masks]
+    return result
+
+
+def hand_category(hand_class) -> np.ndarray:
+    """Category index (HIGH_CARD .. STRAIGHT_FLUSH) of one or many hand classes"""
+    return np.searchsorted(tables()["category_starts"], hand_class, side="right") - 1
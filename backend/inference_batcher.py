@@ -0,0 +1,134 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+import metrics
+
+
+class InferenceBatcher:
+    """
+    Dynamic micro-batching in front of a blocking batch function.
+
+    Requests are queued and grouped into batches of up to `max_batch_size`
+    items, waiting at most `max_wait_ms` for a batch to fill. Each batch runs
+    on a dedicated inference thread and every request's future is resolved
+    with its own result.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, num_threads: int = 1):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.num_threads = max(1, num_threads)
+        self.executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="inference")
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.started_at = time.time()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_queue_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_batch_time = 0.0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.num_threads)
+            # Started outside the first caller's context so no request profile leaks into the batches
+            self._task = contextvars.Context().run(asyncio.create_task, self._collect_batches())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        enqueued = time.perf_counter()
+        self.in_flight += 1
+        await self._queue.put((item, future, enqueued, metrics.current_profile()))
+        try:
+            return await future
+        finally:
+            self.in_flight -= 1
+            latency = time.perf_counter() - enqueued
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    async def _collect_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Only start filling a batch once an inference thread is free
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            # With several inference threads, cap a batch at its fair share of the requests in flight
+            # so the others get work too (a single thread takes up to max_batch_size as before)
+            limit = min(self.max_batch_size, -(-self.in_flight // self.num_threads))
+            while len(batch) < limit:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        batch = [entry for entry in batch if not entry[1].cancelled()]
+        try:
+            if not batch:
+                return
+            self.total_queue_wait += sum(started - enqueued for _, _, enqueued, _ in batch)
+            for _, _, enqueued, profile in batch:
+                metrics.observe_stage("queue_wait", started - enqueued, profile)
+
+            # Stages timed inside the batch are reported to every request that was part of it
+            batch_profile = {}
+            run = functools.partial(metrics.call_with_profile, batch_profile, self.run_batch)
+            results = await loop.run_in_executor(self.executor, run, [item for item, _, _, _ in batch])
+            for _, _, _, profile in batch:
+                if profile is not None:
+                    for name, seconds in batch_profile.items():
+                        profile[name] = profile.get(name, 0.0) + seconds
+            for (_, future, _, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            self.errors += 1
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.batches += 1 if batch else 0
+            self.total_batch_time += time.perf_counter() - started
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Throughput and latency counters"""
+        uptime = time.time() - self.started_at
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "avg_queue_wait_ms": 1000.0 * self.total_queue_wait / self.requests if self.requests else 0.0,
+            "avg_latency_ms": 1000.0 * self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency_ms": 1000.0 * self.max_latency,
+            "avg_batch_time_ms": 1000.0 * self.total_batch_time / self.batches if self.batches else 0.0,
+            "throughput_rps": self.requests / uptime if uptime > 0 else 0.0,
+        }
@@ -1,14 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import json
 import os
 import tempfile
-import subprocess
 import asyncio
+import time
 from pathlib import Path
 
+from batch_stream import NDJSON_MEDIA_TYPE, read_batch, record_batch, stream_results, validate_items
+from cards import combo_index, parse_board, parse_cards
+from equity import calculate_equity
+from flop_library import FlopLibrary
+import metrics
+from metrics import record_cache, register_collector, stage
+from preflop_tables import PreflopTables
+from solver_cache import SolutionCache, spot_key
+from solver_jobs import JobManager
+from solver_pool import SolverPool, final_exploitability
+from ranges import full_range, parse_range, range_to_string, remove_cards
+from strategy_tree import StrategyStore, find_node, node_to_dict
+
+# Most spots accepted by one /solve/batch request
+SOLVE_BATCH_MAX_ITEMS = int(os.environ.get("SOLVE_BATCH_MAX_ITEMS", 500))
+
+# Explicit solver binary (e.g. benchmarks/fake_solver.py); otherwise the usual build locations are searched
+TEXAS_SOLVER_PATH = os.environ.get("TEXAS_SOLVER_PATH")
+
 app = FastAPI(title="TexasSolver GTO API", version="1.0.0")
 
 # Enable CORS for frontend integration
@@ -19,11 +39,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+metrics.install(app, "solver")
+
+# Endpoints live on routers so service.py can mount them next to the poker API
+solver_router = APIRouter(tags=["solver"])
+equity_router = APIRouter(tags=["equity"])
 
 class HandInfo(BaseModel):
     """Poker hand information for GTO analysis"""
     board: str  # e.g., "Qs,Jh,2h" or "Qs,Jh,2h,8c" or "Qs,Jh,2h,8c,3d"
-    oop_range: str  # Out of position range e.g., "AA,KK,QQ:0.5,AK"
+    oop_range: str  # Out of position range e.g., "AA,KK,QQ:0.5,AK" or "TT+,A9s+,KQo,76s-54s"
     ip_range: str   # In position range
     pot_size: float = 10.0
     effective_stack: float = 95.0
@@ -46,6 +71,37 @@ class GTOResponse(BaseModel):
     computation_time: Optional[float] = None
     convergence: Optional[float] = None
 
+class JobStatus(BaseModel):
+    """Progress of a background solve job"""
+    job_id: str
+    status: str  # "queued", "running", "completed", "failed" or "cancelled"
+    iteration: Optional[int] = None
+    exploitability: Optional[float] = None
+    computation_time: Optional[float] = None
+    has_partial_strategy: bool = False
+    error: Optional[str] = None
+
+class EquityRequest(BaseModel):
+    """All-in equity query"""
+    hero: str  # e.g. "AsKs"
+    board: str = ""  # e.g. "Qs,Jh,2h"; empty preflop
+    ranges: Optional[List[str]] = None  # One range per opponent, e.g. ["QQ,JJ,AK", "AA,KK:0.5"]
+    opponents: int = 1  # Opponents holding any two cards, used when no ranges are given
+    iterations: int = 200000  # Monte Carlo sample budget
+    target_stderr: float = 0.001  # Stop sampling once the standard error is this small
+    seed: Optional[int] = None
+    use_tables: bool = True  # Answer preflop spots from the precomputed tables when possible
+
+class EquityResponse(BaseModel):
+    """Hero's share of the pot at showdown"""
+    equity: float
+    win: Optional[float] = None  # Not tracked by the preflop tables
+    tie: Optional[float] = None
+    stderr: float
+    samples: int
+    method: str  # "exact", "monte_carlo" or "table"
+    computation_time: float
+
 class SolverRequest(BaseModel):
     board: str
     oop_range: str
@@ -53,14 +109,27 @@ class SolverRequest(BaseModel):
     pot_size: float
     effective_stack: float
     position: str
+    bet_sizes: Optional[Dict[str, List[float]]] = None
+    accuracy: float = 0.3
+    max_iterations: int = 200
+    thread_count: int = 4
+    use_isomorphism: bool = True
 
 class SolverAPI:
     def __init__(self):
         self.solver_path = self._find_solver_executable()
+        self.pool = SolverPool()
+        self.cache = SolutionCache()
+        self.library = FlopLibrary()
         self.resources_path = Path(__file__).parent.parent / "TexasSolver" / "resources"
         
     def _find_solver_executable(self) -> Optional[str]:
         """Find the TexasSolver executable"""
+        if TEXAS_SOLVER_PATH:
+            if os.path.isfile(TEXAS_SOLVER_PATH) and os.access(TEXAS_SOLVER_PATH, os.X_OK):
+                return TEXAS_SOLVER_PATH
+            print(f"TEXAS_SOLVER_PATH {TEXAS_SOLVER_PATH} is not an executable file, searching default locations")
+        
         # Get the absolute path to the backend directory
         backend_dir = Path(__file__).parent
         project_root = backend_dir.parent
@@ -79,8 +148,42 @@ class SolverAPI:
         
         return None
 
-    def solve(self, request: SolverRequest) -> dict:
+    def has_solution(self, key: str) -> bool:
+        """Whether a spot key is in the flop library or the solution cache"""
+        return key in self.library or key in self.cache
+
+    def stored_solution(self, solution_id: str) -> Optional[str]:
+        """Solver output of a solution id from the flop library or solution cache, if still stored"""
+        key, _, perm = solution_id.rpartition("-")
+        if len(key) != 64 or sorted(perm) != list("0123"):
+            return None  # Partial job strategies and malformed ids are never stored
+        try:
+            bytes.fromhex(key)
+        except ValueError:
+            return None
+        perm = [int(p) for p in perm]
+        return self.library.get(key, perm) or self.cache.get(key, perm)
+
+    async def solve(self, request: SolverRequest, on_line=None) -> dict:
         """Run the solver with the given parameters"""
+        start = time.perf_counter()
+        
+        # Serve precomputed flops and suit-isomorphic repeats without running the solver
+        key, perm = spot_key(request)
+        solution_id = f"{key}-{''.join(map(str, perm))}"
+        for source, store in (("library", self.library), ("cache", self.cache)):
+            stored = store.get(key, perm)
+            record_cache(f"solver_{source}", stored is not None)
+            if stored is not None:
+                return {
+                    "status": "success",
+                    "result": stored,
+                    "solution_id": solution_id,
+                    "source": source,
+                    "computation_time": time.perf_counter() - start,
+                    "convergence": final_exploitability(stored)
+                }
+        
         if not self.solver_path:
             raise HTTPException(status_code=500, detail="Solver executable not found")
             
@@ -93,45 +196,52 @@ class SolverAPI:
                 "--ip-range", request.ip_range,
                 "--pot-size", str(request.pot_size),
                 "--effective-stack", str(request.effective_stack),
-                "--position", request.position
+                "--position", request.position,
+                "--accuracy", str(request.accuracy),
+                "--max-iterations", str(request.max_iterations),
+                "--thread-count", str(self.pool.threads_for(request.thread_count))
             ]
+            if request.bet_sizes:
+                cmd += ["--bet-sizes", json.dumps(request.bet_sizes)]
+            if request.use_isomorphism:
+                cmd.append("--use-isomorphism")
             
-            # Run the solver
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # Run the solver in the shared process pool
+            result = await self.pool.run(cmd, thread_count=request.thread_count, on_line=on_line)
             
             if result.returncode != 0:
                 raise HTTPException(status_code=500, detail=f"Solver error: {result.stderr}")
+            
+            self.cache.put(key, perm, result.stdout)
                 
             # Parse the output and return results
             return {
                 "status": "success",
-                "result": result.stdout
+                "result": result.stdout,
+                "solution_id": solution_id,
+                "source": "solver",
+                "computation_time": result.elapsed,
+                "convergence": final_exploitability(result.stdout)
             }
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
 # Initialize the solver API
 solver_api = SolverAPI()
+job_manager = JobManager(solver_api)
+strategy_store = StrategyStore(loader=solver_api.stored_solution)
+preflop_tables = PreflopTables()
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "TexasSolver GTO API is running", "version": "1.0.0"}
 
-@app.post("/solve", response_model=GTOResponse)
-async def solve_gto(hand_info: HandInfo):
-    """
-    Solve a poker hand using GTO principles
-    
-    Args:
-        hand_info: Complete poker hand information including board, ranges, stacks, etc.
-        
-    Returns:
-        GTOResponse with optimal strategy or error information
-    """
-    
-    # Validate input
+def build_solver_request(hand_info: HandInfo) -> SolverRequest:
+    """Validate a HandInfo and convert it into a SolverRequest"""
     if not hand_info.board:
         raise HTTPException(status_code=400, detail="Board cards are required")
     
@@ -139,39 +249,325 @@ async def solve_gto(hand_info: HandInfo):
         raise HTTPException(status_code=400, detail="Both OOP and IP ranges are required")
     
     # Validate board format
-    board_cards = hand_info.board.split(',')
+    try:
+        board_cards = parse_board(hand_info.board)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if len(board_cards) < 3 or len(board_cards) > 5:
         raise HTTPException(status_code=400, detail="Board must have 3-5 cards")
+    if len(set(board_cards)) != len(board_cards):
+        raise HTTPException(status_code=400, detail="Board contains duplicate cards")
     
-    # Solve the hand
-    result = await solver_api.solve(SolverRequest(
+    # Expand "+" and dash spans into the plain class/combo list the solver reads
+    solver_ranges = {}
+    for name in ("oop_range", "ip_range"):
+        try:
+            weights = parse_range(getattr(hand_info, name))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{name}: {e}")
+        if not remove_cards(weights, board_cards).any():
+            raise HTTPException(status_code=400, detail=f"{name} has no combos left on this board")
+        solver_ranges[name] = range_to_string(weights, compact=False)
+    
+    return SolverRequest(
         board=hand_info.board,
-        oop_range=hand_info.oop_range,
-        ip_range=hand_info.ip_range,
+        oop_range=solver_ranges["oop_range"],
+        ip_range=solver_ranges["ip_range"],
         pot_size=hand_info.pot_size,
         effective_stack=hand_info.effective_stack,
-        position=hand_info.position
-    ))
+        position=hand_info.position,
+        bet_sizes=hand_info.bet_sizes,
+        accuracy=hand_info.accuracy,
+        max_iterations=hand_info.max_iterations,
+        thread_count=hand_info.thread_count,
+        use_isomorphism=hand_info.use_isomorphism
+    )
+
+@solver_router.post("/solve", response_model=GTOResponse)
+async def solve_gto(hand_info: HandInfo):
+    """
+    Solve a poker hand using GTO principles
+    
+    Args:
+        hand_info: Complete poker hand information including board, ranges, stacks, etc.
+        
+    Returns:
+        GTOResponse with optimal strategy or error information
+    """
+    
+    # Validate input
+    with stage("validation"):
+        solver_request = build_solver_request(hand_info)
+    
+    return await solve_request(solver_request)
+
+async def solve_request(solver_request: SolverRequest) -> GTOResponse:
+    """Solve a validated request (or serve it from the library/cache) and summarize the strategy"""
+    result = await solver_api.solve(solver_request)
     
     if not result["status"] == "success":
         raise HTTPException(status_code=500, detail=result["error"])
     
+    with stage("parsing"):
+        strategy = await asyncio.to_thread(strategy_store.summary, result["solution_id"], result["result"])
     return GTOResponse(
         success=True,
-        strategy=result["result"],
-        computation_time=None,
-        convergence=None
+        strategy=strategy,
+        computation_time=result["computation_time"],
+        convergence=result["convergence"]
     )
 
+@solver_router.post("/solve/batch")
+async def solve_batch(request: Request):
+    """
+    Solve many spots in one request
+    
+    The body is a JSON array of HandInfo objects, or one HandInfo per line
+    with an application/x-ndjson content type. Results stream back as NDJSON
+    lines {"index", "status", "result" | "error"} as each spot finishes.
+    Identical spots are solved once; suit-isomorphic variants wait for the
+    first of them and are then served from the solution cache. Spots that
+    are already stored go first, and at most the pool's thread budget of
+    spots is in flight at once so a batch never overflows the solver queue.
+    """
+    items = await read_batch(request, SOLVE_BATCH_MAX_ITEMS)
+    with stage("validation"):
+        hands, errors = validate_items(items, HandInfo)
+        spots: Dict[tuple, Dict[str, Any]] = {}
+        variants: Dict[str, int] = {}
+        for index, hand_info in hands.items():
+            try:
+                solver_request = build_solver_request(hand_info)
+            except HTTPException as e:
+                errors[index] = {"index": index, "status": e.status_code, "error": e.detail}
+                continue
+            key, perm = spot_key(solver_request)
+            if (key, tuple(perm)) not in spots:
+                # Rank among the suit-isomorphic variants of this key: 0 for the first one seen
+                variant = variants[key] = variants.get(key, -1) + 1
+                spots[key, tuple(perm)] = {"key": key, "variant": variant, "request": solver_request, "indices": []}
+            spots[key, tuple(perm)]["indices"].append(index)
+    
+    key_locks: Dict[str, asyncio.Lock] = {}
+    
+    def solve_spot(spot):
+        lock = key_locks.setdefault(spot["key"], asyncio.Lock())
+        
+        async def compute():
+            async with lock:
+                return await solve_request(spot["request"])
+        return compute
+    
+    # Stored solutions first; isomorphic variants after all first variants, so they find those cached
+    ordered = sorted(spots.values(), key=lambda spot: (not solver_api.has_solution(spot["key"]), spot["variant"]))
+    groups = [(spot["indices"], solve_spot(spot)) for spot in ordered]
+    record_batch("solve", len(items), len(spots), len(errors))
+    return StreamingResponse(stream_results(groups, errors, concurrency=solver_api.pool.thread_budget),
+                             media_type=NDJSON_MEDIA_TYPE)
+
+@solver_router.get("/strategy/{solution_id}")
+async def get_strategy_node(solution_id: str, path: List[str] = Query([]), depth: int = 1,
+                            include_combos: bool = False):
+    """
+    Get one node of a solved strategy tree
+    
+    Args:
+        solution_id: Id returned in the strategy of a /solve or job response
+        path: Action or dealt-card labels leading from the root to the node
+        depth: How many levels of children to expand
+        include_combos: Include per-combo action frequencies
+    """
+    root = await asyncio.to_thread(strategy_store.get, solution_id)
+    if root is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired solution id")
+    try:
+        node = find_node(root, path)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"No child {e} on this path")
+    return {"solution_id": solution_id, "path": path, "node": node_to_dict(node, depth, include_combos)}
+
+@solver_router.get("/strategy/{solution_id}/combo")
+async def get_combo_strategy(solution_id: str, combo: str, path: List[str] = Query([])):
+    """Get the action frequencies of a single combo (e.g. the hero's hand) at a node"""
+    root = await asyncio.to_thread(strategy_store.get, solution_id)
+    if root is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired solution id")
+    try:
+        node = find_node(root, path)
+        frequencies = node.combo_frequencies(combo)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"No child {e} on this path")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if frequencies is None:
+        raise HTTPException(status_code=404, detail=f"{combo} is not in range at this node")
+    return {
+        "solution_id": solution_id,
+        "path": path,
+        "player": node.player,
+        "combo": combo,
+        "actions": node.actions,
+        "frequencies": [round(float(f), 4) for f in frequencies]
+    }
+
+@solver_router.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(hand_info: HandInfo):
+    """Start a solve in the background and return its job id"""
+    with stage("validation"):
+        solver_request = build_solver_request(hand_info)
+    job = job_manager.submit(solver_request)
+    return JobStatus(**job.snapshot())
+
+@solver_router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Poll the status and progress of a solve job"""
+    return JobStatus(**job_manager.get(job_id).snapshot())
+
+@solver_router.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Stream job progress (iteration, exploitability) as server-sent events"""
+    job = job_manager.get(job_id)
+    
+    async def event_stream():
+        async for snapshot in job_manager.events(job):
+            yield f"data: {json.dumps(snapshot)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@solver_router.get("/jobs/{job_id}/result", response_model=GTOResponse)
+async def get_job_result(job_id: str, partial: bool = False):
+    """
+    Get the strategy of a solve job
+    
+    Returns the final strategy once the job has completed. With partial=true
+    an unfinished or cancelled job returns its best-so-far strategy instead.
+    """
+    job = job_manager.get(job_id)
+    if job.status == "completed":
+        strategy = await asyncio.to_thread(strategy_store.summary, job.result["solution_id"], job.result["result"])
+        return GTOResponse(
+            success=True,
+            strategy=strategy,
+            computation_time=job.result["computation_time"],
+            convergence=job.result["convergence"]
+        )
+    if job.status == "failed":
+        return GTOResponse(success=False, error=job.error, computation_time=job.elapsed())
+    if partial and job.partial_strategy is not None:
+        strategy = await asyncio.to_thread(strategy_store.summary, f"{job.id}-partial-{job.iteration}",
+                                           job.partial_strategy)
+        return GTOResponse(
+            success=True,
+            strategy=strategy,
+            computation_time=job.elapsed(),
+            convergence=job.exploitability
+        )
+    raise HTTPException(status_code=409, detail=f"Job is {job.status}, no strategy available yet")
+
+@solver_router.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a running solve job, killing its solver process"""
+    job = await job_manager.cancel(job_id)
+    return JobStatus(**job.snapshot())
+
+def preflop_table_equity(hero: List[int], ranges: Optional[list], opponents: int,
+                         target_stderr: float = 0.0) -> Optional[dict]:
+    """Preflop equity from the precomputed tables, or None if they can't answer it as precisely as asked"""
+    if len(hero) != 2 or hero[0] == hero[1]:
+        return None
+    combo = combo_index(*hero)
+    if ranges is None:
+        lookup = preflop_tables.vs_random(combo, opponents)
+    elif len(ranges) == 1:
+        lookup = preflop_tables.vs_range(combo, ranges[0])
+    else:
+        return None
+    if lookup is None:
+        return None
+    equity, stderr = lookup
+    # Sampled tables can be coarser than the caller asked for; compute those spots live
+    if target_stderr and stderr > target_stderr:
+        return None
+    return {"equity": equity, "stderr": stderr, "samples": 0, "method": "table"}
+
+@equity_router.post("/equity", response_model=EquityResponse)
+async def get_equity(request: EquityRequest):
+    """
+    Calculate hero's all-in equity against opponent ranges (or random hands)
+    
+    Preflop spots against random hands or a single range are looked up in the
+    precomputed preflop tables. Spots with few unknown cards are enumerated
+    exactly; the rest use batched Monte Carlo that stops once target_stderr
+    is reached.
+    """
+    if not 1 <= request.iterations <= 10_000_000:
+        raise HTTPException(status_code=400, detail="iterations must be between 1 and 10,000,000")
+    try:
+        with stage("validation"):
+            hero = parse_cards(request.hero)
+            board = parse_cards(request.board)
+            if request.ranges:
+                ranges = [parse_range(r) for r in request.ranges]
+            elif 1 <= request.opponents <= 9:
+                ranges = [full_range()] * request.opponents
+            else:
+                raise ValueError("opponents must be between 1 and 9")
+            if len(ranges) > 9:
+                raise ValueError("At most 9 opponents are supported")
+        
+        start = time.perf_counter()
+        if request.use_tables and not board:
+            with stage("preflop_table"):
+                result = preflop_table_equity(hero, ranges if request.ranges else None, len(ranges),
+                                              request.target_stderr)
+            record_cache("preflop_table", result is not None)
+            if result:
+                return EquityResponse(**result, computation_time=time.perf_counter() - start)
+        with stage("equity"):
+            result = await asyncio.to_thread(
+                calculate_equity, hero, board, ranges, request.iterations, request.target_stderr, request.seed
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return EquityResponse(**result, computation_time=time.perf_counter() - start)
+
+@register_collector
+def solver_metrics():
+    """Solver pool utilisation and cache sizes for /metrics"""
+    pool = solver_api.pool.stats()
+    yield "gto_solver_threads_in_use", "Solver threads currently reserved", {}, pool["threads_in_use"]
+    yield "gto_solver_running", "Solver processes running", {}, pool["running"]
+    yield "gto_solver_waiting", "Solves waiting for solver threads", {}, pool["waiting"]
+
+def solver_readiness() -> dict:
+    """Whether solves can run (stored solutions are served either way)"""
+    return {
+        "ready": solver_api.solver_path is not None,
+        "solver_path": solver_api.solver_path,
+        "pool": solver_api.pool.stats(),
+    }
+
+def equity_readiness() -> dict:
+    """Equity needs no external resources; preflop tables only speed it up"""
+    return {"ready": True, "preflop_tables": preflop_tables.loaded}
+
 @app.get("/health")
 async def health_check():
     """Check if the solver is available"""
     return {
         "status": "ok",
         "solver_available": solver_api.solver_path is not None,
-        "solver_path": solver_api.solver_path
+        "solver_path": solver_api.solver_path,
+        "pool": solver_api.pool.stats(),
+        "cache": solver_api.cache.stats(),
+        "library": solver_api.library.stats(),
+        "preflop_tables": preflop_tables.stats()
     }
 
+app.include_router(solver_router)
+app.include_router(equity_router)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""
+Latency instrumentation shared by the solver API (main.py) and the poker API.
+
+  * `stage("prefill")` times a block into the stage histogram and, when the
+    request asked for it, into that request's profile. Profiles live in a
+    context variable, so they follow a request into `asyncio.to_thread`;
+    InferenceBatcher hands each request the profile of the batch it ran in.
+  * `record_cache("decision_cache", hit)` counts hits and misses.
+  * `install(app, "poker")` adds per-endpoint latency histograms, request
+    counters and in-flight gauges, a Prometheus text-format `GET /metrics`,
+    and the opt-in profiling header: requests sent with `X-Profile: 1` get a
+    `Server-Timing` response header with their stage breakdown in ms.
+    Latency and in-flight counts cover the whole response body, so streamed
+    responses (NDJSON batches, job events) count until their last chunk;
+    those do not get a Server-Timing header, as it goes out before their
+    stages run.
+
+Other components' stats (caches, pools, batcher) are exported by
+`register_collector` callbacks, read when /metrics is scraped.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+
+PROFILE_HEADER = "X-Profile"
+# Responses whose work happens while the body streams
+STREAMING_MEDIA_TYPES = ("application/x-ndjson", "text/event-stream")
+
+# Seconds; covers sub-millisecond cache hits up to long solver runs
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   60.0, 120.0, 300.0)
+
+_profile: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("profile", default=None)
+_lock = threading.Lock()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# name -> help text, and name -> labels -> value
+_help: Dict[str, Tuple[str, str]] = {}
+_histograms: Dict[str, Dict[Labels, Histogram]] = {}
+_counters: Dict[str, Dict[Labels, float]] = {}
+_gauges: Dict[str, Dict[Labels, float]] = {}
+_collectors: List[Callable[[], Iterable[Tuple[str, str, dict, float]]]] = []
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, value: float, help_text: str = "", **labels):
+    with _lock:
+        _help.setdefault(name, ("histogram", help_text))
+        series = _histograms.setdefault(name, {})
+        key = _labels(labels)
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+
+def increment(name: str, amount: float = 1.0, help_text: str = "", **labels):
+    with _lock:
+        _help.setdefault(name, ("counter", help_text))
+        series = _counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0.0) + amount
+
+
+def add_gauge(name: str, amount: float, help_text: str = "", **labels):
+    with _lock:
+        _help.setdefault(name, ("gauge", help_text))
+        series = _gauges.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0.0) + amount
+
+
+def counter_values() -> Dict[Tuple[str, Labels], float]:
+    """Snapshot of every counter, to find the increments a block of work made (see counter_increments)"""
+    with _lock:
+        return {(name, labels): value for name, series in _counters.items() for labels, value in series.items()}
+
+
+def counter_increments(before: Dict[Tuple[str, Labels], float]) -> List[Tuple[str, str, Labels, float]]:
+    """(name, help, labels, amount) of every counter increment since a counter_values() snapshot"""
+    with _lock:
+        return [(name, _help[name][1], labels, value - before.get((name, labels), 0.0))
+                for name, series in _counters.items() for labels, value in series.items()
+                if value != before.get((name, labels), 0.0)]
+
+
+def add_counters(increments: Iterable[Tuple[str, str, Labels, float]]):
+    """Apply counter increments recorded in another process (e.g. an inference worker)"""
+    for name, help_text, labels, amount in increments:
+        increment(name, amount, help_text, **dict(labels))
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, dict, float]]]):
+    """Add a callback yielding (name, help, labels, value) gauges at scrape time (usable as a decorator)"""
+    _collectors.append(collector)
+    return collector
+
+
+# Per-request profiles
+
+def current_profile() -> Optional[Dict[str, float]]:
+    return _profile.get()
+
+
+def observe_stage(name: str, seconds: float, profile: Optional[Dict[str, float]] = None):
+    """Record a stage duration globally and in the given (or current) request profile"""
+    observe("gto_stage_duration_seconds", seconds, "Time spent in each hot-path stage", stage=name)
+    profile = profile if profile is not None else _profile.get()
+    if profile is not None:
+        profile[name] = profile.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def call_with_profile(profile: Optional[Dict[str, float]], fn: Callable, *args):
+    """Run fn with `profile` as the current request profile (for executor threads)"""
+    token = _profile.set(profile)
+    try:
+        return fn(*args)
+    finally:
+        _profile.reset(token)
+
+
+def record_cache(cache: str, hit: bool):
+    increment("gto_cache_requests_total", 1.0, "Cache lookups by result", cache=cache,
+              result="hit" if hit else "miss")
+
+
+def server_timing(profile: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in profile.items())
+
+
+# Exposition
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _cache_hit_ratios() -> Iterable[Tuple[str, str, dict, float]]:
+    totals: Dict[str, Dict[str, float]] = {}
+    for labels, value in _counters.get("gto_cache_requests_total", {}).items():
+        label_map = dict(labels)
+        totals.setdefault(label_map["cache"], {}).setdefault(label_map["result"], value)
+    for cache, results in totals.items():
+        lookups = results.get("hit", 0.0) + results.get("miss", 0.0)
+        yield "gto_cache_hit_ratio", "Share of cache lookups that hit", {"cache": cache}, (
+            results.get("hit", 0.0) / lookups if lookups else 0.0)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            lines += [f"# HELP {name} {_help[name][1]}", f"# TYPE {name} histogram"]
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + [float("inf")], histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for kind, store in (("counter", _counters), ("gauge", _gauges)):
+            for name, series in sorted(store.items()):
+                lines += [f"# HELP {name} {_help[name][1]}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(labels)} {value}" for labels, value in sorted(series.items())]
+        collected = list(_cache_hit_ratios())
+
+    for collector in _collectors:
+        try:
+            collected += list(collector())
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+    described = set()
+    for name, help_text, labels, value in collected:
+        if name not in described:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            described.add(name)
+        lines.append(f"{name}{_format_labels(_labels(labels))} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def install(app, app_name: str):
+    """Add request metrics, the profiling header and GET /metrics to a FastAPI app"""
+
+    @app.middleware("http")
+    async def instrument(request: Request, call_next):
+        profiling = request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes")
+        token = _profile.set({} if profiling else None)
+        profile = _profile.get()
+        add_gauge("gto_http_in_flight", 1, "Requests being handled", app=app_name)
+        start = time.perf_counter()
+
+        def finish(status: int):
+            add_gauge("gto_http_in_flight", -1, "Requests being handled", app=app_name)
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            observe("gto_http_request_duration_seconds", time.perf_counter() - start, "End-to-end request latency",
+                    app=app_name, method=request.method, route=route)
+            increment("gto_http_requests_total", 1.0, "Requests by status code",
+                      app=app_name, method=request.method, route=route, status=status)
+
+        try:
+            response = await call_next(request)
+        except BaseException:
+            finish(500)
+            raise
+        finally:
+            _profile.reset(token)
+
+        # Streaming endpoints do their work while the body is sent, so the request ends with its last chunk
+        body = response.body_iterator
+
+        async def instrumented_body():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                finish(response.status_code)
+
+        response.body_iterator = instrumented_body()
+        streamed = response.headers.get("content-type", "").startswith(STREAMING_MEDIA_TYPES)
+        if profile is not None and not streamed:
+            response.headers["Server-Timing"] = server_timing({**profile, "total": time.perf_counter() - start})
+        return response
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics"""
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
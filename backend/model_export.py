@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Export the trained poker model for fast CPU inference.
+
+Merges the LoRA adapter into the base weights and saves a single safetensors
+checkpoint, either in bf16 or with every Linear layer quantized to int8
+(per-output-channel scales). `load_merged_model` loads bf16 checkpoints from
+the memory-mapped safetensors file; int8 weights are repacked into dynamic
+quantized Linear modules, which hold their own copy, so an int8 model lives
+in process memory (at about a quarter of its fp32 size) rather than in the
+page cache. Either way the API starts in seconds and runs without PEFT
+adapter overhead.
+
+    python model_export.py --dtype int8 --output ./poker-phi3-merged
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+import torch
+from torch import nn
+
+EXPORT_CONFIG = "poker_export.json"
+INT8_WEIGHTS = "model.int8.safetensors"
+
+
+def quantize_weight(weight: torch.Tensor):
+    """Symmetric per-output-channel int8 quantization"""
+    weight = weight.float()
+    scale = weight.abs().amax(dim=1).clamp(min=1e-8) / 127.0
+    qweight = torch.round(weight / scale[:, None]).clamp(-127, 127).to(torch.int8)
+    return qweight, scale
+
+
+def export_merged_model(adapter_path: str, base_model_name: str, output_path: str, dtype: str = "int8"):
+    """Merge the LoRA adapter and save a bf16 or int8 checkpoint"""
+    from peft import PeftModel
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    print("Loading base model...")
+    base_model = AutoModelForCausalLM.from_pretrained(
+        base_model_name,
+        torch_dtype=torch.float32,
+        trust_remote_code=True
+    )
+
+    print("Merging LoRA adapter...")
+    model = PeftModel.from_pretrained(base_model, adapter_path).merge_and_unload()
+    model.eval()
+
+    tokenizer = AutoTokenizer.from_pretrained(adapter_path, trust_remote_code=True)
+    save_merged_model(model, tokenizer, output_path, dtype, base_model_name, adapter_path)
+
+
+def save_merged_model(model, tokenizer, output_path: str, dtype: str = "int8",
+                      base_model_name: Optional[str] = None, adapter_path: Optional[str] = None):
+    """Save a plain (already merged) causal LM in the format load_merged_model reads"""
+    from safetensors.torch import save_file
+
+    os.makedirs(output_path, exist_ok=True)
+    tokenizer.save_pretrained(output_path)
+
+    if dtype == "bf16":
+        print("Saving bf16 checkpoint...")
+        model.to(torch.bfloat16).save_pretrained(output_path, safe_serialization=True)
+    elif dtype == "int8":
+        print("Quantizing Linear layers to int8...")
+        linear_names = {name for name, module in model.named_modules() if isinstance(module, nn.Linear)}
+        tensors = {}
+        for name, tensor in model.state_dict().items():
+            module_name, _, param = name.rpartition(".")
+            if module_name in linear_names and param == "weight":
+                tensors[name], tensors[f"{name}_scale"] = quantize_weight(tensor)
+            else:
+                tensors[name] = tensor.to(torch.bfloat16) if tensor.is_floating_point() else tensor
+            tensors[name] = tensors[name].contiguous()
+        model.config.save_pretrained(output_path)
+        save_file(tensors, os.path.join(output_path, INT8_WEIGHTS), metadata={"format": "pt"})
+    else:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+
+    with open(os.path.join(output_path, EXPORT_CONFIG), "w") as f:
+        json.dump({"dtype": dtype, "base_model": base_model_name, "adapter": adapter_path}, f, indent=2)
+    print(f"Exported {dtype} model to {output_path}")
+
+
+def _set_submodule(model: nn.Module, name: str, module: nn.Module):
+    parent_name, _, child = name.rpartition(".")
+    setattr(model.get_submodule(parent_name) if parent_name else model, child, module)
+
+
+def load_int8_model(model_path: str):
+    """
+    Build the model skeleton without weights and fill it from the int8 checkpoint.
+
+    quantized.dynamic.Linear packs every weight into its own buffer, so nothing
+    stays mapped from the file; loading peaks at one layer's fp32 copy on top.
+    """
+    from accelerate import init_empty_weights
+    from accelerate.utils import set_module_tensor_to_device
+    from safetensors import safe_open
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+    with init_empty_weights(include_buffers=False):
+        model = AutoModelForCausalLM.from_config(config, trust_remote_code=True, torch_dtype=torch.float32)
+
+    with safe_open(os.path.join(model_path, INT8_WEIGHTS), framework="pt") as f:
+        keys = set(f.keys())
+        for name, module in list(model.named_modules()):
+            if not isinstance(module, nn.Linear) or f"{name}.weight_scale" not in keys:
+                continue
+            scale = f.get_tensor(f"{name}.weight_scale")
+            weight = f.get_tensor(f"{name}.weight").float() * scale[:, None]
+            qweight = torch.quantize_per_channel(
+                weight, scale.double(), torch.zeros_like(scale, dtype=torch.long), 0, torch.qint8
+            )
+            bias = f.get_tensor(f"{name}.bias").float() if f"{name}.bias" in keys else None
+            qlinear = torch.ao.nn.quantized.dynamic.Linear(
+                module.in_features, module.out_features, bias_=bias is not None, dtype=torch.qint8
+            )
+            qlinear.set_weight_bias(qweight, bias)
+            _set_submodule(model, name, qlinear)
+            keys.discard(f"{name}.weight")
+            keys.discard(f"{name}.weight_scale")
+            keys.discard(f"{name}.bias")
+
+        for name in keys:
+            tensor = f.get_tensor(name)
+            set_module_tensor_to_device(model, name, "cpu", value=tensor.float() if tensor.is_floating_point() else tensor)
+
+    model.tie_weights()
+    return model
+
+
+def load_merged_model(model_path: str):
+    """Load a checkpoint written by export_merged_model"""
+    from transformers import AutoModelForCausalLM
+
+    with open(os.path.join(model_path, EXPORT_CONFIG)) as f:
+        dtype = json.load(f)["dtype"]
+
+    if dtype == "int8":
+        model = load_int8_model(model_path)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            torch_dtype=torch.bfloat16,
+            low_cpu_mem_usage=True,
+            trust_remote_code=True
+        )
+    model.eval()
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the LoRA adapter and export a quantized checkpoint")
+    parser.add_argument("--adapter", default="./poker-phi3-final", help="Trained LoRA adapter directory")
+    parser.add_argument("--base-model", default="microsoft/Phi-3-mini-4k-instruct")
+    parser.add_argument("--output", default="./poker-phi3-merged")
+    parser.add_argument("--dtype", choices=["int8", "bf16"], default="int8")
+    args = parser.parse_args()
+
+    start = time.time()
+    export_merged_model(args.adapter, args.base_model, args.output, args.dtype)
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
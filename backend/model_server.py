@@ -0,0 +1,220 @@
+"""
+Forked inference workers for the poker model (see ModelServer).
+
+Each worker talks to the parent over its own Pipe:
+
+  * after its `init` callback, the worker sends ("ready", stats report), or
+    ("error", message) and exits if init failed;
+  * the parent sends one batch at a time as a list of items; the worker
+    answers ("ok", (results, stage profile, counter increments, stats
+    report)) or ("error", message) if `run_batch` raised;
+  * the parent sends None to make the worker exit.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+import metrics
+from caching import LRUCache
+
+
+class _Worker:
+    """Parent-side handle of one forked inference process"""
+
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.lock = threading.Lock()  # One batch on the pipe at a time
+        self.load = 0  # Requests assigned and not yet answered
+        self.alive = True
+        self.batches = 0
+        self.requests = 0
+        self.busy_time = 0.0
+        self.stats = {}  # Latest report of the worker's `stats` callback
+
+
+def _worker_main(conn, num_threads: int, init: Optional[Callable[[], None]], run_batch: Callable,
+                 stats: Optional[Callable[[], dict]]):
+    """
+    Inference loop of a forked worker: receive a batch, send back its results,
+    stage timings, counter increments and stats report
+    """
+    import torch
+
+    torch.set_num_threads(num_threads)
+    try:
+        if init is not None:
+            init()
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", stats() if stats is not None else {}))
+
+    while True:
+        try:
+            items = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if items is None:
+            break
+        profile = {}
+        counters = metrics.counter_values()
+        try:
+            results = metrics.call_with_profile(profile, run_batch, items)
+            report = stats() if stats is not None else {}
+            conn.send(("ok", (results, profile, metrics.counter_increments(counters), report)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class ModelServer:
+    """
+    Forked inference workers sharing one copy of the model weights.
+
+    The parent loads the model, moves its parameters and buffers into shared
+    memory and forks `num_workers` processes; tensors that are not ordinary
+    parameters (e.g. packed int8 weights) are shared copy-on-write, since
+    workers never write to them. Fork before the parent runs any inference,
+    so no intra-op thread pool is inherited, and from the event loop thread.
+
+    Each worker runs with `num_threads` intra-op threads. `run_batch` sends a
+    batch to the worker with the fewest outstanding requests, preferring the
+    one that last served the batch's hand (its prefix cache holds that hand).
+
+    Stage timings and counter increments (e.g. cache hits) recorded in a
+    worker are replayed into this process's metrics, and the `stats`
+    callback's report from each worker's latest batch is kept per worker
+    (see `worker_stats`) for state that only exists in the workers.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], num_workers: int, num_threads: int = 1,
+                 init: Optional[Callable[[], None]] = None, stats: Optional[Callable[[], dict]] = None):
+        self.run_batch_fn = run_batch
+        self.num_workers = max(1, num_workers)
+        self.num_threads = max(1, num_threads)
+        self.init = init
+        self.stats_fn = stats
+        self.workers: List[_Worker] = []
+        self.hand_workers = LRUCache(10000)  # hand id -> worker index that last served it
+        self.lock = threading.Lock()
+        self.errors = 0
+
+    def start(self, model=None):
+        """Share the model's tensors and fork the workers (returns without waiting for them)"""
+        if model is not None:
+            model.share_memory()
+        # The Rust tokenizer's thread pool is not fork-safe
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+        context = multiprocessing.get_context("fork")
+        for index in range(self.num_workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child_conn, self.num_threads, self.init, self.run_batch_fn, self.stats_fn),
+                name=f"inference-{index}",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self.workers.append(_Worker(index, process, parent_conn))
+
+    def wait_ready(self):
+        """Block until every worker finished its init; raises if one failed"""
+        for worker in self.workers:
+            try:
+                status, payload = worker.conn.recv()
+            except EOFError:
+                status, payload = "error", f"exit code {worker.process.exitcode}"
+            if status != "ready":
+                self.stop()
+                raise RuntimeError(f"Inference worker {worker.index} failed to start: {payload}")
+            worker.stats = payload
+        print(f"{self.num_workers} inference workers ready ({self.num_threads} threads each)")
+
+    def _pick(self, hand_ids: List[str], size: int) -> _Worker:
+        with self.lock:
+            alive = [w for w in self.workers if w.alive]
+            if not alive:
+                raise RuntimeError("No inference workers are running")
+            least = min(w.load for w in alive)
+            candidates = [w for w in alive if w.load == least]
+            preferred = {self.hand_workers.get(hand_id) for hand_id in hand_ids}
+            worker = next((w for w in candidates if w.index in preferred), candidates[0])
+            worker.load += size
+            for hand_id in hand_ids:
+                self.hand_workers.put(hand_id, worker.index)
+            return worker
+
+    def run_batch(self, items: List[Any]) -> List[Any]:
+        """Run one batch on the least-loaded worker (blocking; call from an executor thread)"""
+        hand_ids = [hand_id for hand_id in (getattr(item, "hand_id", None) for item in items) if hand_id]
+        worker = self._pick(hand_ids, len(items))
+        start = time.perf_counter()
+        try:
+            with worker.lock:
+                try:
+                    worker.conn.send(items)
+                    status, payload = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.alive = False
+                    raise RuntimeError(f"Inference worker {worker.index} exited "
+                                       f"(exit code {worker.process.exitcode})")
+        finally:
+            with self.lock:
+                worker.load -= len(items)
+                worker.batches += 1
+                worker.requests += len(items)
+                worker.busy_time += time.perf_counter() - start
+
+        if status != "ok":
+            self.errors += 1
+            raise RuntimeError(payload)
+        results, profile, counters, report = payload
+        # Stage timings and counters recorded in the worker count towards this process's metrics
+        for name, seconds in profile.items():
+            metrics.observe_stage(name, seconds)
+        metrics.add_counters(counters)
+        worker.stats = report
+        return results
+
+    def stop(self):
+        """Ask the workers to exit and reap them"""
+        for worker in self.workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.alive = False
+
+    def worker_stats(self) -> List[dict]:
+        """Latest `stats` report of every live worker"""
+        return [w.stats for w in self.workers if w.alive]
+
+    def stats(self) -> dict:
+        """Per-worker load and utilisation"""
+        return {
+            "workers": self.num_workers,
+            "threads_per_worker": self.num_threads,
+            "alive": sum(w.alive for w in self.workers),
+            "errors": self.errors,
+            "per_worker": [
+                {
+                    "pid": w.process.pid,
+                    "alive": w.alive and w.process.is_alive(),
+                    "load": w.load,
+                    "batches": w.batches,
+                    "requests": w.requests,
+                    "busy_time_s": round(w.busy_time, 3),
+                    "stats": w.stats,
+                }
+                for w in self.workers
+            ],
+        }
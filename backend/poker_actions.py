@@ -0,0 +1,78 @@
+import json
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+
+# Written by explore_dataset.py from the distinct PokerBench outputs
+ACTIONS_FILE = os.environ.get("POKER_ACTIONS_FILE", "poker_actions.json")
+
+# Anchor the prompt ends with; action tokens are taken relative to it
+ACTION_ANCHOR = "### Optimal Action:"
+
+ACTION_RE = re.compile(r"^\s*(fold|call|check|bet|raise)(?:\s+(\d+(?:\.\d+)?))?", re.IGNORECASE)
+
+
+def default_actions() -> List[str]:
+    """Fallback action set when no vocabulary file has been generated"""
+    sizes = [str(n) for n in range(1, 101)]
+    return ["fold", "call", "check"] + [f"bet {s}" for s in sizes] + [f"raise {s}" for s in sizes]
+
+
+def load_actions(path: str = ACTIONS_FILE) -> List[str]:
+    """The action vocabulary: every distinct PokerBench output"""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return default_actions()
+
+
+def parse_action(action: str) -> Tuple[Optional[str], Optional[float]]:
+    """Split an action like "bet 18" into its category and amount"""
+    match = ACTION_RE.match(action or "")
+    if not match:
+        return None, None
+    amount = float(match.group(2)) if match.group(2) else None
+    return match.group(1).lower(), amount
+
+
+class ActionTrie:
+    """
+    Prefix trie over the tokenizations of every action.
+
+    Each action is tokenized as the text that follows the prompt anchor in
+    training ("\\n" + action) and terminated with EOS, so every action ends
+    in its own leaf. Internal nodes are identified by their token prefix;
+    scoring an action needs the next-token logits at the prompt (the root)
+    and at every internal node on its path, and actions sharing a prefix
+    share those nodes.
+    """
+
+    def __init__(self, tokenizer, actions: Sequence[str]):
+        self.actions = list(actions)
+        self.eos_token_id = tokenizer.eos_token_id
+        anchor_ids = tokenizer(ACTION_ANCHOR, add_special_tokens=False)["input_ids"]
+
+        self.action_tokens: List[List[int]] = []
+        for action in self.actions:
+            ids = tokenizer(ACTION_ANCHOR + "\n" + action, add_special_tokens=False)["input_ids"]
+            if ids[:len(anchor_ids)] == anchor_ids:
+                ids = ids[len(anchor_ids):]
+            else:
+                ids = tokenizer("\n" + action, add_special_tokens=False)["input_ids"]
+            self.action_tokens.append(list(ids) + [self.eos_token_id])
+
+    def nodes(self, indices: Sequence[int]) -> List[Tuple[int, ...]]:
+        """Internal nodes (besides the root) on the paths of the given actions, parents first"""
+        prefixes = {tuple(self.action_tokens[i][:end]) for i in indices
+                    for end in range(1, len(self.action_tokens[i]))}
+        return sorted(prefixes, key=lambda p: (len(p), p))
+
+    def restrict(self, legal_actions: Optional[Sequence[str]]) -> List[int]:
+        """Indices of the actions to score, optionally limited to a legal subset"""
+        if not legal_actions:
+            return list(range(len(self.actions)))
+        legal = {a.strip().lower() for a in legal_actions}
+        indices = [i for i, a in enumerate(self.actions) if a.lower() in legal]
+        if not indices:
+            raise ValueError("None of the legal actions are in the action vocabulary")
+        return indices
@@ -1,68 +1,223 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from peft import PeftModel
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import os
+import time
+
+from batch_stream import NDJSON_MEDIA_TYPE, read_batch, record_batch, stream_results, validate_items
+from decision_cache import DecisionCache, decision_key, load_test_instructions
+from inference_batcher import InferenceBatcher
+import metrics
+from metrics import record_cache, register_collector, stage
+from model_server import ModelServer
+from policy_model import POLICY_MODEL_PATH, PolicyModel
+from poker_actions import ActionTrie, load_actions
+from prefix_cache import PrefixKVCache, select_positions
 
 app = FastAPI(title="Poker AI API", description="API for optimal poker decision making")
+metrics.install(app, "poker")
+
+# Endpoints live on a router so service.py can mount them next to the solver API
+router = APIRouter(tags=["poker"])
 
 # Global variables for model and tokenizer
 model = None
 tokenizer = None
+action_trie = None
+policy_model = None
+model_server = None
+
+# LLM load progress: "not_loaded", "loading", "ready" or "failed"
+model_state = "not_loaded"
+model_error = None
+model_task = None
+
+# "peft" loads the fp32 base model plus LoRA adapter, "merged" loads the
+# checkpoint written by model_export.py (bf16 or int8; only bf16 weights are
+# memory-mapped from the file, int8 ones are repacked into quantized Linears)
+MODEL_FORMAT = os.environ.get("POKER_MODEL_FORMAT", "peft")
+MODEL_PATH = os.environ.get(
+    "POKER_MODEL_PATH", "./poker-phi3-merged" if MODEL_FORMAT == "merged" else "./poker-phi3-final"
+)
+BASE_MODEL_NAME = "microsoft/Phi-3-mini-4k-instruct"
+
+# Start loading the LLM in the background at startup; 0 = load on the first decision that needs it
+POKER_WARMUP = os.environ.get("POKER_WARMUP", "1") == "1"
+
+# Forked inference processes sharing one copy of the weights (0 = run inference in the API process)
+INFERENCE_WORKERS = int(os.environ.get("POKER_INFERENCE_WORKERS", 0))
+# Intra-op threads per inference worker
+WORKER_THREADS = int(os.environ.get("POKER_WORKER_THREADS", max(1, (os.cpu_count() or 1) // max(1, INFERENCE_WORKERS))))
+
+# Micro-batching configuration (override with environment variables)
+MAX_BATCH_SIZE = int(os.environ.get("POKER_MAX_BATCH_SIZE", 8))
+BATCH_WAIT_MS = float(os.environ.get("POKER_BATCH_WAIT_MS", 10))
+# Most game states accepted by one /poker/decision/batch request
+POKER_BATCH_MAX_ITEMS = int(os.environ.get("POKER_BATCH_MAX_ITEMS", 1000))
+
+# "score" ranks the known action set in one pass, "generate" samples free text
+DECODE_MODE = os.environ.get("POKER_DECODE_MODE", "score")
+
+# Spots the fast policy model (policy_model.py) is at least this confident about skip the LLM
+POLICY_THRESHOLD = float(os.environ.get("POKER_POLICY_THRESHOLD", 0.9))
+
+# Memory budget for cached prompt-prefix KV tensors
+PREFIX_CACHE_MB = int(os.environ.get("POKER_PREFIX_CACHE_MB", 512))
+# Most query tokens (prompt suffixes plus action-trie nodes) per packed scoring pass
+SCORE_PACK_TOKENS = int(os.environ.get("POKER_SCORE_PACK_TOKENS", 1024))
+
+# Every PokerBench prompt starts with this preamble
+POKERBENCH_PREAMBLE = (
+    "You are a specialist in playing 6-handed No Limit Texas Holdem. The following will be a game "
+    "scenario and you need to make the optimal decision.\n\nHere is a game summary:\n\n"
+)
+
+prefix_cache = PrefixKVCache(max_bytes=PREFIX_CACHE_MB * 1024 * 1024)
+decision_cache = DecisionCache()
+
+# Cached decisions are only valid for the model and decode mode that produced them
+MODEL_ID = f"{MODEL_FORMAT}:{os.path.abspath(MODEL_PATH)}:{DECODE_MODE}"
 
 class PokerRequest(BaseModel):
     game_state: str
+    legal_actions: Optional[List[str]] = None  # Restrict scoring to these actions
+    hand_id: Optional[str] = None  # Lets later decisions in the same hand reuse this prompt's KV cache
     
 class PokerResponse(BaseModel):
     optimal_action: str
     confidence: float = 1.0
+    action_probabilities: Optional[Dict[str, float]] = None
+    source: Optional[str] = None  # "cache", "policy" or "llm"
+
+class CacheWarmRequest(BaseModel):
+    limit: int = 1000  # Number of PokerBench test prompts to decide
 
-def load_poker_model():
-    """Load the trained poker model"""
-    global model, tokenizer
+def load_poker_model(warm: bool = True):
+    """
+    Load the trained poker model (torch, transformers and peft are only imported here)
     
-    model_path = "./poker-phi3-final"
-    base_model_name = "microsoft/Phi-3-mini-4k-instruct"
+    With `warm=False` the shared preamble is not prefilled, so the model has
+    not run yet; inference workers forked afterwards warm their own copy.
+    """
+    global model, tokenizer, action_trie
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    
+    model_path = MODEL_PATH
     
     if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Trained model not found at {model_path}. Please train the model first.")
+        hint = "Run model_export.py first." if MODEL_FORMAT == "merged" else "Please train the model first."
+        raise FileNotFoundError(f"Trained model not found at {model_path}. {hint}")
     
     print("Loading tokenizer...")
     tokenizer = AutoTokenizer.from_pretrained(model_path, trust_remote_code=True)
     tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"  # Batched generation continues from the right edge
     
-    print("Loading base model...")
-    base_model = AutoModelForCausalLM.from_pretrained(
-        base_model_name,
-        torch_dtype=torch.float32,
-        device_map="auto" if torch.cuda.is_available() else None,
-        trust_remote_code=True
-    )
+    if MODEL_FORMAT == "merged":
+        from model_export import load_merged_model
+        
+        print("Loading merged model...")
+        model = load_merged_model(model_path)
+    else:
+        from peft import PeftModel
+        
+        print("Loading base model...")
+        base_model = AutoModelForCausalLM.from_pretrained(
+            BASE_MODEL_NAME,
+            torch_dtype=torch.float32,
+            device_map="auto" if torch.cuda.is_available() else None,
+            trust_remote_code=True
+        )
+        
+        print("Loading LoRA adapter...")
+        model = PeftModel.from_pretrained(base_model, model_path)
+        model.eval()
     
-    print("Loading LoRA adapter...")
-    model = PeftModel.from_pretrained(base_model, model_path)
-    model.eval()
+    print("Building action trie...")
+    action_trie = ActionTrie(tokenizer, load_actions())
+    
+    if warm:
+        print("Caching prompt preamble...")
+        warm_prefix_cache()
     
     print("Model loaded successfully!")
 
+def start_model_server():
+    """Fork the inference workers; call from the event loop thread once the weights are loaded"""
+    global model_server
+    print(f"Starting {INFERENCE_WORKERS} inference workers...")
+    model_server = ModelServer(decide_batch, INFERENCE_WORKERS, WORKER_THREADS, init=warm_prefix_cache,
+                               stats=prefix_cache.stats)
+    model_server.start(model)
+
+async def load_model_in_background():
+    """Run load_poker_model on a worker thread (then fork the inference workers), recording failures"""
+    global model_state, model_error
+    model_state = "loading"
+    start = time.perf_counter()
+    try:
+        if INFERENCE_WORKERS > 0:
+            await asyncio.to_thread(load_poker_model, False)
+            start_model_server()
+            await asyncio.to_thread(model_server.wait_ready)
+        else:
+            await asyncio.to_thread(load_poker_model)
+        model_state = "ready"
+        print(f"Model ready after {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        model_state = "failed"
+        model_error = str(e)
+        print(f"Error loading model: {e}")
+        print("API started without model. Train the model first.")
+
+def start_model_load() -> asyncio.Task:
+    """Start loading the LLM once; later calls return the same task"""
+    global model_task
+    if model_task is None:
+        model_task = asyncio.create_task(load_model_in_background())
+    return model_task
+
+async def ensure_poker_model():
+    """Wait for the LLM, loading it now if the warm-up is disabled"""
+    if model_state != "ready":
+        await asyncio.shield(start_model_load())
+    if model_state != "ready":
+        raise HTTPException(status_code=503, detail=f"Model not loaded: {model_error}")
+
 def format_poker_prompt(instruction):
     """Format poker instruction for inference"""
     return f"### Poker Decision Request:\n{instruction}\n\n### Optimal Action:"
 
-def get_poker_decision(game_state: str) -> str:
-    """Get optimal poker decision from the model"""
+def warm_prefix_cache():
+    """Prefill the shared PokerBench preamble once and pin its KV cache"""
+    prompt = format_poker_prompt(POKERBENCH_PREAMBLE)
+    prefix = prompt[:prompt.index(POKERBENCH_PREAMBLE) + len(POKERBENCH_PREAMBLE)]
+    import torch
+    
+    inputs = tokenizer(prefix, return_tensors="pt")
+    with torch.no_grad():
+        outputs = model(**inputs, use_cache=True)
+    prefix_cache.add_shared("preamble", inputs["input_ids"][0].tolist(), outputs.past_key_values)
+
+def get_poker_decisions(game_states: List[str]) -> List[str]:
+    """Get optimal poker decisions for a batch of game states in one generate call"""
+    import torch
+    
     if model is None or tokenizer is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
-    # Format the prompt
-    prompt = format_poker_prompt(game_state)
+    # Format the prompts
+    prompts = [format_poker_prompt(game_state) for game_state in game_states]
     
-    # Tokenize
-    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+    # Tokenize (left-padded so every prompt ends where generation starts)
+    with stage("tokenization"):
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True, max_length=512)
     
-    # Generate response
-    with torch.no_grad():
+    # Generate responses
+    with torch.no_grad(), stage("decode"):
         outputs = model.generate(
             **inputs,
             max_new_tokens=10,  # Poker actions are typically short
@@ -72,28 +227,215 @@ def get_poker_decision(game_state: str) -> str:
             eos_token_id=tokenizer.eos_token_id,
         )
     
-    # Decode the response
-    full_response = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    # Decode only the generated part of each response
+    generated = outputs[:, inputs["input_ids"].shape[1]:]
+    actions = []
+    for response in tokenizer.batch_decode(generated, skip_special_tokens=True):
+        # Clean up the action (remove any extra text)
+        action_lines = response.strip().split('\n')
+        actions.append(action_lines[0].strip() if action_lines else "")
+    
+    return actions
+
+def pack_scoring_inputs(prefix_len: int, prompts: List[List[int]], nodes: List[List[Tuple[int, ...]]], dtype):
+    """
+    One packed query sequence for several prompts that share a cached prefix
+
+    Each prompt contributes its tokens after the prefix, then one token per
+    action-trie node (the node prefix's last token, at the position it would
+    have after the prompt). The 4D mask lets every token see the prefix and
+    its own prompt causally; trie nodes also see their ancestors. Returns the
+    model inputs, the sequence offset of each prompt's segment and the query
+    rows whose logits are needed: each prompt's last token, then its nodes.
+    """
+    import torch
+    
+    tokens, positions, offsets, node_rows = [], [], [], []
+    for ids, prompt_nodes in zip(prompts, nodes):
+        offsets.append(len(tokens))
+        tokens += ids[prefix_len:]
+        positions += range(prefix_len, len(ids))
+        rows = {}
+        for node in prompt_nodes:
+            rows[node] = len(tokens)
+            tokens.append(node[-1])
+            positions.append(len(ids) + len(node) - 1)
+        node_rows.append(rows)
+    
+    length = len(tokens)
+    allowed = torch.zeros((length, prefix_len + length), dtype=torch.bool)
+    allowed[:, :prefix_len] = True
+    keep = []
+    for ids, start, rows in zip(prompts, offsets, node_rows):
+        suffix = len(ids) - prefix_len
+        own = slice(prefix_len + start, prefix_len + start + suffix)
+        allowed[start:start + suffix, own] = torch.ones((suffix, suffix), dtype=torch.bool).tril()
+        keep.append(start + suffix - 1)
+        for node, row in rows.items():
+            allowed[row, own] = True
+            for depth in range(1, len(node) + 1):
+                allowed[row, prefix_len + rows[node[:depth]]] = True
+            keep.append(row)
+    mask = torch.zeros(allowed.shape, dtype=dtype).masked_fill(~allowed, torch.finfo(dtype).min)
+    
+    inputs = {
+        "input_ids": torch.tensor([tokens], dtype=torch.long),
+        "position_ids": torch.tensor([positions], dtype=torch.long),
+        "attention_mask": mask[None, None],
+    }
+    return inputs, offsets, keep
+
+def score_poker_decisions(requests: List[PokerRequest]) -> List[Tuple[str, Dict[str, float]]]:
+    """
+    Score the (legal) actions of a batch of game states; returns each argmax action and distribution
+    
+    Prompts are grouped by the longest cached prefix they start with (the
+    PokerBench preamble or the hand's previous prompt, see PrefixKVCache).
+    Each group runs in packed forward passes of up to SCORE_PACK_TOKENS
+    query tokens over a single copy of that prefix: every prompt's uncached
+    suffix followed by the trie nodes of its candidate actions only (see
+    pack_scoring_inputs), so one pass both prefills the prompts and yields
+    the logits needed to score every candidate.
+    """
+    import torch
+    
+    if model is None or tokenizer is None or action_trie is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    candidates = [action_trie.restrict(r.legal_actions) for r in requests]
+    with stage("tokenization"):
+        prompts = [tokenizer(format_poker_prompt(r.game_state), truncation=True, max_length=512)["input_ids"]
+                   for r in requests]
+    nodes = [action_trie.nodes(c) for c in candidates]
+    
+    # (cache entry, matched length) -> indices of the requests starting with that prefix
+    matches: Dict[Tuple[Any, int], List[int]] = {}
+    for i, (request, ids) in enumerate(zip(requests, prompts)):
+        entry, cached_len = prefix_cache.match(ids, request.hand_id)
+        record_cache("prefix_cache", entry is not None)
+        matches.setdefault((entry, cached_len), []).append(i)
+    # One copy of each matched prefix, taken before any pack stores a hand's new cache
+    groups: Dict[Tuple[int, ...], Tuple[Any, List[int]]] = {}
+    for (entry, cached_len), indices in matches.items():
+        past = prefix_cache.checkout(entry, cached_len) if entry is not None else None
+        prefix = tuple(prompts[indices[0]][:cached_len]) if past is not None else ()
+        groups.setdefault(prefix, (past, []))[1].extend(indices)
     
-    # Extract just the action part
-    action_start = full_response.find("### Optimal Action:") + len("### Optimal Action:")
-    action = full_response[action_start:].strip()
+    results = [None] * len(requests)
+    with torch.no_grad():
+        for prefix, (past, indices) in groups.items():
+            packs, size = [], SCORE_PACK_TOKENS
+            for i in indices:
+                cost = len(prompts[i]) - len(prefix) + len(nodes[i])
+                if size + cost > SCORE_PACK_TOKENS:
+                    packs.append([])
+                    size = 0
+                packs[-1].append(i)
+                size += cost
+            
+            for pack in packs:
+                with stage("prefill"):
+                    inputs, offsets, keep = pack_scoring_inputs(
+                        len(prefix), [prompts[i] for i in pack], [nodes[i] for i in pack], model.dtype
+                    )
+                    outputs = model(**inputs, past_key_values=past, use_cache=True,
+                                    logits_to_keep=torch.tensor(keep))
+                    for i, start in zip(pack, offsets):
+                        if requests[i].hand_id is not None:
+                            suffix = range(len(prefix) + start, len(prefix) + start + len(prompts[i]) - len(prefix))
+                            prefix_cache.store(requests[i].hand_id, prompts[i],
+                                               select_positions(outputs.past_key_values, [*range(len(prefix)), *suffix]))
+                    if past is not None:
+                        # Drop this pack's tokens so the next pack reuses the bare prefix
+                        past.crop(len(prefix) - past.get_seq_length())
+                
+                with stage("decode"):
+                    logprobs = torch.log_softmax(outputs.logits[0].float(), dim=-1)
+                    row = 0
+                    for i in pack:
+                        node_logprobs = {(): logprobs[row]}
+                        for k, node in enumerate(nodes[i], start=1):
+                            node_logprobs[node] = logprobs[row + k]
+                        row += 1 + len(nodes[i])
+                        results[i] = score_actions(candidates[i], node_logprobs)
+    return results
+
+def score_actions(candidates: List[int], node_logprobs: Dict[Tuple[int, ...], Any]) -> Tuple[str, Dict[str, float]]:
+    """Sum token log-probs along each candidate's trie path (including its EOS); best action and distribution"""
+    import torch
     
-    # Clean up the action (remove any extra text)
-    action_lines = action.split('\n')
-    if action_lines:
-        action = action_lines[0].strip()
+    scores = torch.empty(len(candidates))
+    for k, index in enumerate(candidates):
+        tokens = action_trie.action_tokens[index]
+        scores[k] = sum(float(node_logprobs[tuple(tokens[:depth])][token]) for depth, token in enumerate(tokens))
     
-    return action
+    probabilities = torch.softmax(scores, dim=0)
+    ranked = sorted(zip(candidates, probabilities.tolist()), key=lambda x: -x[1])
+    distribution = {action_trie.actions[i]: p for i, p in ranked}
+    return action_trie.actions[ranked[0][0]], distribution
+
+def get_poker_decision(game_state: str) -> str:
+    """Get optimal poker decision from the model"""
+    return get_poker_decisions([game_state])[0]
+
+def decide_batch(requests: List[PokerRequest]) -> List[Tuple[str, Optional[Dict[str, float]]]]:
+    """Decide a batch of requests in this process with the configured decode mode"""
+    if DECODE_MODE == "generate":
+        return [(action, None) for action in get_poker_decisions([r.game_state for r in requests])]
+    return score_poker_decisions(requests)
+
+def run_decision_batch(requests: List[PokerRequest]) -> List[Tuple[str, Optional[Dict[str, float]]]]:
+    """Decide a batch on the least-loaded inference worker, or in this process without workers"""
+    if model_server is not None:
+        return model_server.run_batch(requests)
+    return decide_batch(requests)
+
+# Batches concurrent /poker/decision requests onto a dedicated inference thread
+# (one per inference worker, so every worker can have a batch in flight)
+batcher = InferenceBatcher(run_decision_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=BATCH_WAIT_MS,
+                           num_threads=max(1, INFERENCE_WORKERS))
+
+def prefix_cache_stats() -> dict:
+    """Prefix-cache stats of this process, or summed over the inference workers that hold the caches"""
+    if model_server is None:
+        return prefix_cache.stats()
+    reports = model_server.worker_stats()
+    total = {key: sum(r.get(key, 0) for r in reports)
+             for key in ("shared_prefixes", "hands", "bytes", "max_bytes", "hits", "misses", "reused_tokens")}
+    lookups = total["hits"] + total["misses"]
+    total["hit_ratio"] = total["hits"] / lookups if lookups else 0.0
+    return total
+
+@register_collector
+def decision_metrics():
+    """Batcher, cache and router gauges for /metrics"""
+    batcher_stats = batcher.stats()
+    yield "gto_batcher_in_flight", "Decisions waiting for or running inference", {}, batcher_stats["in_flight"]
+    yield "gto_batcher_avg_batch_size", "Average requests per inference batch", {}, batcher_stats["avg_batch_size"]
+    yield "gto_prefix_cache_bytes", "Memory held by cached prompt-prefix KV tensors", {}, prefix_cache_stats()["bytes"]
+    for source, count in router_counts.items():
+        yield "gto_decisions_by_source", "Uncached decisions answered by each backend", {"source": source}, count
+    if model_server is not None:
+        for worker in model_server.stats()["per_worker"]:
+            yield "gto_inference_worker_load", "Requests assigned to each inference worker", {"worker": worker["pid"]}, worker["load"]
+
+def load_policy_model():
+    """Load the fast policy model if one has been trained"""
+    global policy_model
+    if os.path.exists(POLICY_MODEL_PATH):
+        policy_model = PolicyModel.load(POLICY_MODEL_PATH)
+        print(f"Policy model loaded from {POLICY_MODEL_PATH} (threshold {POLICY_THRESHOLD})")
 
-@app.on_event("startup")
 async def startup_event():
-    """Load the model when the API starts"""
-    try:
-        load_poker_model()
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        print("API started without model. Train the model first.")
+    """Load the policy model and start loading the LLM in the background"""
+    load_policy_model()
+    if POKER_WARMUP:
+        start_model_load()
+
+async def shutdown_event():
+    """Stop the inference workers"""
+    if model_server is not None:
+        await asyncio.to_thread(model_server.stop)
 
 @app.get("/")
 async def root():
@@ -103,24 +445,156 @@ async def root():
         "model_loaded": model is not None
     }
 
-@app.post("/poker/decision", response_model=PokerResponse)
-async def get_optimal_decision(request: PokerRequest):
-    """Get optimal poker decision for a given game state"""
+# Decisions answered by each backend
+router_counts = {"policy": 0, "llm": 0}
+
+def route_to_policy(request: PokerRequest) -> Optional[Tuple[str, Dict[str, float]]]:
+    """The fast model's decision if it is confident enough (or while the LLM is still loading)"""
+    if policy_model is None:
+        return None
+    decision = policy_model.decide(request.game_state, request.legal_actions)
+    if decision is None:
+        return None
+    action, probabilities = decision
+    if model_state == "loading" or probabilities[action] >= POLICY_THRESHOLD:
+        return decision
+    return None
+
+async def decide(request: PokerRequest, key: Optional[str] = None) -> PokerResponse:
+    """Answer from the decision cache, the fast policy model, or the LLM through the batcher"""
+    if key is None:
+        with stage("parsing"):
+            key = decision_key(request.game_state, request.legal_actions, MODEL_ID)
+    cached = decision_cache.get(key)
+    record_cache("decision_cache", cached is not None)
+    if cached is not None:
+        action, probabilities = cached
+        source = "cache"
+    else:
+        if model_state == "not_loaded":
+            start_model_load()  # Lazy loading (POKER_WARMUP=0): the first uncached decision starts it
+        with stage("policy"):
+            decision = route_to_policy(request)
+        if decision is not None:
+            action, probabilities = decision
+            source = "policy"
+        else:
+            await ensure_poker_model()
+            action, probabilities = await batcher.submit(request)
+            decision_cache.put(key, action, probabilities)
+            source = "llm"
+        router_counts[source] += 1
+    
+    if probabilities is None:
+        return PokerResponse(optimal_action=action, source=source)
+    return PokerResponse(
+        optimal_action=action,
+        confidence=probabilities[action],
+        action_probabilities=probabilities,
+        source=source
+    )
+
+async def decide_request(request: PokerRequest, key: Optional[str] = None) -> PokerResponse:
+    """decide() with its failures mapped to HTTP errors"""
     try:
-        action = get_poker_decision(request.game_state)
-        return PokerResponse(optimal_action=action)
+        return await decide(request, key)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating decision: {str(e)}")
 
-@app.get("/poker/health")
+@router.post("/poker/decision", response_model=PokerResponse)
+async def get_optimal_decision(request: PokerRequest):
+    """Get optimal poker decision for a given game state"""
+    return await decide_request(request)
+
+@router.post("/poker/decision/batch")
+async def get_decision_batch(request: Request):
+    """
+    Decide many game states in one request (multi-table clients, offline evaluation)
+
+    The body is a JSON array of PokerRequest objects, or one per line with an
+    application/x-ndjson content type. Results stream back as NDJSON lines
+    {"index", "status", "result" | "error"} as each decision is made.
+    Identical states are decided once. Decisions are queued hand by hand in
+    prompt order, so each hand's later prompts find its earlier ones in the
+    prefix cache and its worker; enough are in flight to keep batches full.
+    """
+    items = await read_batch(request, POKER_BATCH_MAX_ITEMS)
+    with stage("parsing"):
+        poker_requests, errors = validate_items(items, PokerRequest)
+        decisions: Dict[str, Tuple[PokerRequest, List[int]]] = {}
+        for index, poker_request in poker_requests.items():
+            key = decision_key(poker_request.game_state, poker_request.legal_actions, MODEL_ID)
+            decisions.setdefault(key, (poker_request, []))[1].append(index)
+
+    ordered = sorted(decisions.items(), key=lambda d: (d[1][0].hand_id or "", len(d[1][0].game_state)))
+    groups = [(indices, lambda r=poker_request, k=key: decide_request(r, k))
+              for key, (poker_request, indices) in ordered]
+    record_batch("decision", len(items), len(decisions), len(errors))
+    return StreamingResponse(stream_results(groups, errors, concurrency=2 * MAX_BATCH_SIZE * batcher.num_threads),
+                             media_type=NDJSON_MEDIA_TYPE)
+
+async def warm_decision_cache(instructions: List[str]):
+    """Decide every instruction, a few batches at a time, to fill the decision cache"""
+    chunk = MAX_BATCH_SIZE * 4
+    for start in range(0, len(instructions), chunk):
+        await asyncio.gather(
+            *(decide(PokerRequest(game_state=inst)) for inst in instructions[start:start + chunk]),
+            return_exceptions=True
+        )
+    print(f"Decision cache warmed with {len(instructions)} test prompts")
+
+@router.post("/poker/cache/warm", status_code=202)
+async def warm_cache(request: CacheWarmRequest, background_tasks: BackgroundTasks):
+    """Fill the decision cache from the PokerBench test split in the background"""
+    if model_state != "ready":
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        instructions = await asyncio.to_thread(load_test_instructions, request.limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Test dataset not found. Run explore_dataset.py first.")
+    background_tasks.add_task(warm_decision_cache, instructions)
+    return {"scheduled": len(instructions)}
+
+def readiness() -> dict:
+    """LLM load state; the policy model answers what it can while the LLM loads"""
+    return {
+        "ready": model_state == "ready",
+        "model": model_state,
+        "error": model_error,
+        "policy_model_loaded": policy_model is not None,
+    }
+
+@router.get("/poker/health")
 async def health_check():
     """Check if the model is loaded and ready"""
     return {
         "model_loaded": model is not None,
         "tokenizer_loaded": tokenizer is not None,
-        "status": "ready" if (model is not None and tokenizer is not None) else "not_ready"
+        "policy_model_loaded": policy_model is not None,
+        "model_state": model_state,
+        "status": "ready" if model_state == "ready" else "not_ready"
     }
 
+@router.get("/poker/stats")
+async def batcher_stats():
+    """Throughput, latency and cache counters of the decision path"""
+    return {
+        "batcher": batcher.stats(),
+        "prefix_cache": prefix_cache_stats(),
+        "decision_cache": decision_cache.stats(),
+        "router": {"threshold": POLICY_THRESHOLD, **router_counts},
+        "model_server": model_server.stats() if model_server is not None else None
+    }
+
+# Registered per app (here and in service.py) rather than on the router
+app.include_router(router)
+app.on_event("startup")(startup_event)
+app.on_event("shutdown")(shutdown_event)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Lightweight policy model: a small NumPy MLP over structured game states.
+
+Instead of reading the prompt text, the model sees features computed from the
+encoded game state (game_state.py): hero position and hand class, street,
+made-hand category, board texture, pot, stacks, amount to call and the
+action history. It predicts a distribution over the PokerBench action
+vocabulary (poker_actions.py) in well under a millisecond on CPU, which lets
+poker_api.py answer confident spots without the LLM.
+
+    python policy_model.py                      # train, then write the threshold report
+    python policy_model.py --report-only --llm-checkpoint eval_checkpoint.jsonl \\
+        --llm-report eval_report.json
+
+The report lists, per confidence threshold, how many test spots the fast
+model would answer, its accuracy on them, its latency, and (given an
+evaluate_model.py run) the accuracy and mean latency of the routed system.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_store import DATA_DIR, iter_batches, split_dir
+from evaluate_model import load_checkpoint, normalize_action
+from game_state import ACTIONS, GAME_STATES_FILE, HEADER_WIDTH, build_game_states, encode_text, load_game_states
+from hand_evaluator import evaluate, hand_category
+from poker_actions import load_actions
+from ranges import COMBO_CLASS, HAND_CLASSES
+
+POLICY_MODEL_PATH = os.environ.get("POKER_POLICY_MODEL_PATH", "./poker-policy.npz")
+POLICY_REPORT_PATH = "policy_report.json"
+HIDDEN_SIZE = 128
+THRESHOLDS = [0.0, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99]
+
+# Class of every (card, card) pair, for the hand-class one-hot
+PAIR_CLASS = np.zeros((52, 52), dtype=np.int16)
+_hi, _lo = np.tril_indices(52, -1)
+PAIR_CLASS[_hi, _lo] = COMBO_CLASS
+PAIR_CLASS[_lo, _hi] = COMBO_CLASS
+
+# Feature layout: offsets of each block
+STREET_INDEX = {0: 0, 3: 1, 4: 2, 5: 3}
+F_POSITION = 0
+F_CLASS = F_POSITION + 6
+F_STREET = F_CLASS + len(HAND_CLASSES)
+F_CATEGORY = F_STREET + 4
+F_TEXTURE = F_CATEGORY + 9
+F_MONEY = F_TEXTURE + 3
+F_COUNTS = F_MONEY + 4
+F_SITUATION = F_COUNTS + 4 * len(ACTIONS)
+F_LAST_ACTION = F_SITUATION + 4
+NUM_FEATURES = F_LAST_ACTION + len(ACTIONS)
+
+
+def state_features(row: np.ndarray) -> np.ndarray:
+    """Feature vector of one encoded game state"""
+    f = np.zeros(NUM_FEATURES, dtype=np.float32)
+    hero = int(row[0])
+    cards = row[1:3].tolist()
+    board = [int(c) for c in row[3:8] if c >= 0]
+    street = STREET_INDEX[len(board)]
+    big_blind = max(row[10], 1) / 100
+    pot = row[8] / 100 / big_blind
+
+    f[F_POSITION + hero] = 1.0
+    f[F_CLASS + PAIR_CLASS[cards[0], cards[1]]] = 1.0
+    f[F_STREET + street] = 1.0
+    if board:
+        f[F_CATEGORY + int(hand_category(evaluate(cards + board)))] = 1.0
+
+        # Board texture: paired board, most cards of one suit, hero's flush draw
+        suits = np.bincount([c & 3 for c in board], minlength=4)
+        f[F_TEXTURE] = np.bincount([c >> 2 for c in board], minlength=13).max() >= 2
+        f[F_TEXTURE + 1] = suits.max() / 5
+        f[F_TEXTURE + 2] = len(board) < 5 and (suits + np.bincount([c & 3 for c in cards], minlength=4)).max() == 4
+
+    # Replay the actions: chips committed on the latest street (in big blinds), counts per street
+    committed = {4: 0.5, 5: 1.0}
+    action_street, aggressor, last = 0, -1, -1
+    active = {hero}
+    for i in range(int(row[18])):
+        s, position, action, amount = row[HEADER_WIDTH + 4 * i:HEADER_WIDTH + 4 * i + 4].tolist()
+        if s != action_street:
+            action_street, committed = s, {}
+        f[F_COUNTS + s * len(ACTIONS) + action] += 1.0
+        name = ACTIONS[action]
+        if name == "fold":
+            active.discard(position)
+        else:
+            active.add(position)
+        if name in ("bet", "raise", "allin"):
+            aggressor = position
+            committed[position] = amount / 100 / big_blind if amount >= 0 else 1e3
+        elif name == "call":
+            committed[position] = max(committed.values(), default=0.0)
+        last = action
+
+    stack = row[12 + hero] / 100 / big_blind if row[12 + hero] >= 0 else 0.0
+    to_call = 0.0
+    if action_street == street:
+        to_call = min(max(max(committed.values(), default=0.0) - committed.get(hero, 0.0), 0.0), stack)
+    f[F_MONEY] = np.log1p(pot)
+    f[F_MONEY + 1] = stack / max(row[11] / 100 / big_blind, 1.0)
+    f[F_MONEY + 2] = min(stack / max(pot, 0.5), 20.0) / 20
+    f[F_MONEY + 3] = to_call / max(pot, 0.5)
+    f[F_SITUATION] = to_call > 0
+    f[F_SITUATION + 1] = len(active) / 6
+    f[F_SITUATION + 2] = aggressor == hero
+    f[F_SITUATION + 3] = row[18] / 10
+    if last >= 0:
+        f[F_LAST_ACTION + last] = 1.0
+    return f
+
+
+def batch_features(rows: np.ndarray) -> np.ndarray:
+    return np.stack([state_features(row) for row in rows]) if len(rows) else np.zeros((0, NUM_FEATURES), np.float32)
+
+
+class PolicyModel:
+    """Two-hidden-layer ReLU MLP with a softmax over the action vocabulary"""
+
+    def __init__(self, actions: Sequence[str], params: Dict[str, np.ndarray]):
+        self.actions = list(actions)
+        self.action_index = {normalize_action(a): i for i, a in enumerate(self.actions)}
+        self.params = params
+
+    @classmethod
+    def create(cls, actions: Sequence[str], hidden: int = HIDDEN_SIZE, seed: int = 0) -> "PolicyModel":
+        rng = np.random.default_rng(seed)
+        sizes = [NUM_FEATURES, hidden, hidden, len(actions)]
+        params = {"mean": np.zeros(NUM_FEATURES, np.float32), "std": np.ones(NUM_FEATURES, np.float32)}
+        for i, (n_in, n_out) in enumerate(zip(sizes, sizes[1:])):
+            params[f"w{i}"] = (rng.standard_normal((n_in, n_out)) * np.sqrt(2.0 / n_in)).astype(np.float32)
+            params[f"b{i}"] = np.zeros(n_out, np.float32)
+        return cls(actions, params)
+
+    @classmethod
+    def load(cls, path: str = POLICY_MODEL_PATH) -> "PolicyModel":
+        with np.load(path) as data:
+            params = {k: data[k] for k in data.files if k != "actions"}
+            actions = data["actions"].tolist()
+        return cls(actions, params)
+
+    def save(self, path: str = POLICY_MODEL_PATH):
+        np.savez(path, actions=np.array(self.actions), **self.params)
+
+    def _forward(self, x: np.ndarray) -> List[np.ndarray]:
+        p = self.params
+        h0 = (x - p["mean"]) / p["std"]
+        h1 = np.maximum(h0 @ p["w0"] + p["b0"], 0)
+        h2 = np.maximum(h1 @ p["w1"] + p["b1"], 0)
+        logits = h2 @ p["w2"] + p["b2"]
+        return [h0, h1, h2, logits]
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        logits = self._forward(x)[-1]
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def decide(self, game_state: str, legal_actions: Optional[Sequence[str]] = None
+               ) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Best action and the action distribution, or None if the prompt doesn't parse"""
+        row = encode_text(game_state)
+        if row is None:
+            return None
+        probs = self.predict_proba(state_features(row)[None, :])[0]
+        if legal_actions:
+            allowed = [self.action_index[a] for a in map(normalize_action, legal_actions) if a in self.action_index]
+            if not allowed:
+                return None
+            mask = np.zeros_like(probs)
+            mask[allowed] = 1.0
+            probs = probs * mask
+            probs /= probs.sum()
+        distribution = {self.actions[i]: float(probs[i]) for i in np.flatnonzero(probs)}
+        return self.actions[int(probs.argmax())], distribution
+
+    def fit(self, x: np.ndarray, y: np.ndarray, epochs: int = 10, batch_size: int = 512, lr: float = 1e-3,
+            weight_decay: float = 1e-5, seed: int = 0, x_val: Optional[np.ndarray] = None,
+            y_val: Optional[np.ndarray] = None):
+        """Mini-batch Adam on the softmax cross-entropy"""
+        p = self.params
+        p["mean"] = x.mean(axis=0).astype(np.float32)
+        p["std"] = (x.std(axis=0) + 1e-3).astype(np.float32)
+        names = [k for k in p if k[0] in "wb"]
+        m = {k: np.zeros_like(p[k]) for k in names}
+        v = {k: np.zeros_like(p[k]) for k in names}
+        rng = np.random.default_rng(seed)
+        step = 0
+        for epoch in range(epochs):
+            order = rng.permutation(len(x))
+            total = 0.0
+            for start in range(0, len(x), batch_size):
+                idx = order[start:start + batch_size]
+                h0, h1, h2, logits = self._forward(x[idx])
+                logits -= logits.max(axis=1, keepdims=True)
+                probs = np.exp(logits)
+                probs /= probs.sum(axis=1, keepdims=True)
+                total -= np.log(probs[np.arange(len(idx)), y[idx]] + 1e-12).sum()
+
+                d = probs
+                d[np.arange(len(idx)), y[idx]] -= 1.0
+                d /= len(idx)
+                grads = {"w2": h2.T @ d, "b2": d.sum(axis=0)}
+                d = (d @ p["w2"].T) * (h2 > 0)
+                grads.update({"w1": h1.T @ d, "b1": d.sum(axis=0)})
+                d = (d @ p["w1"].T) * (h1 > 0)
+                grads.update({"w0": h0.T @ d, "b0": d.sum(axis=0)})
+
+                step += 1
+                for k in names:
+                    g = grads[k] + weight_decay * p[k]
+                    m[k] = 0.9 * m[k] + 0.1 * g
+                    v[k] = 0.999 * v[k] + 0.001 * g * g
+                    m_hat = m[k] / (1 - 0.9 ** step)
+                    v_hat = v[k] / (1 - 0.999 ** step)
+                    p[k] -= (lr * m_hat / (np.sqrt(v_hat) + 1e-8)).astype(np.float32)
+            message = f"Epoch {epoch + 1}/{epochs}: loss {total / len(x):.4f}"
+            if x_val is not None:
+                message += f", val accuracy {(self.predict_proba(x_val).argmax(axis=1) == y_val).mean():.2%}"
+            print(message)
+
+
+def load_split(split: str, actions: Sequence[str], limit: Optional[int] = None,
+               data_dir: str = DATA_DIR) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Features, labels (-1 if the output isn't in the vocabulary) and row indices of the parsed rows"""
+    if not os.path.exists(os.path.join(split_dir(split, data_dir), GAME_STATES_FILE)):
+        print(f"Encoding {split} game states...")
+        build_game_states(split, data_dir)
+    states = load_game_states(split, data_dir)[:limit]
+    index = {normalize_action(a): i for i, a in enumerate(actions)}
+    labels = []
+    for batch in iter_batches(split, columns=["output"], stop=len(states), data_dir=data_dir):
+        labels += [index.get(normalize_action(o), -1) for o in batch["output"]]
+    rows = np.flatnonzero(states[:, 0] >= 0)
+    return batch_features(states[rows]), np.array(labels, dtype=np.int64)[rows], rows
+
+
+def threshold_report(model: PolicyModel, x: np.ndarray, y: np.ndarray, rows: np.ndarray, total_rows: int,
+                     sample_prompts: Sequence[str], llm_predictions: Optional[Dict[int, str]] = None, llm_latency: Optional[float] = None,
+                     thresholds: Sequence[float] = THRESHOLDS) -> dict:
+    """Coverage, accuracy and latency of routing spots above each confidence threshold to the fast model"""
+    probs = model.predict_proba(x)
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == y
+
+    # End-to-end latency of one decision: parse, features and forward pass
+    start = time.perf_counter()
+    for prompt in sample_prompts:
+        model.decide(prompt)
+    fast_latency = (time.perf_counter() - start) / max(len(sample_prompts), 1)
+
+    report = {"examples": total_rows, "parsed": len(rows), "fast_latency_ms": fast_latency * 1000,
+              "llm_latency_ms": llm_latency * 1000 if llm_latency else None, "thresholds": []}
+    llm_correct = None
+    if llm_predictions:
+        targets = [model.actions[label] if label >= 0 else None for label in y]
+        llm_correct = np.array([
+            normalize_action(llm_predictions.get(int(r), "")) == normalize_action(t or "")
+            for r, t in zip(rows, targets)
+        ])
+    for threshold in thresholds:
+        routed = confidence >= threshold
+        entry = {
+            "threshold": threshold,
+            "coverage": float(routed.sum() / total_rows) if total_rows else 0.0,
+            "fast_accuracy": float(correct[routed].mean()) if routed.any() else None,
+        }
+        if llm_correct is not None:
+            entry["routed_accuracy"] = float(np.where(routed, correct, llm_correct).mean())
+        if llm_latency:
+            entry["mean_latency_ms"] = 1000 * (fast_latency * entry["coverage"] + llm_latency * (1 - entry["coverage"]))
+        report["thresholds"].append(entry)
+    if llm_correct is not None:
+        report["llm_accuracy"] = float(llm_correct.mean())
+    return report
+
+
+def print_report(report: dict):
+    print(f"\nFast model latency: {report['fast_latency_ms']:.3f} ms per decision"
+          + (f", LLM: {report['llm_latency_ms']:.1f} ms" if report["llm_latency_ms"] else ""))
+    if "llm_accuracy" in report:
+        print(f"LLM alone: {report['llm_accuracy']:.2%} exact match")
+    print(f"{'threshold':>9} {'coverage':>9} {'fast acc':>9} {'routed acc':>11} {'mean ms':>9}")
+    for entry in report["thresholds"]:
+        fast = f"{entry['fast_accuracy']:.2%}" if entry["fast_accuracy"] is not None else "-"
+        routed = f"{entry['routed_accuracy']:.2%}" if "routed_accuracy" in entry else "-"
+        latency = f"{entry['mean_latency_ms']:.2f}" if "mean_latency_ms" in entry else "-"
+        print(f"{entry['threshold']:>9.2f} {entry['coverage']:>9.2%} {fast:>9} {routed:>11} {latency:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the fast policy model and report accuracy vs latency")
+    parser.add_argument("--output", default=POLICY_MODEL_PATH)
+    parser.add_argument("--report", default=POLICY_REPORT_PATH)
+    parser.add_argument("--report-only", action="store_true", help="Skip training and report on an existing model")
+    parser.add_argument("--train-limit", type=int, default=None, help="Train on the first N rows only")
+    parser.add_argument("--test-limit", type=int, default=None)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--hidden", type=int, default=HIDDEN_SIZE)
+    parser.add_argument("--llm-checkpoint", help="evaluate_model.py checkpoint with the LLM's test predictions")
+    parser.add_argument("--llm-report", help="evaluate_model.py report, for the LLM's per-prompt latency")
+    args = parser.parse_args()
+
+    if args.report_only:
+        model = PolicyModel.load(args.output)
+    else:
+        model = PolicyModel.create(load_actions(), args.hidden)
+        x, y, _ = load_split("train", model.actions, args.train_limit)
+        known = y >= 0
+        print(f"Training on {known.sum()} parsed examples ({NUM_FEATURES} features, {len(model.actions)} actions)")
+        x_test, y_test, _ = load_split("test", model.actions, args.test_limit)
+        model.fit(x[known], y[known], epochs=args.epochs, x_val=x_test, y_val=y_test)
+        model.save(args.output)
+        print(f"Saved {args.output}")
+
+    x_test, y_test, rows = load_split("test", model.actions, args.test_limit)
+    total = len(load_game_states("test")[:args.test_limit])
+
+    llm_predictions = None
+    if args.llm_checkpoint:
+        llm_predictions = {index: r["prediction"] for index, r in load_checkpoint(args.llm_checkpoint).items()}
+    llm_latency = None
+    if args.llm_report:
+        with open(args.llm_report) as f:
+            throughput = json.load(f)["throughput"]
+        if throughput.get("prompts_per_second"):
+            llm_latency = throughput["workers"] / throughput["prompts_per_second"]
+
+    sample = next(iter_batches("test", columns=["instruction"], batch_size=200), {"instruction": []})["instruction"]
+    report = threshold_report(model, x_test, y_test, rows, total, sample, llm_predictions, llm_latency)
+    print_report(report)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+
+
+def _cache_tensors(past) -> List[Any]:
+    """All key/value tensors held by a transformers cache object"""
+    if hasattr(past, "layers"):
+        return [t for layer in past.layers for t in (layer.keys, layer.values) if t is not None]
+    if hasattr(past, "key_cache"):
+        return list(past.key_cache) + list(past.value_cache)
+    return [t for layer in past for t in layer]
+
+
+def cache_nbytes(past) -> int:
+    return sum(t.numel() * t.element_size() for t in _cache_tensors(past))
+
+
+def select_positions(past, positions: Sequence[int]):
+    """A new cache holding only the given sequence positions of `past` (e.g. one prompt of a packed batch)"""
+    import torch
+    from transformers import DynamicCache
+
+    index = torch.tensor(positions, dtype=torch.long)
+    return DynamicCache([(layer.keys[:, :, index], layer.values[:, :, index]) for layer in past.layers])
+
+
+def common_prefix_length(a: Sequence[int], b: Sequence[int]) -> int:
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class PrefixKVCache:
+    """
+    past_key_values for prompt prefixes, reused so requests only prefill their suffix.
+
+    Two kinds of entries are kept: shared prefixes (such as the fixed
+    PokerBench preamble) that are pinned, and per-hand histories keyed by hand
+    id that are evicted least-recently-used once the memory budget is
+    exceeded. Lookups return a private, cropped copy of the longest matching
+    prefix since the model extends caches in place; `match` and `checkout`
+    split that so prompts sharing a prefix can share one copy.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.shared = {}
+        self.entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+        self._lock = threading.Lock()
+
+    def add_shared(self, name: str, token_ids: Sequence[int], past):
+        """Pin a prefix that many prompts start with"""
+        with self._lock:
+            self.shared[name] = (tuple(token_ids), past, cache_nbytes(past))
+
+    def store(self, hand_id: Hashable, token_ids: Sequence[int], past):
+        """Remember the KV cache of a hand's latest prompt"""
+        size = cache_nbytes(past)
+        with self._lock:
+            if hand_id in self.entries:
+                self.bytes -= self.entries.pop(hand_id)[2]
+            self.entries[hand_id] = (tuple(token_ids), past, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self.entries:
+                self.bytes -= self.entries.popitem(last=False)[1][2]
+
+    def match(self, token_ids: Sequence[int], hand_id: Optional[Hashable] = None) -> Tuple[Optional[Hashable], int]:
+        """
+        Longest cached prefix of `token_ids`, without copying it.
+
+        Returns the matching entry's key and the matched length (always
+        leaving at least one token to run), or (None, 0). Prompts matching the
+        same entry at the same length share that prefix, so one `checkout`
+        can serve all of them.
+        """
+        with self._lock:
+            candidates = [(("shared", name), entry) for name, entry in self.shared.items()]
+            if hand_id is not None and hand_id in self.entries:
+                self.entries.move_to_end(hand_id)
+                candidates.append((("hand", hand_id), self.entries[hand_id]))
+
+            best, best_len = None, 0
+            for key, (cached_ids, _, _) in candidates:
+                length = min(common_prefix_length(cached_ids, token_ids), len(token_ids) - 1)
+                if length > best_len:
+                    best, best_len = key, length
+
+            if best is None:
+                self.misses += 1
+                return None, 0
+            self.hits += 1
+            self.reused_tokens += best_len
+            return best, best_len
+
+    def checkout(self, key: Hashable, length: int) -> Optional[Any]:
+        """A private copy of a matched entry's cache cropped to `length`, or None if it was evicted since"""
+        kind, name = key
+        with self._lock:
+            entry = self.shared.get(name) if kind == "shared" else self.entries.get(name)
+            if entry is None:
+                return None
+            past = copy.deepcopy(entry[1])
+        excess = past.get_seq_length() - length
+        if excess > 0:
+            past.crop(-excess)
+        return past
+
+    def lookup(self, token_ids: Sequence[int], hand_id: Optional[Hashable] = None) -> Tuple[Optional[Any], int]:
+        """Longest cached prefix of `token_ids`: a private cropped copy of its cache and its length, or (None, 0)"""
+        key, length = self.match(token_ids, hand_id)
+        past = self.checkout(key, length) if key is not None else None
+        return (past, length) if past is not None else (None, 0)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "shared_prefixes": len(self.shared),
+            "hands": len(self.entries),
+            "bytes": self.bytes + sum(size for _, _, size in self.shared.values()),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "reused_tokens": self.reused_tokens,
+        }
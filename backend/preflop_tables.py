@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Precomputed preflop equity tables.
+
+Preflop all-in equity only depends on the hero's hand class (169 of them up
+to suit relabelling) and on what it runs against, so it is computed once:
+
+    python preflop_tables.py --processes 32               # every heads-up board (hours)
+    python preflop_tables.py --boards 50000 --processes 8  # sampled boards (minutes)
+
+For each class, a canonical hero combo is played against every villain combo
+(only one per suit-isomorphic group is actually computed) and against 1-8
+random opponents. Heads-up equities are exact unless `--boards` asks for
+sampling; multiway equities are always sampled. The result is one .npz file:
+
+    hu_combo         (169, 1326) float32  canonical hero combo vs each villain combo, NaN if they share a card
+    hu               (169, 169)  float32  class vs class (average over the villain class's combos)
+    multiway         (169, 10)   float32  equity vs random hands by total players, columns 2-9
+    hu_stderr        ()          float32  largest standard error of a hu_combo entry (0 when exact)
+    multiway_stderr  (169, 10)   float32  standard error of each multiway entry
+
+PreflopTables answers hand-vs-range queries with one weighted dot product
+over the villain combos, after relabelling suits so the hero holds the
+canonical combo, and random-opponent queries with a single lookup.
+"""
+
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cards import COMBOS, RANKS, combo_index
+from equity import _showdown
+from hand_evaluator import evaluate_batch
+from ranges import CLASS_INDEX, COMBO_CARDS, COMBO_CLASS, COMBO_MASKS, HAND_CLASSES, NUM_COMBOS, PERMUTED_COMBO
+
+PREFLOP_TABLE_PATH = os.environ.get("PREFLOP_TABLE_PATH", "./preflop_tables.npz")
+MAX_PLAYERS = 9
+
+
+def canonical_combo(class_index: int) -> int:
+    """The combo every class is computed for: spades (and hearts for the second card)"""
+    name = HAND_CLASSES[class_index]
+    hi, lo = RANKS.index(name[0]) * 4 + 3, RANKS.index(name[1]) * 4 + 3
+    if len(name) == 2 or name[2] == "o":
+        lo -= 1
+    return combo_index(hi, lo)
+
+
+def canonical_permutation(combo: int) -> int:
+    """Index of a suit permutation that maps a combo onto its class's canonical combo"""
+    target = canonical_combo(int(COMBO_CLASS[combo]))
+    return int(np.flatnonzero(PERMUTED_COMBO[:, combo] == target)[0])
+
+
+def _runouts(hero: List[int], boards: int, exact: bool, rng: np.random.Generator) -> np.ndarray:
+    """Every five-card board (exact) or `boards` random ones from the cards the hero doesn't hold"""
+    deck = np.array([c for c in range(52) if c not in hero], dtype=np.int64)
+    if exact:
+        flat = itertools.chain.from_iterable(itertools.combinations(deck.tolist(), 5))
+        return np.fromiter(flat, dtype=np.int64, count=math.comb(len(deck), 5) * 5).reshape(-1, 5)
+    return deck[np.argpartition(rng.random((boards, len(deck))), 4, axis=1)[:, :5]]
+
+
+def hero_row(class_index: int, boards: int, exact: bool, seed: int) -> Tuple[np.ndarray, float]:
+    """Equity of the canonical hero combo against every villain combo, and the largest entry's standard error"""
+    hero_combo = canonical_combo(class_index)
+    hero = list(COMBOS[hero_combo])
+    runouts = _runouts(hero, boards, exact, np.random.default_rng(seed + class_index))
+    runout_masks = (np.int64(1) << runouts).sum(axis=1)
+    hero_ranks = evaluate_batch(np.hstack([np.tile(np.array(hero, dtype=np.int64), (len(runouts), 1)), runouts]))
+
+    # Villain combos related by a suit relabelling that keeps the hero fixed share an equity
+    stabilizer = np.flatnonzero(PERMUTED_COMBO[:, hero_combo] == hero_combo)
+    live = np.flatnonzero((COMBO_MASKS & COMBO_MASKS[hero_combo]) == 0)
+    representative = PERMUTED_COMBO[stabilizer][:, live].min(axis=0)
+
+    row = np.full(NUM_COMBOS, np.nan, dtype=np.float32)
+    stderr = 0.0
+    for rep in np.unique(representative):
+        # Boards that don't use the villain's cards; uniform over the legal boards either way
+        ok = (runout_masks & COMBO_MASKS[rep]) == 0
+        villain_ranks = evaluate_batch(np.hstack([np.tile(COMBO_CARDS[rep], (int(ok.sum()), 1)), runouts[ok]]))
+        share, _, _ = _showdown(hero_ranks[ok], villain_ranks[:, None])
+        row[live[representative == rep]] = share.mean()
+        if not exact:
+            stderr = max(stderr, float(share.std() / np.sqrt(len(share))))
+    return row, stderr
+
+
+def multiway_row(class_index: int, samples: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Equity against 1-8 opponents holding random hands, and its standard error, indexed by total players"""
+    rng = np.random.default_rng(seed + class_index)
+    hero = np.array(COMBOS[canonical_combo(class_index)], dtype=np.int64)
+    row = np.full(MAX_PLAYERS + 1, np.nan, dtype=np.float32)
+    stderr = np.full(MAX_PLAYERS + 1, np.nan, dtype=np.float32)
+    for players in range(2, MAX_PLAYERS + 1):
+        opponents = players - 1
+        keys = rng.random((samples, 52))
+        keys[:, hero] = 2.0
+        dealt = np.argpartition(keys, 2 * opponents + 4, axis=1)[:, :2 * opponents + 5]
+        boards = dealt[:, 2 * opponents:]
+        hero_ranks = evaluate_batch(np.hstack([np.tile(hero, (samples, 1)), boards]))
+        opponent_ranks = np.stack([
+            evaluate_batch(np.hstack([dealt[:, 2 * j:2 * j + 2], boards])) for j in range(opponents)
+        ], axis=1)
+        share = _showdown(hero_ranks, opponent_ranks)[0]
+        row[players] = share.mean()
+        stderr[players] = share.std() / np.sqrt(samples)
+    return row, stderr
+
+
+def _build_class(args):
+    class_index, boards, samples, seed = args
+    exact = boards is None
+    return (class_index, *hero_row(class_index, boards or 0, exact, seed),
+            *multiway_row(class_index, samples, seed))
+
+
+def generate(path: str = PREFLOP_TABLE_PATH, boards: Optional[int] = None, samples: int = 1_000_000,
+             processes: Optional[int] = None, seed: int = 0):
+    """
+    Compute every table in a process pool (one task per hero class) and save them.
+
+    Heads-up equities enumerate every board unless `boards` sets a sample size.
+    """
+    hu_combo = np.full((len(HAND_CLASSES), NUM_COMBOS), np.nan, dtype=np.float32)
+    multiway = np.full((len(HAND_CLASSES), MAX_PLAYERS + 1), np.nan, dtype=np.float32)
+    multiway_stderr = np.full_like(multiway, np.nan)
+    hu_stderr = 0.0
+    tasks = [(i, boards, samples, seed) for i in range(len(HAND_CLASSES))]
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for done, (i, row, row_stderr, multi, multi_stderr) in enumerate(pool.map(_build_class, tasks), start=1):
+            hu_combo[i], multiway[i], multiway_stderr[i] = row, multi, multi_stderr
+            hu_stderr = max(hu_stderr, row_stderr)
+            print(f"  {HAND_CLASSES[i]:>4}  {done}/{len(tasks)}  ({time.time() - start:.0f}s)")
+
+    hu = np.zeros((len(HAND_CLASSES), len(HAND_CLASSES)), dtype=np.float32)
+    for j in range(len(HAND_CLASSES)):
+        hu[:, j] = np.nanmean(hu_combo[:, COMBO_CLASS == j], axis=1)
+
+    np.savez(
+        path,
+        hu_combo=hu_combo,
+        hu=hu,
+        multiway=multiway,
+        hu_stderr=np.float32(hu_stderr),
+        multiway_stderr=multiway_stderr,
+        classes=np.array(HAND_CLASSES),
+    )
+    print(f"Wrote {path} in {time.time() - start:.0f}s")
+
+
+class PreflopTables:
+    """Table lookups for preflop equity, loaded from the generator's .npz file"""
+
+    def __init__(self, path: Optional[str] = PREFLOP_TABLE_PATH):
+        self.path = path
+        self.hu_combo = self.hu = self.multiway = self.multiway_stderr = None
+        self.hu_stderr = 0.0
+        self.hits = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path: str):
+        with np.load(path) as data:
+            if "multiway_stderr" not in data.files:
+                print(f"Preflop tables {path} predate per-table standard errors; regenerate them to use them")
+                return
+            self.hu_combo = data["hu_combo"]
+            self.hu = data["hu"]
+            self.multiway = data["multiway"]
+            self.hu_stderr = float(data["hu_stderr"])
+            self.multiway_stderr = data["multiway_stderr"]
+        print(f"Loaded preflop tables {path}")
+
+    @property
+    def loaded(self) -> bool:
+        return self.hu_combo is not None
+
+    def vs_random(self, hero_combo: int, opponents: int) -> Optional[Tuple[float, float]]:
+        """Equity against `opponents` random hands and its standard error"""
+        if not self.loaded or not 1 <= opponents < MAX_PLAYERS:
+            return None
+        self.hits += 1
+        entry = COMBO_CLASS[hero_combo], opponents + 1
+        return float(self.multiway[entry]), float(self.multiway_stderr[entry])
+
+    def vs_range(self, hero_combo: int, weights: np.ndarray) -> Optional[Tuple[float, float]]:
+        """
+        Weighted equity against a 1326-combo range (combos blocked by the hero
+        drop out), and a bound on its standard error
+        """
+        if not self.loaded:
+            return None
+        perm = canonical_permutation(hero_combo)
+        equities = self.hu_combo[COMBO_CLASS[hero_combo], PERMUTED_COMBO[perm]]
+        live = ~np.isnan(equities) & (weights > 0)
+        total = weights[live].sum()
+        if total == 0:
+            return None
+        self.hits += 1
+        return float(np.dot(weights[live], equities[live]) / total), self.hu_stderr
+
+    def class_equity(self, hero_class: str, villain_class: str) -> Optional[float]:
+        if not self.loaded:
+            return None
+        return float(self.hu[CLASS_INDEX[hero_class], CLASS_INDEX[villain_class]])
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "loaded": self.loaded,
+            "path": self.path,
+            "hu_stderr": self.hu_stderr,
+            "multiway_stderr": float(np.nanmax(self.multiway_stderr)) if self.loaded else None,
+            "hits": self.hits,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the preflop equity tables")
+    parser.add_argument("--output", default=PREFLOP_TABLE_PATH)
+    parser.add_argument("--boards", type=int, default=None,
+                        help="Sample this many boards per heads-up matchup instead of enumerating every board")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Samples per multiway entry")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.output, args.boards, args.samples, args.processes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Hand ranges as weight vectors over the fixed 1326-combo ordering of cards.py.
+
+A range string is a comma separated list of hands with optional weights,
+e.g. "QQ+,AKs,A5s-A2s,KQo:0.5,AsKd". Hands are:
+
+  * pairs ("QQ"), suited or offsuit classes ("AKs", "AKo"), or both ("AK")
+  * "+" ranges: "TT+" is TT through AA, "A9s+" is A9s through AKs
+  * dash spans over kickers, pairs or equally gapped hands: "A5s-A2s", "99-66", "T9s-54s"
+  * single combos ("AsKd")
+
+Later tokens override earlier ones. Parsed ranges are cached and shared, so
+parse_range returns a read-only array; the set operations below always
+return new arrays.
+"""
+
+from functools import lru_cache
+from typing import Iterable, List
+
+import numpy as np
+
+from cards import COMBOS, RANKS, SUIT_PERMUTATIONS, combo_index, combo_str, parse_combo, permute_card
+
+NUM_COMBOS = len(COMBOS)
+
+# (1326, 2) array of the two cards of every combo, and the 52-bit card set of every combo
+COMBO_CARDS = np.array(COMBOS, dtype=np.int64)
+COMBO_MASKS = (np.int64(1) << COMBO_CARDS).sum(axis=1)
+
+# PERMUTED_COMBO[p, c]: combo c with its suits relabelled by SUIT_PERMUTATIONS[p]
+PERMUTED_COMBO = np.array([
+    [combo_index(permute_card(hi, perm), permute_card(lo, perm)) for hi, lo in COMBOS]
+    for perm in SUIT_PERMUTATIONS
+], dtype=np.int64)
+
+
+def _hand_classes() -> List[str]:
+    names = []
+    for hi in range(12, -1, -1):
+        for lo in range(hi, -1, -1):
+            if hi == lo:
+                names.append(RANKS[hi] * 2)
+            else:
+                names += [RANKS[hi] + RANKS[lo] + "s", RANKS[hi] + RANKS[lo] + "o"]
+    return names
+
+
+# The 169 hand classes ("AA", "AKs", "AKo", ...) and the class of every combo
+HAND_CLASSES = _hand_classes()
+CLASS_INDEX = {name: i for i, name in enumerate(HAND_CLASSES)}
+
+
+def _combo_class(hi: int, lo: int) -> int:
+    high, low = RANKS[hi >> 2], RANKS[lo >> 2]
+    if high == low:
+        return CLASS_INDEX[high * 2]
+    return CLASS_INDEX[high + low + ("s" if (hi & 3) == (lo & 3) else "o")]
+
+
+COMBO_CLASS = np.array([_combo_class(hi, lo) for hi, lo in COMBOS], dtype=np.int16)
+CLASS_COMBOS = [np.flatnonzero(COMBO_CLASS == i) for i in range(len(HAND_CLASSES))]
+
+
+def _class_name(first: int, second: int, suitedness: str) -> str:
+    return RANKS[first] + RANKS[second] + ("" if first == second else suitedness)
+
+
+def _parse_class(hand: str):
+    """(first rank, second rank, suitedness) of a class like "QQ", "AKs" or "AK" """
+    if len(hand) not in (2, 3) or hand[0].upper() not in RANKS or hand[1].upper() not in RANKS:
+        raise ValueError(f"Invalid hand: {hand!r}")
+    first, second = RANKS.index(hand[0].upper()), RANKS.index(hand[1].upper())
+    suitedness = hand[2].lower() if len(hand) == 3 else ""
+    if suitedness not in ("", "s", "o") or (first == second and suitedness):
+        raise ValueError(f"Invalid hand: {hand!r}")
+    if second > first:
+        first, second = second, first
+    return first, second, suitedness
+
+
+def _shape_combos(first: int, second: int, suitedness: str) -> List[int]:
+    if first == second:
+        return CLASS_COMBOS[CLASS_INDEX[RANKS[first] * 2]].tolist()
+    combos = []
+    for kind in ("s", "o"):
+        if suitedness in ("", kind):
+            combos += CLASS_COMBOS[CLASS_INDEX[RANKS[first] + RANKS[second] + kind]].tolist()
+    return combos
+
+
+def class_combos(hand: str) -> List[int]:
+    """Combo indices of a range token without its weight: "QQ", "AKs", "TT+", "T9s-54s", "AsKd", ..."""
+    hand = hand.strip()
+    if "-" in hand:
+        low, _, high = hand.partition("-")
+        (f1, s1, kind1), (f2, s2, kind2) = _parse_class(low.strip()), _parse_class(high.strip())
+        if kind1 != kind2 or (f1 == s1) != (f2 == s2):
+            raise ValueError(f"Invalid span: {hand!r}")
+        if f1 == f2:
+            # Kicker span: "A5s-A2s"
+            return [c for k in range(min(s1, s2), max(s1, s2) + 1) for c in _shape_combos(f1, k, kind1)]
+        if f1 - s1 == f2 - s2:
+            # Pairs or equally gapped hands: "99-66", "T9s-54s"
+            gap = f1 - s1
+            return [c for f in range(min(f1, f2), max(f1, f2) + 1) for c in _shape_combos(f, f - gap, kind1)]
+        raise ValueError(f"Invalid span: {hand!r}")
+    if hand.endswith("+"):
+        first, second, suitedness = _parse_class(hand[:-1])
+        if first == second:
+            return [c for r in range(first, 13) for c in _shape_combos(r, r, "")]
+        return [c for k in range(second, first) for c in _shape_combos(first, k, suitedness)]
+    if len(hand) == 4:
+        try:
+            return [parse_combo(hand)]
+        except ValueError:
+            raise ValueError(f"Invalid hand: {hand!r}")
+    return _shape_combos(*_parse_class(hand))
+
+
+@lru_cache(maxsize=4096)
+def _parse(text: str) -> np.ndarray:
+    weights = np.zeros(NUM_COMBOS, dtype=np.float64)
+    for token in text.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        hand, _, weight = token.partition(":")
+        try:
+            value = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight in {token!r}")
+        if not 0.0 <= value <= 1.0:
+            raise ValueError(f"Weight out of range in {token!r}")
+        weights[class_combos(hand)] = value
+    weights.setflags(write=False)
+    return weights
+
+
+def parse_range(text: str) -> np.ndarray:
+    """Weight (0-1) of every combo in a range string (cached, read-only)"""
+    return _parse(text)
+
+
+def _weight_suffix(weight: float) -> str:
+    return "" if weight == 1.0 else f":{float(weight)}"
+
+
+def _runs(ranks: List[int], weights: List[float], top: int, name) -> List[str]:
+    """Tokens for classes differing in one rank, merging equal-weight neighbours into "+" or dash spans"""
+    tokens = []
+    i = 0
+    while i < len(ranks):
+        j = i
+        while j + 1 < len(ranks) and ranks[j + 1] == ranks[j] - 1 and weights[j + 1] == weights[i]:
+            j += 1
+        if ranks[i] == top and j > i:
+            token = name(ranks[j]) + "+"
+        elif j > i:
+            token = name(ranks[i]) + "-" + name(ranks[j])
+        else:
+            token = name(ranks[i])
+        tokens.append(token + _weight_suffix(weights[i]))
+        i = j + 1
+    return tokens
+
+
+def range_to_string(weights: np.ndarray, compact: bool = True) -> str:
+    """
+    Range string that parses back to exactly these weights
+
+    Classes whose combos share one weight are written as the class, the rest
+    as single combos. compact merges neighbouring classes into "+" and dash
+    spans; without it every class is listed (the form the solver expects).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    uniform = {}
+    singles = []
+    for index, combos in enumerate(CLASS_COMBOS):
+        w = weights[combos]
+        if not w.any():
+            continue
+        if (w == w[0]).all():
+            uniform[index] = float(w[0])
+        else:
+            singles += [combo_str(c) + _weight_suffix(float(weights[c])) for c in combos if weights[c] > 0]
+
+    if not compact:
+        return ",".join([HAND_CLASSES[i] + _weight_suffix(w) for i, w in uniform.items()] + singles)
+
+    tokens = []
+    pairs = [r for r in range(12, -1, -1) if CLASS_INDEX[RANKS[r] * 2] in uniform]
+    tokens += _runs(pairs, [uniform[CLASS_INDEX[RANKS[r] * 2]] for r in pairs], 12, lambda r: RANKS[r] * 2)
+    for suitedness in ("s", "o"):
+        for first in range(12, 0, -1):
+            kickers = [k for k in range(first - 1, -1, -1) if CLASS_INDEX[_class_name(first, k, suitedness)] in uniform]
+            kicker_weights = [uniform[CLASS_INDEX[_class_name(first, k, suitedness)]] for k in kickers]
+            tokens += _runs(kickers, kicker_weights, first - 1, lambda k: _class_name(first, k, suitedness))
+    return ",".join(tokens + singles)
+
+
+def full_range() -> np.ndarray:
+    """Every combo at weight 1 (a random hand)"""
+    return np.ones(NUM_COMBOS, dtype=np.float64)
+
+
+def dead_combos(dead_cards: Iterable[int]) -> np.ndarray:
+    """Boolean mask of the combos that use any of the dead cards"""
+    dead_bits = 0
+    for card in dead_cards:
+        dead_bits |= 1 << int(card)
+    return (COMBO_MASKS & np.int64(dead_bits)) != 0
+
+
+def remove_cards(weights: np.ndarray, dead_cards: Iterable[int]) -> np.ndarray:
+    """Zero the weight of every combo that uses a dead card"""
+    return np.where(dead_combos(dead_cards), 0.0, weights)
+
+
+def union_ranges(*ranges: np.ndarray) -> np.ndarray:
+    """Combos in any of the ranges, at their highest weight"""
+    return np.maximum.reduce([np.asarray(w, dtype=np.float64) for w in ranges])
+
+
+def intersect_ranges(*ranges: np.ndarray) -> np.ndarray:
+    """Combos in all of the ranges, at their lowest weight"""
+    return np.minimum.reduce([np.asarray(w, dtype=np.float64) for w in ranges])
+
+
+def scale_range(weights: np.ndarray, factor: float) -> np.ndarray:
+    """Multiply every weight, clipped to 0-1"""
+    return np.clip(np.asarray(weights, dtype=np.float64) * factor, 0.0, 1.0)
+
+
+def permute_range(weights: np.ndarray, perm_index: int) -> np.ndarray:
+    """Relabel a range's suits by SUIT_PERMUTATIONS[perm_index]"""
+    permuted = np.empty(NUM_COMBOS, dtype=np.float64)
+    permuted[PERMUTED_COMBO[perm_index]] = weights
+    return permuted
+
+
+def combo_count(weights: np.ndarray) -> float:
+    """Weighted number of combos in a range"""
+    return float(np.sum(weights))
+
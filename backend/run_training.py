@@ -3,33 +3,30 @@
 Simple script to run the poker AI training pipeline
 """
 
+import argparse
 import os
 import sys
 
+from data_store import DATA_DIR, has_split
+
 def check_files():
     """Check if required files exist"""
-    required_files = [
-        'poker_train_dataset.pkl',
-        'poker_test_dataset.pkl'
-    ]
+    required_splits = ['train', 'test']
     
-    missing_files = []
-    for file in required_files:
-        if not os.path.exists(file):
-            missing_files.append(file)
+    missing_splits = [split for split in required_splits if not has_split(split)]
     
-    if missing_files:
+    if missing_splits:
         print("❌ Missing required dataset files:")
-        for file in missing_files:
-            print(f"  - {file}")
+        for split in missing_splits:
+            print(f"  - {os.path.join(DATA_DIR, split)}/")
         print("\n🔧 Run this first to prepare the dataset:")
         print("   python explore_dataset.py")
         return False
     
     return True
 
-def run_training():
-    """Run the training process"""
+def run_training(options=None):
+    """Run the training process (options are train_model keyword arguments)"""
     print("🃏 Starting Poker AI Training Pipeline")
     print("=" * 50)
     
@@ -45,7 +42,7 @@ def run_training():
     # Import and run training
     try:
         from train_poker_model import train_model
-        train_model()
+        train_model(**(options or {}))
         
         print("\n🎉 Training completed successfully!")
         print("📁 Model saved to: ./poker-phi3-final")
@@ -61,4 +58,12 @@ def run_training():
         print("💡 Check the error above and try again")
 
 if __name__ == "__main__":
-    run_training() 
\ No newline at end of file
+    try:
+        from train_poker_model import add_training_args
+    except ImportError as e:
+        print(f"❌ Missing dependencies: {e}")
+        print("🔧 Install them with: pip install -r requirements.txt")
+        sys.exit(1)
+    
+    parser = add_training_args(argparse.ArgumentParser(description="Run the poker AI training pipeline"))
+    run_training(vars(parser.parse_args())) 
\ No newline at end of file
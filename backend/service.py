@@ -0,0 +1,94 @@
+"""
+Single entry point for the solver, equity and poker APIs.
+
+GTO_SERVICES picks the subsystems to mount (default "solver,equity,poker").
+Only the modules of enabled subsystems are imported, so a solver- or
+equity-only deployment never loads torch; the poker subsystem imports it
+when its model starts loading (a background warm-up at startup, or the
+first uncached decision with POKER_WARMUP=0).
+
+    GTO_SERVICES=solver,equity python service.py
+    uvicorn service:app --port 8000
+
+GET /ready reports each subsystem's readiness (503 until all are ready);
+GET /ready/{subsystem} checks one.
+"""
+
+import os
+from typing import Callable, Dict
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+import metrics
+
+SERVICES = [s.strip() for s in os.environ.get("GTO_SERVICES", "solver,equity,poker").split(",") if s.strip()]
+KNOWN_SERVICES = ("solver", "equity", "poker")
+
+unknown = set(SERVICES) - set(KNOWN_SERVICES)
+if unknown:
+    raise ValueError(f"Unknown GTO_SERVICES entries: {', '.join(sorted(unknown))}")
+
+app = FastAPI(title="GTO Copilot API", version="1.0.0")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+metrics.install(app, "service")
+
+# Subsystem name -> readiness callback
+readiness_checks: Dict[str, Callable[[], dict]] = {}
+
+if "solver" in SERVICES or "equity" in SERVICES:
+    import main as solver_service
+
+    if "solver" in SERVICES:
+        app.include_router(solver_service.solver_router)
+        readiness_checks["solver"] = solver_service.solver_readiness
+    if "equity" in SERVICES:
+        app.include_router(solver_service.equity_router)
+        readiness_checks["equity"] = solver_service.equity_readiness
+
+if "poker" in SERVICES:
+    import poker_api
+
+    app.include_router(poker_api.router)
+    app.on_event("startup")(poker_api.startup_event)
+    app.on_event("shutdown")(poker_api.shutdown_event)
+    readiness_checks["poker"] = poker_api.readiness
+
+
+@app.get("/")
+async def root():
+    """Liveness check listing the mounted subsystems"""
+    return {"message": "GTO Copilot API is running", "services": SERVICES}
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness of every mounted subsystem"""
+    subsystems = {name: check() for name, check in readiness_checks.items()}
+    all_ready = all(status["ready"] for status in subsystems.values())
+    if not all_ready:
+        response.status_code = 503
+    return {"ready": all_ready, "subsystems": subsystems}
+
+
+@app.get("/ready/{subsystem}")
+async def ready_subsystem(subsystem: str, response: Response):
+    """Readiness of one subsystem"""
+    if subsystem not in readiness_checks:
+        raise HTTPException(status_code=404, detail=f"Subsystem {subsystem} is not enabled")
+    status = readiness_checks[subsystem]()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+from caching import DiskCache, LRUCache
+from cards import SUIT_PERMUTATIONS, invert_permutation, parse_board, permute_card, permute_text
+from ranges import parse_range, permute_range, range_to_string
+
+# Cache configuration (override with environment variables, empty dir disables the disk tier)
+SOLVER_CACHE_ENTRIES = int(os.environ.get("SOLVER_CACHE_ENTRIES", 1024))
+SOLVER_CACHE_DIR = os.environ.get("SOLVER_CACHE_DIR", "./solver_cache")
+SOLVER_CACHE_MAX_BYTES = int(os.environ.get("SOLVER_CACHE_MAX_BYTES", 2 << 30))
+
+
+def canonical_range(range_str: str, perm_index: int) -> str:
+    """Range string relabelled by SUIT_PERMUTATIONS[perm_index], in normalized form"""
+    return range_to_string(permute_range(parse_range(range_str), perm_index))
+
+
+def canonical_board(cards: Sequence[int]) -> tuple:
+    """Smallest suit relabelling of a board (flop cards unordered)"""
+    return min(
+        tuple(sorted((permute_card(c, perm) for c in cards[:3]), reverse=True) +
+              [permute_card(c, perm) for c in cards[3:]])
+        for perm in SUIT_PERMUTATIONS
+    )
+
+
+def canonical_spot(board: str, oop_range: str, ip_range: str) -> Tuple[tuple, str, str, Tuple[int, ...]]:
+    """
+    Find the suit relabelling that gives the smallest form of board and ranges.
+
+    Flop cards are unordered, turn and river keep their position. Returns the
+    canonical board, both canonical ranges and the permutation that maps the
+    caller's suits onto the canonical ones.
+    """
+    cards = parse_board(board)
+    oop, ip = parse_range(oop_range), parse_range(ip_range)
+    best = None
+    for perm_index, perm in enumerate(SUIT_PERMUTATIONS):
+        mapped = [permute_card(c, perm) for c in cards]
+        # Ranges compare by their relabelled weight vectors, only the winner is formatted
+        candidate = (
+            tuple(sorted(mapped[:3], reverse=True) + mapped[3:]),
+            permute_range(oop, perm_index).tobytes(),
+            permute_range(ip, perm_index).tobytes(),
+        )
+        if best is None or candidate < best[0]:
+            best = (candidate, perm_index)
+    (canon_board, _, _), perm_index = best
+    return (canon_board, canonical_range(oop_range, perm_index), canonical_range(ip_range, perm_index),
+            SUIT_PERMUTATIONS[perm_index])
+
+
+def spot_key(request) -> Tuple[str, Tuple[int, ...]]:
+    """Cache key for a SolverRequest and the permutation into canonical suits"""
+    board, oop_range, ip_range, perm = canonical_spot(request.board, request.oop_range, request.ip_range)
+    spot = {
+        "board": board,
+        "oop_range": oop_range,
+        "ip_range": ip_range,
+        "pot_size": request.pot_size,
+        "effective_stack": request.effective_stack,
+        "position": request.position,
+        "bet_sizes": request.bet_sizes,
+        "accuracy": request.accuracy,
+        "max_iterations": request.max_iterations,
+        "use_isomorphism": request.use_isomorphism,
+    }
+    digest = hashlib.sha256(json.dumps(spot, sort_keys=True).encode()).hexdigest()
+    return digest, perm
+
+
+class SolutionCache:
+    """
+    Two-tier cache of solver output stored in canonical suits.
+
+    Lookups hit the in-memory LRU first and fall back to the disk store,
+    promoting disk hits into memory. Output is relabelled back into the
+    caller's suits on the way out.
+    """
+
+    def __init__(self, max_entries: int = SOLVER_CACHE_ENTRIES,
+                 directory: Optional[str] = SOLVER_CACHE_DIR,
+                 max_bytes: int = SOLVER_CACHE_MAX_BYTES):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(directory, max_bytes) if directory else None
+
+    def get(self, key: str, perm: Sequence[int]) -> Optional[str]:
+        output = self.memory.get(key)
+        if output is None and self.disk is not None:
+            output = self.disk.get(key)
+            if output is not None:
+                self.memory.put(key, output)
+        if output is None:
+            return None
+        return permute_text(output, invert_permutation(perm))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.memory or (self.disk is not None and key in self.disk)
+
+    def put(self, key: str, perm: Sequence[int], output: str):
+        canonical = permute_text(output, perm)
+        self.memory.put(key, canonical)
+        if self.disk is not None:
+            self.disk.put(key, canonical)
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+
+from solver_pool import parse_progress
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class SolveJob:
+    """A solver run tracked in the background with its latest progress"""
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.iteration: Optional[int] = None
+        self.exploitability: Optional[float] = None
+        self.partial_strategy: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self._listeners = []
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def on_line(self, line: str):
+        """Record solver progress (and any strategy dump) from one stdout line"""
+        if self.status == "queued":
+            self.status = "running"
+            self.started_at = time.time()
+
+        stripped = line.strip()
+        if stripped.startswith("{"):
+            # Solvers that dump intermediate strategies give us a best-so-far answer
+            try:
+                json.loads(stripped)
+                self.partial_strategy = stripped
+            except ValueError:
+                pass
+            return
+
+        progress = parse_progress(line)
+        if progress:
+            self.iteration = progress.get("iteration", self.iteration)
+            self.exploitability = progress.get("exploitability", self.exploitability)
+            self.publish()
+
+    def publish(self):
+        snapshot = self.snapshot()
+        for queue in self._listeners:
+            queue.put_nowait(snapshot)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.append(queue)
+        queue.put_nowait(self.snapshot())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._listeners:
+            self._listeners.remove(queue)
+
+    def elapsed(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "iteration": self.iteration,
+            "exploitability": self.exploitability,
+            "computation_time": self.elapsed(),
+            "has_partial_strategy": self.partial_strategy is not None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs solver jobs in the background and keeps the most recent ones around"""
+
+    def __init__(self, solver_api, max_jobs: int = 256):
+        self.solver_api = solver_api
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, SolveJob]" = OrderedDict()
+
+    def submit(self, request) -> SolveJob:
+        job = SolveJob(request)
+        self.jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> SolveJob:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+
+    async def cancel(self, job_id: str) -> SolveJob:
+        job = self.get(job_id)
+        if not job.done and job.task is not None:
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        return job
+
+    async def events(self, job: SolveJob) -> AsyncIterator[dict]:
+        """Yield progress snapshots until the job finishes"""
+        queue = job.subscribe()
+        try:
+            while True:
+                snapshot = await queue.get()
+                yield snapshot
+                if snapshot["status"] in TERMINAL_STATUSES:
+                    break
+        finally:
+            job.unsubscribe(queue)
+
+    async def _run(self, job: SolveJob):
+        try:
+            result = await self.solver_api.solve(job.request, on_line=job.on_line)
+            job.result = result
+            if result.get("convergence") is not None:
+                job.exploitability = result["convergence"]
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except HTTPException as e:
+            job.status = "failed"
+            job.error = e.detail
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            if job.started_at is None:
+                job.started_at = job.created_at
+            job.finished_at = time.time()
+            job.publish()
+
+    def _prune(self):
+        # Drop the oldest finished jobs once we hold more than max_jobs
+        excess = len(self.jobs) - self.max_jobs
+        for job_id in [j.id for j in self.jobs.values() if j.done][:max(0, excess)]:
+            del self.jobs[job_id]
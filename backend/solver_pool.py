@@ -0,0 +1,177 @@
+import asyncio
+import os
+import re
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException
+
+from metrics import observe_stage, stage
+
+# Pool configuration (override with environment variables)
+SOLVER_THREAD_BUDGET = int(os.environ.get("SOLVER_THREAD_BUDGET", os.cpu_count() or 4))
+SOLVER_MAX_QUEUE = int(os.environ.get("SOLVER_MAX_QUEUE", 32))
+SOLVER_TIMEOUT = float(os.environ.get("SOLVER_TIMEOUT", 300))
+
+# Solver output can contain very long lines (full JSON strategy dumps)
+STREAM_LIMIT = 256 * 1024 * 1024
+
+ITERATION_RE = re.compile(r"iter(?:ation)?s?\s*[:=]?\s*(\d+)", re.IGNORECASE)
+EXPLOITABILITY_RE = re.compile(r"exploitability\s*[:=]?\s*(-?\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def parse_progress(line: str) -> dict:
+    """Extract iteration count and exploitability from a solver log line"""
+    progress = {}
+    match = ITERATION_RE.search(line)
+    if match:
+        progress["iteration"] = int(match.group(1))
+    match = EXPLOITABILITY_RE.search(line)
+    if match:
+        progress["exploitability"] = float(match.group(1))
+    return progress
+
+
+def final_exploitability(output: str) -> Optional[float]:
+    """Last exploitability reported in a solver run's output"""
+    matches = EXPLOITABILITY_RE.findall(output)
+    return float(matches[-1]) if matches else None
+
+
+class SolverResult:
+    """Output of a single solver process run"""
+
+    def __init__(self, returncode: int, stdout: str, stderr: str, elapsed: float):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elapsed = elapsed
+
+
+class SolverPool:
+    """
+    Bounded pool of asyncio solver subprocesses.
+
+    Every run reserves `thread_count` threads from a shared CPU budget before
+    its process is started. Runs that cannot be started immediately wait in a
+    queue; once the queue is full new runs are rejected with a 503 instead of
+    piling up more processes.
+    """
+
+    def __init__(self, thread_budget: int = SOLVER_THREAD_BUDGET,
+                 max_queue: int = SOLVER_MAX_QUEUE,
+                 timeout: float = SOLVER_TIMEOUT):
+        self.thread_budget = max(1, thread_budget)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.threads_in_use = 0
+        self.running = 0
+        self.waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so the pool can be built before the event loop starts
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def threads_for(self, thread_count: int) -> int:
+        """Clamp a requested thread count to the pool budget"""
+        return min(max(1, thread_count), self.thread_budget)
+
+    async def _acquire(self, threads: int):
+        async with self.condition:
+            if self.threads_in_use + threads > self.thread_budget:
+                if self.waiting >= self.max_queue:
+                    raise HTTPException(status_code=503, detail="Solver queue is full, try again later")
+                self.waiting += 1
+                try:
+                    await self.condition.wait_for(
+                        lambda: self.threads_in_use + threads <= self.thread_budget
+                    )
+                finally:
+                    self.waiting -= 1
+            self.threads_in_use += threads
+            self.running += 1
+
+    async def _release(self, threads: int):
+        async with self.condition:
+            self.threads_in_use -= threads
+            self.running -= 1
+            self.condition.notify_all()
+
+    async def run(self, cmd: List[str], thread_count: int = 1,
+                  timeout: Optional[float] = None,
+                  on_line: Optional[Callable[[str], None]] = None) -> SolverResult:
+        """
+        Run one solver command, killing the process if it exceeds the timeout.
+
+        `on_line` is called with every stdout line as it is produced, so
+        callers can follow the solver's progress while it converges.
+        """
+        threads = self.threads_for(thread_count)
+        timeout = self.timeout if timeout is None else timeout
+
+        with stage("solver_queue"):
+            await self._acquire(threads)
+        try:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=STREAM_LIMIT,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(self._communicate(process, on_line), timeout=timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise HTTPException(status_code=504, detail=f"Solver timed out after {timeout:.0f}s")
+            except asyncio.CancelledError:
+                await self._kill(process)
+                raise
+
+            elapsed = loop.time() - start
+            observe_stage("solver", elapsed)
+            return SolverResult(
+                returncode=process.returncode,
+                stdout=stdout,
+                stderr=stderr.decode(errors="replace"),
+                elapsed=elapsed,
+            )
+        finally:
+            await self._release(threads)
+
+    @staticmethod
+    async def _communicate(process: asyncio.subprocess.Process,
+                           on_line: Optional[Callable[[str], None]]):
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        lines = []
+        try:
+            async for raw in process.stdout:
+                line = raw.decode(errors="replace")
+                lines.append(line)
+                if on_line is not None:
+                    on_line(line)
+            stderr = await stderr_task
+        finally:
+            stderr_task.cancel()
+        await process.wait()
+        return "".join(lines), stderr
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process):
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    def stats(self) -> dict:
+        """Current pool utilisation"""
+        return {
+            "thread_budget": self.thread_budget,
+            "threads_in_use": self.threads_in_use,
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+        }
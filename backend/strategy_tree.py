@@ -0,0 +1,173 @@
+import json
+import os
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from caching import LRUCache
+from cards import parse_combo, combo_str
+
+# Parsed trees kept in memory; evicted ones are re-parsed from stored solver output on demand
+STRATEGY_STORE_ENTRIES = int(os.environ.get("STRATEGY_STORE_ENTRIES", 256))
+
+
+class StrategyNode:
+    """
+    One node of a solved game tree.
+
+    Action nodes hold the acting player's strategy as a (combos, actions)
+    float32 matrix over the combos in range, with `combo_indices` giving each
+    row's position in the fixed 1326-combo ordering. Chance nodes only have
+    children, keyed by the dealt card.
+    """
+
+    __slots__ = ("node_type", "player", "actions", "combo_indices", "frequencies", "children")
+
+    def __init__(self, node_type: str, player: Optional[int] = None, actions: Sequence[str] = (),
+                 combo_indices: Optional[np.ndarray] = None, frequencies: Optional[np.ndarray] = None,
+                 children: Optional[Dict[str, "StrategyNode"]] = None):
+        self.node_type = node_type
+        self.player = player
+        self.actions = list(actions)
+        self.combo_indices = combo_indices if combo_indices is not None else np.zeros(0, dtype=np.int16)
+        self.frequencies = frequencies if frequencies is not None else np.zeros((0, len(self.actions)), dtype=np.float32)
+        self.children = children or {}
+
+    def dense(self) -> np.ndarray:
+        """Strategy as a (1326, actions) matrix, NaN for combos not in range"""
+        matrix = np.full((1326, len(self.actions)), np.nan, dtype=np.float32)
+        matrix[self.combo_indices] = self.frequencies
+        return matrix
+
+    def combo_frequencies(self, combo: str) -> Optional[np.ndarray]:
+        """Action frequencies of one combo like "AsKs", None if it is not in range"""
+        rows = np.nonzero(self.combo_indices == parse_combo(combo))[0]
+        if len(rows) == 0:
+            return None
+        return self.frequencies[rows[0]]
+
+    def child(self, label: str) -> "StrategyNode":
+        if label not in self.children:
+            raise KeyError(label)
+        return self.children[label]
+
+
+def _parse_node(data: dict) -> StrategyNode:
+    node_type = data.get("node_type", "action_node")
+
+    if node_type == "chance_node":
+        children = {card: _parse_node(child) for card, child in (data.get("dealcards") or {}).items()}
+        return StrategyNode(node_type, children=children)
+
+    strategy = data.get("strategy") or {}
+    actions = strategy.get("actions") or data.get("actions") or []
+    per_combo = strategy.get("strategy") or {}
+
+    combo_indices = np.fromiter((parse_combo(c) for c in per_combo), dtype=np.int16, count=len(per_combo))
+    frequencies = np.array(list(per_combo.values()), dtype=np.float32).reshape(len(per_combo), len(actions))
+    order = np.argsort(combo_indices)
+
+    children = {label: _parse_node(child) for label, child in (data.get("childrens") or {}).items()}
+    return StrategyNode(node_type, data.get("player"), actions, combo_indices[order], frequencies[order], children)
+
+
+def _load_json(output: str) -> Optional[dict]:
+    # Prefer the last single-line dump, then fall back to one pretty-printed document
+    for line in reversed(output.splitlines()):
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                return json.loads(line)
+            except ValueError:
+                break
+    start, end = output.find("{"), output.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        return json.loads(output[start:end + 1])
+    except ValueError:
+        return None
+
+
+def parse_solver_output(output: str) -> Optional[StrategyNode]:
+    """Parse a TexasSolver JSON strategy dump (possibly surrounded by log lines)"""
+    data = _load_json(output)
+    if not isinstance(data, dict):
+        return None
+    try:
+        return _parse_node(data)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def find_node(root: StrategyNode, path: Sequence[str]) -> StrategyNode:
+    """Follow action / dealt-card labels down from the root"""
+    node = root
+    for label in path:
+        node = node.child(label)
+    return node
+
+
+def node_to_dict(node: StrategyNode, depth: int = 0, include_combos: bool = False) -> dict:
+    """
+    Compact JSON view of a node.
+
+    Action nodes report the average frequency of each action over the combos
+    in range; per-combo frequencies are only included on request. Children
+    are expanded `depth` levels deep and otherwise listed by label.
+    """
+    result = {"node_type": node.node_type}
+    if node.node_type != "chance_node":
+        result["player"] = node.player
+        result["actions"] = node.actions
+        if len(node.combo_indices):
+            result["action_frequencies"] = [round(float(f), 4) for f in node.frequencies.mean(axis=0)]
+        if include_combos:
+            result["combos"] = {
+                combo_str(int(i)): [round(float(f), 4) for f in row]
+                for i, row in zip(node.combo_indices, node.frequencies)
+            }
+    if depth > 0:
+        result["children"] = {
+            label: node_to_dict(child, depth - 1, include_combos) for label, child in node.children.items()
+        }
+    else:
+        result["children"] = list(node.children)
+    return result
+
+
+class StrategyStore:
+    """
+    Parsed strategy trees kept in memory by solution id.
+
+    `loader` returns the raw solver output of a solution id that is no longer
+    in memory (e.g. from the solution cache), so evicted trees can be rebuilt.
+    """
+
+    def __init__(self, max_entries: int = STRATEGY_STORE_ENTRIES,
+                 loader: Optional[Callable[[str], Optional[str]]] = None):
+        self.trees = LRUCache(max_entries)
+        self.loader = loader
+
+    def load(self, solution_id: str, output: str) -> Optional[StrategyNode]:
+        root = self.trees.get(solution_id)
+        if root is None:
+            root = parse_solver_output(output)
+            if root is not None:
+                self.trees.put(solution_id, root)
+        return root
+
+    def get(self, solution_id: str) -> Optional[StrategyNode]:
+        root = self.trees.get(solution_id)
+        if root is None and self.loader is not None:
+            output = self.loader(solution_id)
+            if output is not None:
+                root = self.load(solution_id, output)
+        return root
+
+    def summary(self, solution_id: str, output: str) -> Dict:
+        """Strategy payload for an API response: the root node plus its solution id"""
+        root = self.load(solution_id, output)
+        if root is None:
+            return {"solution_id": None, "raw": output}
+        return {"solution_id": solution_id, "root": node_to_dict(root, depth=0)}
@@ -0,0 +1,174 @@
+"""
+Streaming training data for full-dataset runs.
+
+StreamingPokerDataset walks the memory-mapped Arrow shards of a split
+lazily: each epoch visits the shards in a new order, every DataLoader
+worker takes its own share of the rows, and a shuffle buffer mixes them
+before they are tokenized. Nothing proportional to the split is held in
+memory, so the whole 563k-example train set can be used.
+
+The stream is a pure function of (seed, epoch, worker), so a run resumed
+from a checkpoint skips straight to its data position (saved by
+DataStateCallback as data_state.json) instead of replaying the batches it
+already trained on.
+"""
+
+import json
+import math
+import os
+import random
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from torch.utils.data import IterableDataset, get_worker_info
+from transformers import TrainerCallback
+
+from data_store import open_shard, read_manifest, shard_paths
+from token_cache import IGNORE_INDEX, tokenize_examples
+
+DATA_STATE_FILE = "data_state.json"
+TOKENIZE_CHUNK = 64
+
+
+def shuffle_buffer(items: Iterator, buffer_size: int, rng: random.Random) -> Iterator:
+    """Approximate shuffle holding at most `buffer_size` items"""
+    buffer = []
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        index = rng.randrange(buffer_size)
+        yield buffer[index]
+        buffer[index] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+class StreamingPokerDataset(IterableDataset):
+    """
+    Tokenized examples streamed from the Arrow shards of a split.
+
+    `limit` keeps only the first N rows of the split, `epochs` passes are
+    made over them, and `skip_batches` is the number of batches a previous
+    run already consumed (see DataStateCallback).
+    """
+
+    def __init__(self, split: str, tokenizer, format_prompt: Callable, max_length: int = 512,
+                 mask_prompt_loss: bool = False, limit: Optional[int] = None, epochs: int = 1,
+                 shuffle_buffer_size: int = 10_000, seed: int = 42, batch_size: int = 1,
+                 skip_batches: int = 0):
+        self.split = split
+        self.tokenizer = tokenizer
+        self.format_prompt = format_prompt
+        self.max_length = max_length
+        self.mask_prompt_loss = mask_prompt_loss
+        self.epochs = epochs
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.batch_size = batch_size
+        self.skip_batches = skip_batches
+
+        rows = read_manifest(split)["rows"]
+        self.num_rows = rows if limit is None else min(limit, rows)
+        # (first row, row count) of each shard, clipped to the subset
+        self.blocks: List[Tuple[int, int]] = []
+        start = 0
+        for shard in read_manifest(split)["shards"]:
+            count = min(shard["rows"], self.num_rows - start)
+            if count <= 0:
+                break
+            self.blocks.append((start, count))
+            start += count
+
+    def rows_per_worker(self, worker: int, num_workers: int) -> int:
+        return (self.num_rows - worker + num_workers - 1) // num_workers
+
+    def num_batches(self, num_workers: int = 0) -> int:
+        """Batches the DataLoader will produce over all epochs"""
+        workers = max(num_workers, 1)
+        return sum(
+            math.ceil(self.rows_per_worker(w, workers) * self.epochs / self.batch_size) for w in range(workers)
+        )
+
+    def _worker_skip(self, worker: int, num_workers: int) -> int:
+        """Examples this worker already delivered, given the batches consumed so far"""
+        # The DataLoader takes batches from its workers round-robin
+        batches = (self.skip_batches - worker + num_workers - 1) // num_workers
+        return max(batches, 0) * self.batch_size
+
+    def _epoch_positions(self, epoch: int, worker: int, num_workers: int) -> Iterator[Tuple[int, int]]:
+        """This worker's (shard, row) positions for one epoch, before shuffling"""
+        order = list(range(len(self.blocks)))
+        random.Random(self.seed + epoch).shuffle(order)
+        position = 0
+        for shard in order:
+            _, count = self.blocks[shard]
+            first = (worker - position) % num_workers
+            for row in range(first, count, num_workers):
+                yield shard, row
+            position += count
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker, num_workers = (info.id, info.num_workers) if info is not None else (0, 1)
+        paths = shard_paths(self.split)
+        tables = [open_shard(paths[i], ["instruction", "output"]) for i in range(len(self.blocks))]
+
+        per_epoch = self.rows_per_worker(worker, num_workers)
+        skip = self._worker_skip(worker, num_workers)
+        first_epoch, skip = (skip // per_epoch, skip % per_epoch) if per_epoch else (self.epochs, 0)
+
+        for epoch in range(first_epoch, self.epochs):
+            rng = random.Random(f"{self.seed}-{epoch}-{worker}")
+            positions = shuffle_buffer(self._epoch_positions(epoch, worker, num_workers), self.shuffle_buffer_size, rng)
+            chunk = []
+            for index, (shard, row) in enumerate(positions):
+                if index < skip:
+                    continue
+                chunk.append((shard, row))
+                if len(chunk) == TOKENIZE_CHUNK:
+                    yield from self._tokenize(tables, chunk)
+                    chunk = []
+            if chunk:
+                yield from self._tokenize(tables, chunk)
+            skip = 0
+
+    def _tokenize(self, tables, positions: List[Tuple[int, int]]):
+        examples = {
+            "instruction": [tables[shard]["instruction"][row].as_py() for shard, row in positions],
+            "output": [tables[shard]["output"][row].as_py() for shard, row in positions],
+        }
+        tokenized = tokenize_examples(examples, self.tokenizer, self.max_length, self.format_prompt)
+        for input_ids, label_start in zip(tokenized["input_ids"], tokenized["label_start"]):
+            labels = list(input_ids)
+            if self.mask_prompt_loss:
+                labels[:label_start] = [IGNORE_INDEX] * label_start
+            yield {"input_ids": list(input_ids), "labels": labels}
+
+
+class DataStateCallback(TrainerCallback):
+    """Writes the data position into every checkpoint so a resumed run can skip to it"""
+
+    def __init__(self, dataset: StreamingPokerDataset, num_workers: int):
+        self.dataset = dataset
+        self.num_workers = num_workers
+
+    def on_save(self, args, state, control, **kwargs):
+        checkpoint_dir = os.path.join(args.output_dir, f"checkpoint-{state.global_step}")
+        if not os.path.isdir(checkpoint_dir):
+            return
+        with open(os.path.join(checkpoint_dir, DATA_STATE_FILE), "w") as f:
+            json.dump({
+                "consumed_batches": state.global_step * args.gradient_accumulation_steps,
+                "batch_size": self.dataset.batch_size,
+                "num_workers": self.num_workers,
+                "seed": self.dataset.seed,
+                "num_rows": self.dataset.num_rows,
+            }, f, indent=2)
+
+
+def load_data_state(checkpoint_dir: str) -> Optional[dict]:
+    path = os.path.join(checkpoint_dir, DATA_STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
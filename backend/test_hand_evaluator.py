@@ -0,0 +1,109 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+
+import hand_evaluator
+from cards import parse_card
+from hand_evaluator import CATEGORIES, HAND_CLASSES, evaluate, evaluate_batch, hand_category
+
+# Number of distinct 5-card hands per category, out of C(52, 5) = 2,598,960
+EXPECTED_HANDS = {
+    "straight flush": 40,
+    "four of a kind": 624,
+    "full house": 3744,
+    "flush": 5108,
+    "straight": 10200,
+    "three of a kind": 54912,
+    "two pair": 123552,
+    "pair": 1098240,
+    "high card": 1302540,
+}
+
+# Distinct hand classes per category, 7462 in total
+EXPECTED_CLASSES = {
+    "straight flush": 10,
+    "four of a kind": 156,
+    "full house": 156,
+    "flush": 1277,
+    "straight": 10,
+    "three of a kind": 858,
+    "two pair": 858,
+    "pair": 2860,
+    "high card": 1277,
+}
+
+
+def hand(text):
+    return [parse_card(text[i:i + 2]) for i in range(0, len(text), 2)]
+
+
+def all_five_card_hands():
+    flat = itertools.chain.from_iterable(itertools.combinations(range(52), 5))
+    return np.fromiter(flat, dtype=np.int8, count=2598960 * 5).reshape(-1, 5)
+
+
+def test_exhaustive_five_card():
+    """Every 5-card hand: category counts and the number of distinct classes"""
+    ranks = evaluate_batch(all_five_card_hands())
+    categories = hand_category(ranks)
+
+    counts = Counter(CATEGORIES[c] for c in categories.tolist())
+    assert counts == EXPECTED_HANDS, counts
+
+    classes = Counter(CATEGORIES[hand_category(r)] for r in np.unique(ranks).tolist())
+    assert classes == EXPECTED_CLASSES, classes
+    assert ranks.min() == 1 and ranks.max() == HAND_CLASSES
+    assert len(np.unique(ranks)) == HAND_CLASSES
+
+
+def test_known_orderings():
+    assert evaluate(hand("AsKsQsJsTs")) == HAND_CLASSES
+    assert evaluate(hand("7c5d4h3s2c")) == 1
+    # The wheel is the lowest straight, and the steel wheel the lowest straight flush
+    assert evaluate(hand("As2d3h4s5c")) < evaluate(hand("6s2d3h4s5c"))
+    assert evaluate(hand("As2s3s4s5s")) < evaluate(hand("6s2s3s4s5s"))
+    assert evaluate(hand("As2s3s4s5s")) > evaluate(hand("2c2d2h2sAs"))
+    # Kickers
+    assert evaluate(hand("AsAdKhQs2c")) > evaluate(hand("AsAdKhJsTc"))
+    assert evaluate(hand("KsKdKh2s2c")) > evaluate(hand("QsQdQhAsAc"))
+    # Best five of seven: the sixth and seventh cards only matter when they play
+    assert evaluate(hand("AsAdKhQsJc2d3d")) == evaluate(hand("AsAdKhQsJc"))
+    assert evaluate(hand("AhKhQhJh2h3h4h")) == evaluate(hand("AhKhQhJh4h"))
+
+
+def best_of_subsets(hands):
+    """Reference: best 5-card class over every 5-card subset of each hand"""
+    subsets = list(itertools.combinations(range(hands.shape[1]), 5))
+    return np.max([evaluate_batch(hands[:, list(s)]) for s in subsets], axis=0)
+
+
+def test_six_and_seven_cards_match_best_subset():
+    rng = np.random.default_rng(1234)
+    for num_cards in (6, 7):
+        hands = np.argsort(rng.random((50000, 52)), axis=1)[:, :num_cards]
+        assert np.array_equal(evaluate_batch(hands), best_of_subsets(hands))
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(99)
+    hands = np.argsort(rng.random((2000, 52)), axis=1)[:, :7]
+    batch = evaluate_batch(hands)
+    assert all(batch[i] == evaluate(hands[i].tolist()) for i in range(len(hands)))
+
+
+def test_invalid_hands():
+    for cards in ([0, 1, 2, 3], list(range(8)), [0, 0, 1, 2, 3]):
+        try:
+            evaluate(cards)
+        except ValueError:
+            continue
+        raise AssertionError(f"{cards} should be rejected")
+
+
+if __name__ == "__main__":
+    hand_evaluator.tables()
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
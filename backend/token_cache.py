@@ -0,0 +1,143 @@
+"""
+Pre-tokenized training cache.
+
+A split is tokenized once per (dataset, tokenizer, max_length, prompt format)
+with a multiprocess `map` and written as flat memory-mapped arrays:
+
+    token_cache/train-<fingerprint>/tokens.npy        all token ids back to back (uint16 or int32)
+    token_cache/train-<fingerprint>/offsets.npy       example i is tokens[offsets[i]:offsets[i + 1]]
+    token_cache/train-<fingerprint>/label_starts.npy  first token of the "### Optimal Action" answer
+    token_cache/train-<fingerprint>/meta.json
+
+Later runs map the arrays instead of re-tokenizing, and the stored lengths
+drive the length-bucketing sampler used by train_poker_model.py.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+TOKEN_CACHE_DIR = os.environ.get("POKER_TOKEN_CACHE_DIR", "./token_cache")
+IGNORE_INDEX = -100
+WRITE_BATCH_SIZE = 10_000
+
+
+def cache_fingerprint(dataset, tokenizer, max_length: int, format_prompt: Callable) -> str:
+    """Hash of everything that changes the tokenized output"""
+    payload = {
+        "dataset": getattr(dataset, "_fingerprint", None) or len(dataset),
+        "tokenizer": tokenizer.name_or_path,
+        "vocab_size": len(tokenizer),
+        "special_tokens": tokenizer.special_tokens_map,
+        "max_length": max_length,
+        "template": format_prompt("{instruction}", "{output}"),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def tokenize_examples(examples, tokenizer, max_length: int, format_prompt: Callable) -> Dict[str, list]:
+    """Tokenize full examples and record where the answer starts"""
+    texts = [format_prompt(inst, out) for inst, out in zip(examples["instruction"], examples["output"])]
+    prompts = [format_prompt(inst) for inst in examples["instruction"]]
+    input_ids = tokenizer(texts, truncation=True, padding=False, max_length=max_length)["input_ids"]
+    prompt_ids = tokenizer(prompts, truncation=True, padding=False, max_length=max_length)["input_ids"]
+    return {
+        "input_ids": input_ids,
+        "label_start": [min(len(p), len(ids)) for p, ids in zip(prompt_ids, input_ids)],
+        "length": [len(ids) for ids in input_ids],
+    }
+
+
+def build_token_cache(dataset, tokenizer, name: str, format_prompt: Callable, max_length: int = 512,
+                      num_proc: Optional[int] = None, cache_dir: str = TOKEN_CACHE_DIR) -> str:
+    """Tokenize a split into the cache (once) and return the cache directory"""
+    path = os.path.join(cache_dir, f"{name}-{cache_fingerprint(dataset, tokenizer, max_length, format_prompt)}")
+    if os.path.exists(os.path.join(path, "meta.json")):
+        print(f"Using token cache {path}")
+        return path
+
+    num_proc = num_proc or min(os.cpu_count() or 1, 8)
+    tokenized = dataset.map(
+        tokenize_examples,
+        batched=True,
+        num_proc=num_proc if len(dataset) >= num_proc * 1000 else None,
+        remove_columns=dataset.column_names,
+        fn_kwargs={"tokenizer": tokenizer, "max_length": max_length, "format_prompt": format_prompt},
+        desc=f"Tokenizing {name}",
+    )
+
+    lengths = np.asarray(tokenized["length"], dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    tokens = np.lib.format.open_memmap(os.path.join(tmp_path, "tokens.npy"), mode="w+", dtype=dtype,
+                                       shape=(int(offsets[-1]),))
+    row = 0
+    for batch in tokenized.select_columns(["input_ids"]).iter(batch_size=WRITE_BATCH_SIZE):
+        flat = np.fromiter((t for ids in batch["input_ids"] for t in ids), dtype=dtype)
+        tokens[offsets[row]:offsets[row] + len(flat)] = flat
+        row += len(batch["input_ids"])
+    tokens.flush()
+    del tokens
+
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "label_starts.npy"), np.asarray(tokenized["label_start"], dtype=np.int32))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({
+            "examples": len(lengths),
+            "tokens": int(offsets[-1]),
+            "dtype": np.dtype(dtype).name,
+            "max_length": max_length,
+            "tokenizer": tokenizer.name_or_path,
+        }, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"Wrote token cache {path} ({len(lengths)} examples, {int(offsets[-1])} tokens)")
+    return path
+
+
+class TokenCache:
+    """
+    Map-style dataset over a token cache directory.
+
+    Items are unpadded `input_ids`/`labels` lists; with `mask_prompt_loss`
+    every label before the answer is IGNORE_INDEX, so only the action
+    tokens contribute to the loss.
+    """
+
+    def __init__(self, path: str, mask_prompt_loss: bool = False):
+        self.path = path
+        self.mask_prompt_loss = mask_prompt_loss
+        self.tokens = np.load(os.path.join(path, "tokens.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.label_starts = np.load(os.path.join(path, "label_starts.npy"))
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, index: int) -> Dict[str, List[int]]:
+        input_ids = self.tokens[self.offsets[index]:self.offsets[index + 1]].astype(np.int64)
+        labels = input_ids.copy()
+        if self.mask_prompt_loss:
+            labels[:self.label_starts[index]] = IGNORE_INDEX
+        return {"input_ids": input_ids.tolist(), "labels": labels.tolist()}
+
+    def stats(self) -> dict:
+        answer_tokens = int((self.lengths - np.minimum(self.label_starts, self.lengths)).sum())
+        return {
+            "examples": len(self),
+            "tokens": int(self.offsets[-1]),
+            "mean_length": float(self.lengths.mean()) if len(self) else 0.0,
+            "max_length": int(self.lengths.max()) if len(self) else 0,
+            "answer_tokens": answer_tokens,
+        }
+
@@ -1,24 +1,25 @@
-import pickle
 import torch
 from transformers import (
     AutoTokenizer, 
     AutoModelForCausalLM, 
     TrainingArguments, 
     Trainer,
-    DataCollatorForLanguageModeling
+    DataCollatorForSeq2Seq
 )
+from transformers.trainer_pt_utils import LengthGroupedSampler
+from transformers.trainer_utils import get_last_checkpoint
 from peft import LoraConfig, get_peft_model, TaskType
-from datasets import Dataset
+import argparse
+import math
 import os
 
-def load_local_dataset():
-    """Load the locally saved poker dataset"""
-    print("Loading local poker dataset...")
-    with open('poker_train_dataset.pkl', 'rb') as f:
-        train_ds = pickle.load(f)
-    with open('poker_test_dataset.pkl', 'rb') as f:
-        test_ds = pickle.load(f)
-    return train_ds, test_ds
+from data_store import load_split
+from streaming_dataset import DataStateCallback, StreamingPokerDataset, load_data_state
+from token_cache import IGNORE_INDEX, TokenCache, build_token_cache
+
+OUTPUT_DIR = "./poker-phi3-lora"
+BATCH_SIZE = 4
+GRADIENT_ACCUMULATION_STEPS = 4
 
 def format_poker_prompt(instruction, output=None):
     """Format poker instruction and output for training"""
@@ -27,45 +28,6 @@ def format_poker_prompt(instruction, output=None):
     else:
         return f"### Poker Decision Request:\n{instruction}\n\n### Optimal Action:\n{output}<|endoftext|>"
 
-def preprocess_dataset(dataset, tokenizer, max_length=512):
-    """Preprocess the dataset for training"""
-    def tokenize_function(examples):
-        # Format the prompts
-        formatted_texts = [
-            format_poker_prompt(inst, out) 
-            for inst, out in zip(examples['instruction'], examples['output'])
-        ]
-        
-        # Tokenize
-        tokenized = tokenizer(
-            formatted_texts,
-            truncation=True,
-            padding=False,
-            max_length=max_length,
-            return_tensors=None
-        )
-        
-        # Set labels (same as input_ids for causal LM)
-        tokenized['labels'] = tokenized['input_ids'].copy()
-        
-        return tokenized
-    
-    # Convert to HuggingFace Dataset if it's not already
-    if not isinstance(dataset, Dataset):
-        dataset = Dataset.from_dict({
-            'instruction': [item['instruction'] for item in dataset],
-            'output': [item['output'] for item in dataset]
-        })
-    
-    # Tokenize the dataset
-    tokenized_dataset = dataset.map(
-        tokenize_function,
-        batched=True,
-        remove_columns=dataset.column_names
-    )
-    
-    return tokenized_dataset
-
 def setup_model_and_tokenizer():
     """Setup Phi-3-mini model and tokenizer with LoRA"""
     model_name = "microsoft/Phi-3-mini-4k-instruct"
@@ -100,38 +62,110 @@ def setup_model_and_tokenizer():
     
     return model, tokenizer
 
-def train_model():
+class BucketedTrainer(Trainer):
+    """Trainer that batches token-cache examples of similar length together"""
+
+    def _get_train_sampler(self, *args, **kwargs):
+        if isinstance(self.train_dataset, TokenCache):
+            return LengthGroupedSampler(
+                self.args.train_batch_size * self.args.gradient_accumulation_steps,
+                lengths=self.train_dataset.lengths.tolist(),
+            )
+        return super()._get_train_sampler(*args, **kwargs)
+
+def build_data_collator(tokenizer, packing=False):
+    """Padding-free flattening when packing, otherwise pad to the longest example in the batch"""
+    if packing:
+        # Concatenates the batch into one row with restarting position_ids; needs an
+        # attention implementation that honours them (e.g. flash_attention_2)
+        from transformers import DataCollatorWithFlattening
+        return DataCollatorWithFlattening()
+    return DataCollatorForSeq2Seq(
+        tokenizer=tokenizer,
+        padding=True,
+        pad_to_multiple_of=8,
+        label_pad_token_id=IGNORE_INDEX,
+    )
+
+def resolve_checkpoint(resume):
+    """Checkpoint directory to resume from ("latest" picks the newest in OUTPUT_DIR)"""
+    if not resume:
+        return None
+    if resume == "latest":
+        checkpoint = get_last_checkpoint(OUTPUT_DIR) if os.path.isdir(OUTPUT_DIR) else None
+        if checkpoint is None:
+            print(f"No checkpoint in {OUTPUT_DIR}, starting from scratch")
+        return checkpoint
+    return resume
+
+def streamed_skip_batches(checkpoint, num_workers):
+    """Batches a checkpointed streaming run already consumed, in this run's batch layout"""
+    state = load_data_state(checkpoint) if checkpoint else None
+    if state is None:
+        return 0
+    if state["batch_size"] != BATCH_SIZE or state["num_workers"] != num_workers:
+        print("⚠️  Batch size or worker count changed since the checkpoint; data order will differ slightly")
+        return state["consumed_batches"] * state["batch_size"] // BATCH_SIZE
+    return state["consumed_batches"]
+
+def train_model(train_subset=10000, eval_subset=1000, epochs=3, streaming=False, shuffle_buffer=10000,
+                num_workers=2, resume=None, max_length=512, packing=False, mask_prompt_loss=False,
+                num_proc=None):
     """Main training function"""
-    # Load datasets
-    train_ds, test_ds = load_local_dataset()
-    
-    # Take a smaller subset for initial training (you can increase this)
-    print("Using subset of data for efficient training...")
-    train_subset = train_ds.select(range(min(10000, len(train_ds))))  # Use 10k examples
-    test_subset = test_ds.select(range(min(1000, len(test_ds))))      # Use 1k examples
+    checkpoint = resolve_checkpoint(resume)
     
     # Setup model and tokenizer
     model, tokenizer = setup_model_and_tokenizer()
     
-    # Preprocess datasets
+    # Eval set: a small subset, tokenized once into the memory-mapped token cache
     print("Preprocessing datasets...")
-    train_dataset = preprocess_dataset(train_subset, tokenizer)
-    eval_dataset = preprocess_dataset(test_subset, tokenizer)
+    test_ds = load_split("test", columns=["instruction", "output"])
+    test_subset = test_ds.select(range(min(eval_subset, len(test_ds))))
+    eval_dataset = TokenCache(
+        build_token_cache(test_subset, tokenizer, "test", format_poker_prompt, max_length, num_proc),
+        mask_prompt_loss=mask_prompt_loss,
+    )
+    
+    callbacks = []
+    max_steps = -1
+    if streaming:
+        # Stream (a prefix of) the train shards lazily instead of tokenizing them up front
+        train_dataset = StreamingPokerDataset(
+            "train", tokenizer, format_poker_prompt,
+            max_length=max_length,
+            mask_prompt_loss=mask_prompt_loss,
+            limit=train_subset or None,
+            epochs=epochs,
+            shuffle_buffer_size=shuffle_buffer,
+            batch_size=BATCH_SIZE,
+            skip_batches=streamed_skip_batches(checkpoint, num_workers),
+        )
+        max_steps = math.ceil(train_dataset.num_batches(num_workers) / GRADIENT_ACCUMULATION_STEPS)
+        callbacks.append(DataStateCallback(train_dataset, num_workers))
+        print(f"Streaming {train_dataset.num_rows} examples x {epochs} epochs ({max_steps} steps)")
+    else:
+        train_ds = load_split("train", columns=["instruction", "output"])
+        if train_subset:
+            print(f"Using a {train_subset}-example subset for efficient training...")
+            train_ds = train_ds.select(range(min(train_subset, len(train_ds))))
+        train_dataset = TokenCache(
+            build_token_cache(train_ds, tokenizer, "train", format_poker_prompt, max_length, num_proc),
+            mask_prompt_loss=mask_prompt_loss,
+        )
+        print(f"Train tokens: {train_dataset.stats()}")
     
     # Data collator
-    data_collator = DataCollatorForLanguageModeling(
-        tokenizer=tokenizer,
-        mlm=False,  # We're doing causal LM, not masked LM
-    )
+    data_collator = build_data_collator(tokenizer, packing=packing)
     
     # Training arguments
     training_args = TrainingArguments(
-        output_dir="./poker-phi3-lora",
+        output_dir=OUTPUT_DIR,
         overwrite_output_dir=True,
-        num_train_epochs=3,
-        per_device_train_batch_size=4,
-        per_device_eval_batch_size=4,
-        gradient_accumulation_steps=4,
+        num_train_epochs=epochs,
+        max_steps=max_steps,  # Set when streaming, where the dataset has no length
+        per_device_train_batch_size=BATCH_SIZE,
+        per_device_eval_batch_size=BATCH_SIZE,
+        gradient_accumulation_steps=GRADIENT_ACCUMULATION_STEPS,
         warmup_steps=100,
         logging_steps=10,
         eval_steps=200,
@@ -145,22 +179,24 @@ def train_model():
         learning_rate=2e-4,
         fp16=False,  # Use bf16 if available
         bf16=torch.cuda.is_available(),
-        dataloader_num_workers=0,  # Avoid multiprocessing issues
+        dataloader_num_workers=num_workers,  # Tokenize/prefetch in background processes
+        ignore_data_skip=streaming,  # The streaming dataset skips to its saved position itself
     )
     
     # Initialize trainer
-    trainer = Trainer(
+    trainer = BucketedTrainer(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
         data_collator=data_collator,
         tokenizer=tokenizer,
+        callbacks=callbacks,
     )
     
     # Train the model
-    print("Starting training...")
-    trainer.train()
+    print("Starting training..." if checkpoint is None else f"Resuming training from {checkpoint}...")
+    trainer.train(resume_from_checkpoint=checkpoint)
     
     # Save the final model
     print("Saving model...")
@@ -170,5 +206,22 @@ def train_model():
     print("Training completed!")
     print("Model saved to ./poker-phi3-final")
 
+def add_training_args(parser):
+    """Training options shared by this script and run_training.py"""
+    parser.add_argument("--train-subset", type=int, default=10000, help="Train examples to use (0 = all)")
+    parser.add_argument("--eval-subset", type=int, default=1000, help="Test examples used for evaluation")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--streaming", action="store_true", help="Stream shards lazily (full-dataset runs)")
+    parser.add_argument("--shuffle-buffer", type=int, default=10000, help="Streaming shuffle buffer size")
+    parser.add_argument("--num-workers", type=int, default=2, help="DataLoader worker processes")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None,
+                        help="Resume from a checkpoint directory (or the latest one)")
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--packing", action="store_true", help="Padding-free batches (needs flash attention)")
+    parser.add_argument("--mask-prompt-loss", action="store_true", help="Only train on the Optimal Action tokens")
+    parser.add_argument("--num-proc", type=int, default=None, help="Tokenizer processes (default: CPU count, max 8)")
+    return parser
+
 if __name__ == "__main__":
-    train_model() 
\ No newline at end of file
+    parser = add_training_args(argparse.ArgumentParser(description="Fine-tune Phi-3-mini on PokerBench with LoRA"))
+    train_model(**vars(parser.parse_args()))